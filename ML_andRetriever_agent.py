@@ -1,18 +1,28 @@
 # agents_project_life/agent1.py
 from __future__ import annotations
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 from datetime import datetime, timedelta
+from itertools import islice
 import statistics as stats
-import joblib
-import pandas as pd
 import numpy as np
 import os
 
+from model_registry import get_model_bundle, get_registry
+from hospital_store import get_hospital_store
+from feature_encoder import FEATURE_DEFAULTS, FeatureEncoder, build_feature_rows, compile_encoder
+from inference_engine import HeadOutputs, InferenceEngine
+from forecast_cache import forecast_cache, quantize
+from forecast_table import forecast_table
+from lag_store import get_lag_store
+from forecast_horizon import FORECAST_DAYS, LagRing, check_horizon, hourly_buckets
+
 # ---------- Config ----------
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.getenv("FORECAST_MODEL_PATH", os.path.join(BASE_DIR, "final_patient_disease_forecast_model.joblib"))
 HOSPITAL_DATA_PATH = os.getenv("HOSPITAL_DATA_PATH", os.path.join(BASE_DIR, "hospital_details.csv"))
+# Rows per feature matrix in run_agent1_batch.
+BATCH_CHUNK_SIZE = int(os.getenv("FORECAST_BATCH_CHUNK_SIZE", "4096"))
 
 # ---------- Data Contracts ----------
 @dataclass
@@ -23,6 +33,8 @@ class Agent1Request:
     relative_humidity_mean: float
     rain_mm: float
     uv_index_mean: float
+    horizon_days: int = FORECAST_DAYS
+    resolution: str = "daily"  # "hourly": 24 buckets per day, each with an "hour" field
 
 @dataclass
 class TimeBucket:
@@ -30,6 +42,8 @@ class TimeBucket:
     predicted_patient_load: float
     predicted_disease_spike: str
     predicted_intensity: str
+    disease_confidence: float
+    intensity_confidence: Optional[float]
 
 @dataclass
 class SurgeForecast:
@@ -66,8 +80,8 @@ class Agent1Response:
 
 # ---------- Utilities ----------
 def _load_models(model_path: str = MODEL_PATH) -> Dict[str, Any]:
-    bundle = joblib.load(model_path)
-    return bundle
+    # Shared across threads and hot-reloaded on retrain; see model_registry.py.
+    return get_model_bundle(model_path)
 
 def _aqi_to_intensity(aqi: float) -> str:
     if 0 <= aqi <= 50:
@@ -95,99 +109,96 @@ def _intensity_to_severity(intensity: str) -> str:
     }
     return mapping.get(intensity, "Low")
 
-def _build_feature_frame(req: Agent1Request, features: List[str]) -> pd.DataFrame:
-    base = {
-        "city": 0,
-        "pincode": int(req.pincode),
-        "population_density": 2000,
-        "no_of_hospitals": 5,
-        "avg_capacity": 150,
-        "pm2_5": req.aqi_index * 0.6,
-        "pm10": req.aqi_index * 0.4,
-        "temperature_mean_c": req.temperature_mean_c,
-        "relative_humidity_mean": req.relative_humidity_mean,
-        "uv_index_mean": req.uv_index_mean,
-        "rain_mm": req.rain_mm,
-        "is_weekend": 0,
-        "is_festival": 0,
-        "school_open": 1,
-        "month": datetime.now().month,
-        "respiratory_risk": 0.3,
-        "flu_risk": 0.3,
-        "vector_risk": 0.3,
-        "gastro_risk": 0.3,
-    }
-    for lag in [1, 2, 3, 7, 14]:
-        for col in [
-            "patient_load",
-            "respiratory_cases",
-            "flu_cases",
-            "vector_cases",
-            "gastro_cases",
-            "other_cases",
-        ]:
-            base[f"{col}_lag{lag}"] = 0.0
-
-    df = pd.DataFrame([base])
-    for f in features:
-        if f not in df.columns:
-            df[f] = 0.0
-    df = df[features].apply(pd.to_numeric, errors="coerce").fillna(0.0)
-    return df
+# Labels of the intensity head (training_data.INTENSITY_LABELS), mildest first;
+# they already use the severity vocabulary of primarySurgeSeverity.
+SEVERITY_ORDER = ["Low", "Moderate", "High", "Severe"]
 
+def _feature_encoder(features: List[str]) -> FeatureEncoder:
+    # Shared defaults (feature_encoder.FEATURE_DEFAULTS); risks stay at their 0.3 placeholders.
+    return compile_encoder(features, FEATURE_DEFAULTS)
 
-# ---------- Hospital Loader ----------
-def _load_hospitals_by_pincode(pincode: int) -> List[Dict[str, Any]]:
+
+def _lag_ring(reqs: List[Agent1Request]) -> LagRing:
     """
-    Reads hospital_details.csv and returns all hospitals matching the given pincode.
+    The lag store's window for every request, read once: both the first
+    day's lag features and the roll-forward come from this one snapshot.
     """
-    if not os.path.exists(HOSPITAL_DATA_PATH):
-        raise FileNotFoundError(f"Hospital data not found at {HOSPITAL_DATA_PATH}")
+    return LagRing.from_store(get_lag_store(), [r.pincode for r in reqs])
 
-    df = pd.read_csv(HOSPITAL_DATA_PATH)
-    df["pincode"] = df["pincode"].astype(str)
-    hospitals = df[df["pincode"] == str(pincode)]
 
-    # Convert to list of dicts for JSON serialization
-    return hospitals.to_dict(orient="records")
+def _build_feature_matrix(reqs: List[Agent1Request], encoder: FeatureEncoder,
+                          ring: Optional[LagRing] = None) -> np.ndarray:
+    """
+    One feature row per request, in the column order the models were trained
+    on. Lags come from `ring` (read from the lag store when not given) and
+    stay 0.0 for pincodes the store does not know.
+    """
+    X = build_feature_rows(reqs, encoder)
+    (ring if ring is not None else _lag_ring(reqs)).fill(X, encoder)
+    X[np.isnan(X)] = 0.0
+    return X
 
 
-# ---------- Core Agent ----------
-def run_agent1(payload: Dict[str, Any]) -> Dict[str, Any]:
+def _forecast_days(X: np.ndarray, encoder: FeatureEncoder, engine: InferenceEngine,
+                   ring: LagRing, days: int = FORECAST_DAYS) -> HeadOutputs:
     """
-    Agent 1: takes UI payload, runs ML model, and attaches filtered hospital data.
+    Recursive multi-day forecast for every row of X at once: one pass of all
+    heads per day, with every lag feature rolled forward in `ring` (the one
+    X's first-day lags came from). Returns HeadOutputs of (days, len(X)) arrays.
     """
-    req = Agent1Request(**payload)
-    bundle = _load_models(MODEL_PATH)
-    load_model = bundle["load_model"]
-    disease_model = bundle["disease_model"]
-    features = bundle["features"]
+    return engine.forecast(X, days, ring.roller(encoder))
 
-    aqi_intensity = _aqi_to_intensity(req.aqi_index)
-    severity_overall = _intensity_to_severity(aqi_intensity)
 
-    base_date = datetime.now()
+def _forecast_many(reqs: List[Agent1Request], bundle: Dict[str, Any], days: int = FORECAST_DAYS) -> HeadOutputs:
+    """(days, len(reqs)) outputs for one feature matrix; also used by forecast_table.py."""
+    encoder = _feature_encoder(bundle["features"])
+    ring = _lag_ring(reqs)
+    X = _build_feature_matrix(reqs, encoder, ring)
+    return _forecast_days(X, encoder, InferenceEngine(bundle), ring, days)
+
+
+def _forecast_one(req: Agent1Request, bundle: Dict[str, Any]) -> HeadOutputs:
+    return _forecast_many([req], bundle, req.horizon_days).column(0)
+
+
+# ---------- Hospital Loader ----------
+def _load_hospitals_by_pincode(pincode: int) -> List[Dict[str, Any]]:
+    """
+    Returns all hospitals in hospital_details.csv matching the given pincode.
+    The CSV is parsed once and indexed by pincode; see hospital_store.py.
+    """
+    return get_hospital_store(HOSPITAL_DATA_PATH).by_pincode(pincode)
+
+
+# ---------- Response Assembly ----------
+def _build_response(req: Agent1Request, out: HeadOutputs, base_date: datetime) -> Dict[str, Any]:
+    """`out` holds one row's per-day outputs (HeadOutputs.column)."""
+    if out.intensity is not None:
+        # Intensity head: overall severity is the worst day of the horizon.
+        intensities = [str(v) for v in out.intensity]
+        intensity_conf = [round(float(c), 3) for c in out.intensity_confidence]
+        severity_overall = max(intensities, key=lambda v: SEVERITY_ORDER.index(v) if v in SEVERITY_ORDER else 0)
+    else:
+        # Older bundles without intensity_model: fall back to the AQI category.
+        aqi_intensity = _aqi_to_intensity(req.aqi_index)
+        intensities = [aqi_intensity] * len(out.load)
+        intensity_conf = [None] * len(out.load)
+        severity_overall = _intensity_to_severity(aqi_intensity)
+
     time_buckets: List[TimeBucket] = []
     disease_votes: List[str] = []
-
-    X = _build_feature_frame(req, features)
-    last_pred_load = 0.0
-    for i in range(3):
+    for i, (load_pred, disease_pred) in enumerate(zip(out.load, out.disease)):
         day = base_date + timedelta(days=i + 1)
-        if "patient_load_lag1" in X.columns and i > 0:
-            X.loc[0, "patient_load_lag1"] = float(last_pred_load)
-
-        load_pred = float(load_model.predict(X)[0])
-        disease_pred = str(disease_model.predict(X)[0])
-        last_pred_load = load_pred
+        disease_pred = str(disease_pred)
         disease_votes.append(disease_pred)
-
         time_buckets.append(
             TimeBucket(
                 date=day.strftime("%Y-%m-%d"),
-                predicted_patient_load=round(load_pred, 2),
+                predicted_patient_load=round(float(load_pred), 2),
                 predicted_disease_spike=disease_pred,
-                predicted_intensity=aqi_intensity,
+                predicted_intensity=intensities[i],
+                disease_confidence=round(float(out.disease_confidence[i]), 3),
+                intensity_confidence=intensity_conf[i],
             )
         )
 
@@ -197,12 +208,16 @@ def run_agent1(payload: Dict[str, Any]) -> Dict[str, Any]:
         primary_type = disease_votes[-1] if disease_votes else "respiratory_risk"
 
     surge = SurgeForecast(
-        horizonHours=72,
+        horizonHours=24 * len(time_buckets),
         primarySurgeType=primary_type,
         primarySurgeSeverity=severity_overall,
         timeBuckets=time_buckets,
     )
 
+    buckets = [asdict(tb) for tb in surge.timeBuckets]
+    if req.resolution == "hourly":
+        buckets = hourly_buckets(buckets, digits=2)
+
     # Fetch hospital details for this pincode
     hospitals = _load_hospitals_by_pincode(req.pincode)
 
@@ -212,13 +227,64 @@ def run_agent1(payload: Dict[str, Any]) -> Dict[str, Any]:
             "horizonHours": surge.horizonHours,
             "primarySurgeType": surge.primarySurgeType,
             "primarySurgeSeverity": surge.primarySurgeSeverity,
-            "timeBuckets": [asdict(tb) for tb in surge.timeBuckets],
+            "timeBuckets": buckets,
         },
         "hospitals": hospitals,
     }
     return resp
 
 
+# ---------- Core Agent ----------
+def run_agent1(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Agent 1: takes UI payload, runs ML model, and attaches filtered hospital data.
+    """
+    req = Agent1Request(**payload)
+    check_horizon(req.horizon_days, req.resolution)
+    bundle = _load_models(MODEL_PATH)
+
+    if forecast_cache.enabled:
+        # Forecast from the bucketed inputs so a cached result does not depend on which request filled it.
+        q_req = Agent1Request(**quantize(asdict(req), forecast_cache.buckets))
+        version = f"{get_registry(MODEL_PATH).version}:{get_lag_store().version}"
+        # Today's materialized forecast when the inputs are the day's baseline (forecast_table.py).
+        out = forecast_table.get("agent1", version, asdict(q_req), forecast_cache.buckets, req.horizon_days)
+        if out is None:
+            key = forecast_cache.key(f"agent1:{req.horizon_days}d", version, asdict(q_req))
+            out = forecast_cache.get_or_compute(key, lambda: _forecast_one(q_req, bundle))
+    else:
+        out = _forecast_one(req, bundle)
+    return _build_response(req, out, datetime.now())
+
+
+def run_agent1_batch(payloads: Iterable[Dict[str, Any]], chunk_size: int = BATCH_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Agent 1 for many pincodes: same output as run_agent1 per payload, in input order.
+
+    Payloads are processed in chunks of `chunk_size`; each chunk is a single
+    feature matrix with one pass of all heads per forecast day, run to the
+    chunk's longest horizon. Results are yielded as soon as their chunk is
+    done, so callers can stream them.
+    """
+    bundle = _load_models(MODEL_PATH)
+    engine = InferenceEngine(bundle)
+    encoder = _feature_encoder(bundle["features"])
+    base_date = datetime.now()
+
+    it = iter(payloads)
+    while True:
+        reqs = [Agent1Request(**p) for p in islice(it, chunk_size)]
+        if not reqs:
+            return
+        for req in reqs:
+            check_horizon(req.horizon_days, req.resolution)
+        ring = _lag_ring(reqs)
+        X = _build_feature_matrix(reqs, encoder, ring)
+        out = _forecast_days(X, encoder, engine, ring, max(r.horizon_days for r in reqs))
+        for j, req in enumerate(reqs):
+            yield _build_response(req, out.column(j).first(req.horizon_days), base_date)
+
+
 # ---------- Local test ----------
 if __name__ == "__main__":
     sample = {
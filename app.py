@@ -1,24 +1,40 @@
-from fastapi import FastAPI
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
-import joblib
+from typing import List, Literal, Optional
 import numpy as np
 from datetime import datetime, timedelta
-from io import BytesIO
 import base64
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+import json
+import os
 
-app = FastAPI(title="Patient Load Forecast API (with Disease Risks)")
+from model_registry import get_model_bundle, get_registry, registry_metrics
+from feature_encoder import FEATURE_DEFAULTS, RISK_FEATURES, FeatureEncoder, build_feature_rows, compile_encoder
+from inference_engine import HeadOutputs, InferenceEngine
+from chart_renderer import CHART_RENDER_TIMEOUT_S, chart_service, chart_spec
+from forecast_cache import forecast_cache, quantize
+from forecast_table import forecast_table
+from llm_cache import llm_cache
+from lag_store import get_lag_store
+from forecast_horizon import FORECAST_DAYS, MAX_FORECAST_DAYS, LagRing, hourly_buckets
+from micro_batcher import MicroBatcher
+from service_warmup import Warmup
 
-# ----------------------------
-# Load trained models
-# ----------------------------
-model_bundle = joblib.load("final_patient_disease_forecast_model.joblib")
-load_model = model_bundle["load_model"]
-disease_model = model_bundle["disease_model"]
-features = model_bundle["features"]
+# Steps are registered below; they run when the server starts (APP_WARMUP_MODE).
+warmup = Warmup()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warmup.start()
+    yield
+
+app = FastAPI(title="Patient Load Forecast API (with Disease Risks)", lifespan=lifespan)
+
+# Rows per feature matrix / upper bound on requests for /predict_forecast/batch
+BATCH_CHUNK_SIZE = int(os.getenv("FORECAST_BATCH_CHUNK_SIZE", "4096"))
+MAX_BATCH_SIZE = int(os.getenv("FORECAST_MAX_BATCH_SIZE", "100000"))
 
 # ----------------------------
 # Request Schema
@@ -31,41 +47,55 @@ class ForecastRequest(BaseModel):
     rain_mm: float
     uv_index_mean: float
 
+class ForecastBatchRequest(BaseModel):
+    requests: List[ForecastRequest]
+
 # ----------------------------
 # Helper Functions
 # ----------------------------
-def make_base_input(req: ForecastRequest):
-    """Builds a minimal input DataFrame for the model"""
-    base = {
-        "city": [0],
-        "pincode": [req.pincode],
-        "population_density": [2000],
-        "no_of_hospitals": [5],
-        "avg_capacity": [150],
-        "pm2_5": [req.aqi_index * 0.6],
-        "pm10": [req.aqi_index * 0.4],
-        "temperature_mean_c": [req.temperature_mean_c],
-        "relative_humidity_mean": [req.relative_humidity_mean],
-        "uv_index_mean": [req.uv_index_mean],
-        "rain_mm": [req.rain_mm],
-        "is_weekend": [0],
-        "is_festival": [0],
-        "school_open": [1],
-        "month": [datetime.now().month],
-        "respiratory_risk": [np.random.uniform(0.1, 0.5)],
-        "flu_risk": [np.random.uniform(0.1, 0.5)],
-        "vector_risk": [np.random.uniform(0.1, 0.5)],
-        "gastro_risk": [np.random.uniform(0.1, 0.5)],
-    }
+# "rules": risk features come from compute_disease_risks (deterministic, cacheable).
+# "random": legacy uniform(0.1, 0.5) placeholders; disables the forecast cache.
+RISK_FEATURE_MODE = os.getenv("FORECAST_RISK_FEATURES", "rules")
 
-    # Add lag placeholders
-    for lag in [1, 2, 3, 7, 14]:
-        for col in [
-            "patient_load", "respiratory_cases", "flu_cases",
-            "vector_cases", "gastro_cases", "other_cases"
-        ]:
-            base[f"{col}_lag{lag}"] = [0.0]
-    return pd.DataFrame(base)
+def lag_ring(reqs: List[ForecastRequest]) -> LagRing:
+    """The lag store's window per request, read once for both the first-day lags and the roll-forward"""
+    return LagRing.from_store(get_lag_store(), [r.pincode for r in reqs])
+
+def make_base_input_batch(reqs: List[ForecastRequest], encoder: FeatureEncoder,
+                          ring: Optional[LagRing] = None) -> np.ndarray:
+    """
+    Builds the model input matrix with one row per request (feature_encoder.build_feature_rows);
+    lags come from `ring` (read from the lag store when not given) and start at 0.0 for pincodes it does not know
+    """
+    n = len(reqs)
+    X = build_feature_rows(reqs, encoder)
+    (ring if ring is not None else lag_ring(reqs)).fill(X, encoder)
+    if RISK_FEATURE_MODE == "random":
+        for risk in RISK_FEATURES:
+            encoder.fill(X, risk, np.random.uniform(0.1, 0.5, n))
+    else:
+        risk_dicts = [compute_disease_risks(r) for r in reqs]
+        for risk in RISK_FEATURES:
+            encoder.fill(X, risk, [d[risk] for d in risk_dicts])
+    return X
+
+def make_base_input(req: ForecastRequest, encoder: FeatureEncoder) -> np.ndarray:
+    """Builds a minimal input row for the model"""
+    return make_base_input_batch([req], encoder)
+
+def compute_disease_risks(req: ForecastRequest) -> dict:
+    """Rule-based disease risks from the environmental inputs"""
+    respiratory_risk = round(min(1.0, 0.15 + 0.006 * (req.aqi_index - 50) + 0.008 * max(0, 22 - req.temperature_mean_c)), 2)
+    flu_risk = round(min(1.0, 0.1 + 0.05 * (1 if req.temperature_mean_c < 22 else 0) + 0.03), 2)
+    vector_risk = round(min(1.0, 0.08 + 0.004 * req.relative_humidity_mean + 0.02 * (1 if req.rain_mm > 3 else 0)), 2)
+    gastro_risk = round(min(1.0, 0.07 + 0.01 * max(0, req.temperature_mean_c - 32)), 2)
+
+    return {
+        "respiratory_risk": respiratory_risk,
+        "flu_risk": flu_risk,
+        "vector_risk": vector_risk,
+        "gastro_risk": gastro_risk
+    }
 
 def get_intensity_from_aqi(aqi_value: float) -> str:
     """Returns intensity category based on AQI levels"""
@@ -85,90 +115,251 @@ def get_intensity_from_aqi(aqi_value: float) -> str:
         return "Invalid AQI"
 
 # ----------------------------
-# Main Endpoint
+# Forecasting
 # ----------------------------
-@app.post("/predict_forecast")
-def predict_forecast(req: ForecastRequest):
-    df_input = make_base_input(req)
-    preds = []
-    base_date = datetime.now()
-
-    for i in range(3):
-        day = base_date + timedelta(days=i + 1)
-
-        # --- Compute disease risks dynamically ---
-        respiratory_risk = round(min(1.0, 0.15 + 0.006 * (req.aqi_index - 50) + 0.008 * max(0, 22 - req.temperature_mean_c)), 2)
-        flu_risk = round(min(1.0, 0.1 + 0.05 * (1 if req.temperature_mean_c < 22 else 0) + 0.03), 2)
-        vector_risk = round(min(1.0, 0.08 + 0.004 * req.relative_humidity_mean + 0.02 * (1 if req.rain_mm > 3 else 0)), 2)
-        gastro_risk = round(min(1.0, 0.07 + 0.01 * max(0, req.temperature_mean_c - 32)), 2)
+def forecast_arrays(reqs: List[ForecastRequest], model_bundle: dict, days: int = FORECAST_DAYS) -> HeadOutputs:
+    """
+    `days`-day recursive forecast for all requests at once: one pass of all
+    heads per day across every row, with every lag feature rolled forward
+    from one read of the lag store's window (forecast_horizon.LagRing).
+    Returns HeadOutputs of (days, len(reqs)) arrays.
+    """
+    encoder = compile_encoder(model_bundle["features"], FEATURE_DEFAULTS)
+    ring = lag_ring(reqs)
+    X = make_base_input_batch(reqs, encoder, ring)
+    return InferenceEngine(model_bundle).forecast(X, days, ring.roller(encoder))
 
-        risk_dict = {
-            "respiratory_risk": respiratory_risk,
-            "flu_risk": flu_risk,
-            "vector_risk": vector_risk,
-            "gastro_risk": gastro_risk
-        }
+def assemble_predictions(req: ForecastRequest, out: HeadOutputs, base_date: datetime) -> list:
+    """Per-day prediction dicts for one request from its column of model outputs"""
+    # --- Disease risks only depend on the request, not the day ---
+    risk_dict = compute_disease_risks(req)
+    # --- Compute dominant risk (max risk value) ---
+    dominant_risk = max(risk_dict, key=risk_dict.get)
+    # Bundles without an intensity head fall back to the AQI category
+    aqi_intensity = get_intensity_from_aqi(req.aqi_index)
 
-        # --- Compute dominant risk (max risk value) ---
-        dominant_risk = max(risk_dict, key=risk_dict.get)
-
-        # --- Model predictions ---
-        load_pred = load_model.predict(df_input)[0]
-        disease_pred = disease_model.predict(df_input)[0]
+    preds = []
+    for i, (load_pred, disease_pred) in enumerate(zip(out.load, out.disease)):
+        day = base_date + timedelta(days=i + 1)
 
         # 🔸 Optional: override predicted disease with dominant risk
         # disease_pred = dominant_risk
 
-        intensity_pred = get_intensity_from_aqi(req.aqi_index)
-
         preds.append({
             "date": day.strftime("%Y-%m-%d"),
             "predicted_patient_load": float(load_pred),
             "predicted_disease_spike": str(disease_pred),
-            "predicted_intensity": intensity_pred,
+            "disease_confidence": round(float(out.disease_confidence[i]), 3),
+            "predicted_intensity": str(out.intensity[i]) if out.intensity is not None else aqi_intensity,
+            "intensity_confidence": round(float(out.intensity_confidence[i]), 3) if out.intensity is not None else None,
             "dominant_risk": dominant_risk,
             "disease_risks": risk_dict
         })
+    return preds
+
+def run_forecast(reqs: List[ForecastRequest], model_bundle: dict, days: int = FORECAST_DAYS) -> List[list]:
+    """Uncached forecast for many requests. Returns the per-day predictions per request."""
+    out = forecast_arrays(reqs, model_bundle, days)
+    base_date = datetime.now()
+    return [assemble_predictions(req, out.column(j), base_date) for j, req in enumerate(reqs)]
+
+def forecast_group(items: List[tuple]) -> List[HeadOutputs]:
+    """
+    One batched forecast for (request, days) items gathered by the
+    micro-batcher, run to the longest horizon in the group; per-request
+    outputs in order. Day i of a recursive forecast does not depend on the
+    horizon, so shorter requests just take the first days.
+    """
+    out = forecast_arrays([req for req, _ in items], get_model_bundle(), max(days for _, days in items))
+    return [out.column(j).first(days) for j, (_, days) in enumerate(items)]
+
+# Concurrent single-request forecasts arriving within MICRO_BATCH_WAIT_MS
+# (or MICRO_BATCH_MAX_SIZE of them) share one predict per head per day.
+forecast_batcher = MicroBatcher(forecast_group, name="forecast-batcher")
+# Upper bound on how long a request waits for its batched forecast (queue + compute).
+FORECAST_TIMEOUT_S = float(os.getenv("FORECAST_TIMEOUT_S", "30"))
+
+def cached_forecast(req: ForecastRequest, days: int = FORECAST_DAYS) -> list:
+    """
+    Single-request forecast through the quantized-input cache. Bypassed when
+    the risk features are random, since the result would not be reproducible.
+    Requests at the day's baseline are served from the materialized forecast
+    table (forecast_table.py); cache misses are computed through the micro-batcher.
+    """
+    if not forecast_cache.enabled or RISK_FEATURE_MODE == "random":
+        return assemble_predictions(req, forecast_batcher.run((req, days), FORECAST_TIMEOUT_S), datetime.now())
 
-        # --- Update lag placeholders ---
-        for lag in [1, 2, 3, 7, 14]:
-            if f"patient_load_lag{lag}" in df_input.columns:
-                df_input[f"patient_load_lag{lag}"] = load_pred
-
-    forecast_df = pd.DataFrame(preds)
-
-    # --- Create chart ---
-    plt.figure(figsize=(7, 4))
-    plt.plot(
-        forecast_df["date"],
-        forecast_df["predicted_patient_load"],
-        marker="o",
-        linewidth=2,
-        color="blue"
-    )
-    plt.title(f"Predicted Patient Load (Pincode: {req.pincode})")
-    plt.xlabel("Date")
-    plt.ylabel("Predicted Patient Load")
-    plt.grid(True)
-    plt.tight_layout()
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    img_base64 = base64.b64encode(buffer.read()).decode("utf-8")
-    plt.close()
+    q_req = ForecastRequest(**quantize(req.model_dump(), forecast_cache.buckets))
+    version = f"{get_registry().version}:{get_lag_store().version}"
+    out = forecast_table.get("api", version, q_req.model_dump(), forecast_cache.buckets, days)
+    if out is None:
+        key = forecast_cache.key(f"api:{days}d", version, q_req.model_dump())
+        out = forecast_cache.get_or_compute(key, lambda: forecast_batcher.run((q_req, days), FORECAST_TIMEOUT_S))
+    return assemble_predictions(req, out, datetime.now())
 
+def forecast_payload(req: ForecastRequest, preds: list, resolution: str = "daily") -> dict:
+    """
+    Response body shared by the single and batch endpoints (without the chart).
+    `preds` are daily; "hourly" splits each day into 24 buckets with an "hour" field.
+    """
+    buckets = hourly_buckets(preds) if resolution == "hourly" else preds
     coordinates = [
-        {"x": row["date"], "y": row["predicted_patient_load"]}
-        for _, row in forecast_df.iterrows()
+        {"x": p.get("hour", p["date"]), "y": p["predicted_patient_load"]}
+        for p in buckets
     ]
-
     return {
         "pincode": req.pincode,
-        "forecast_days": len(forecast_df),
+        "forecast_days": len(preds),
+        "resolution": resolution,
         "aqi_index": req.aqi_index,
         "aqi_intensity": get_intensity_from_aqi(req.aqi_index),
-        "predictions": preds,
+        "predictions": buckets,
         "chart_coordinates": coordinates,
-        "chart_base64": f"data:image/png;base64,{img_base64}"
+    }
+
+# ----------------------------
+# Main Endpoint
+# ----------------------------
+@app.post("/predict_forecast")
+def predict_forecast(req: ForecastRequest, chart: Literal["none", "inline", "url"] = "inline",
+                     days: int = Query(FORECAST_DAYS, ge=1, le=MAX_FORECAST_DAYS),
+                     resolution: Literal["daily", "hourly"] = "daily"):
+    """
+    `days` sets the horizon (1 to FORECAST_MAX_DAYS) and `resolution` the
+    bucket size of predictions / chart_coordinates. `chart` controls the PNG
+    (always one point per day): "inline" embeds it as chart_base64 (default),
+    "url" returns chart_url to fetch it from /charts/<key>.png once needed,
+    "none" skips it. chart_coordinates are always returned.
+    """
+    try:
+        preds = cached_forecast(req, days)
+    except FutureTimeout:
+        raise HTTPException(status_code=504, detail=f"Forecast timed out after {FORECAST_TIMEOUT_S:g}s")
+    response = forecast_payload(req, preds, resolution)
+
+    # --- Chart (rendered in a worker pool, cached by forecast content) ---
+    if chart == "inline":
+        try:
+            png = chart_service.render(chart_spec(req.pincode, preds))
+        except FutureTimeout:
+            raise HTTPException(status_code=504, detail=f"Chart render timed out after {CHART_RENDER_TIMEOUT_S:g}s")
+        img_base64 = base64.b64encode(png).decode("utf-8")
+        response["chart_base64"] = f"data:image/png;base64,{img_base64}"
+    elif chart == "url":
+        key = chart_service.register(chart_spec(req.pincode, preds))
+        response["chart_url"] = f"/charts/{key}.png"
+    return response
+
+
+@app.get("/charts/{key}.png")
+def get_chart(key: str):
+    try:
+        png = chart_service.get_png(key)
+    except FutureTimeout:
+        raise HTTPException(status_code=504, detail=f"Chart render timed out after {CHART_RENDER_TIMEOUT_S:g}s")
+    if png is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired chart")
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": "public, max-age=86400, immutable"})
+
+
+@app.post("/predict_forecast/batch")
+def predict_forecast_batch(batch: ForecastBatchRequest,
+                           days: int = Query(FORECAST_DAYS, ge=1, le=MAX_FORECAST_DAYS),
+                           resolution: Literal["daily", "hourly"] = "daily"):
+    """
+    Forecasts many pincodes in one call. Rows are predicted BATCH_CHUNK_SIZE
+    at a time and streamed back as NDJSON (one forecast per line, input
+    order, no chart image) as each chunk finishes.
+    """
+    reqs = batch.requests
+    if len(reqs) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {len(reqs)} > {MAX_BATCH_SIZE} requests")
+    model_bundle = get_model_bundle()
+
+    def stream():
+        for start in range(0, len(reqs), BATCH_CHUNK_SIZE):
+            chunk = reqs[start:start + BATCH_CHUNK_SIZE]
+            for req, preds in zip(chunk, run_forecast(chunk, model_bundle, days)):
+                yield json.dumps(forecast_payload(req, preds, resolution)) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+# ----------------------------
+# Streaming hospital plans (Agent 2)
+# ----------------------------
+_plan_streamer = None
+
+def get_plan_streamer():
+    """Shared AsyncPlanner for /plan/stream; the LLM agent (and Gemini SDK) is imported on first use"""
+    global _plan_streamer
+    if _plan_streamer is None:
+        from llm_recommendation_agent import AsyncPlanner
+        _plan_streamer = AsyncPlanner()
+    return _plan_streamer
+
+def format_event(event: dict, fmt: str) -> str:
+    """One planner event as an SSE message or an NDJSON line"""
+    if fmt == "sse":
+        return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+    return json.dumps(event, default=str) + "\n"
+
+@app.post("/plan/stream")
+async def plan_stream(req: ForecastRequest,
+                      mode: Optional[Literal["llm", "hybrid", "rules", "auto"]] = None,
+                      fmt: Literal["sse", "ndjson"] = Query("sse", alias="format")):
+    """
+    Hospital surge plans for one request, sent while the LLM is still
+    writing: a "forecast" event, one "plan" event per hospital as soon as its
+    entry is complete, then "done" with the merged plan (same as Agent 2's
+    non-streaming result). Planning errors end the stream with an "error" event.
+    """
+    planner = get_plan_streamer()
+
+    async def events():
+        try:
+            kwargs = {"mode": mode} if mode else {}
+            async for event in planner.plan_stream(req.model_dump(), **kwargs):
+                yield format_event(event, fmt)
+        except Exception as e:
+            yield format_event({"event": "error", "data": {"detail": f"{type(e).__name__}: {e}"}}, fmt)
+
+    media_type = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+# ----------------------------
+# Startup / health
+# ----------------------------
+# The bundle is loaded once per process (and hot-reloaded on retrain) by the
+# warm-up, not at import, so LightGBM/sklearn stay out of the import path.
+# APP_WARMUP_MODE=blocking restores "a missing/broken bundle fails startup".
+WARMUP_REQUEST = ForecastRequest(pincode=0, aqi_index=50, temperature_mean_c=28,
+                                 relative_humidity_mean=60, rain_mm=0, uv_index_mean=5)
+warmup.add("model_bundle", get_model_bundle)
+warmup.add("lag_store", lambda: len(get_lag_store()))
+warmup.add("forecast_table", lambda: len(forecast_table))
+warmup.add("first_forecast", lambda: forecast_arrays([WARMUP_REQUEST], get_model_bundle()))
+
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: 200 once the warm-up has finished, 503 (with progress) until then"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if warmup.ready else 503)
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "model_registry": registry_metrics(),
+        "chart_cache": chart_service.metrics(),
+        "forecast_cache": forecast_cache.metrics(),
+        "forecast_table": forecast_table.metrics(),
+        "llm_cache": llm_cache.metrics(),
+        "lag_store": get_lag_store().metrics(),
+        "micro_batcher": forecast_batcher.metrics(),
+        "startup": warmup.status(),
     }
@@ -0,0 +1,274 @@
+# agents_project_life/backtest.py
+"""
+Rolling-origin backtest of the forecast bundle on the history CSV.
+
+For every forecast origin (a past date) each (city, pincode) series is cut
+off at that date, its last 14 days go into a SeriesRing and the recursive
+3-day forecast runs exactly as series_forecaster does after training. The
+predictions are scored against the days that actually followed, with the
+targets defined as in training_data.build_chunk:
+
+- load: MAE / RMSE of patient_load, next to a persistence baseline (the
+  origin day's load carried forward);
+- disease: accuracy against the day's highest risk column (max_risk), next
+  to persistence of the origin day's label;
+- intensity: accuracy against the binned day-over-day load change
+  (spike_intensity).
+
+City partitions (split further by origin when there are more workers than
+cities) run in a spawn process pool; each worker loads the bundle once. The
+report has the metrics overall and per horizon day, throughput in series
+forecasts per second, and read / ring / forecast / score seconds summed over
+the workers:
+
+    python backtest.py [--origins 14] [--step-days 1] [--days 3] [--jobs 0] [--model PATH]
+
+By default the origins cover the last BACKTEST_ORIGINS + days days, which lie
+inside the TRAIN_VALID_DAYS hold-out of training_driver.py (those rows only
+drive early stopping). Origins further back were trained on and measure fit
+rather than forecast skill. The report is written as <bundle>.backtest.json.
+"""
+from __future__ import annotations
+import os
+
+# LightGBM threads per worker; must be set before a (spawned) worker loads LightGBM.
+os.environ.setdefault("OMP_NUM_THREADS", os.getenv("BACKTEST_THREADS_PER_JOB", "1"))
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+import argparse
+import json
+import math
+import multiprocessing
+import time
+import numpy as np
+import pandas as pd
+
+from model_registry import MODEL_PATH, get_model_bundle
+from series_forecaster import GROUP_COLUMNS, RING_WINDOW, SeriesRing, forecast_series
+from training_data import (
+    TRAIN_CSV_PATH, TRAIN_PARQUET_DIR, CAT_COLUMNS, RISK_COLUMNS, INTENSITY_BINS, INTENSITY_LABELS,
+    convert_csv_to_parquet, list_partitions, category_codes, read_partition, date_range,
+)
+from training_features import group_diff, report_stage
+
+# ---------- Config ----------
+BACKTEST_ORIGINS = int(os.getenv("BACKTEST_ORIGINS", "14"))
+BACKTEST_STEP_DAYS = int(os.getenv("BACKTEST_STEP_DAYS", "1"))
+BACKTEST_DAYS = int(os.getenv("BACKTEST_DAYS", "3"))
+# Worker processes; 1 runs everything in this process, 0 = one per core.
+BACKTEST_JOBS = int(os.getenv("BACKTEST_JOBS", "0"))
+
+STAGES = ("read", "ring", "forecast", "score")
+# Columns of the per-horizon-day sums a worker returns.
+SUM_COLUMNS = ("n", "load_abs", "load_sq", "naive_abs", "disease_ok", "naive_disease_ok",
+               "intensity_ok", "intensity_n")
+
+
+@dataclass
+class PartitionResult:
+    city: str
+    origins: int
+    series: int                 # series in the partition
+    forecasts: int              # series forecast, summed over origins
+    sums: List[List[float]]     # (days, len(SUM_COLUMNS))
+    stage_s: Dict[str, float] = field(default_factory=dict)
+
+
+# ---------- Targets ----------
+def origin_dates(end: pd.Timestamp, n_origins: int, step_days: int, days: int) -> List[pd.Timestamp]:
+    """n_origins dates step_days apart, oldest first; the last leaves `days` observed days before `end`."""
+    last = pd.Timestamp(end) - pd.Timedelta(days=days)
+    return [last - pd.Timedelta(days=i * step_days) for i in reversed(range(n_origins))]
+
+
+def actuals(df: pd.DataFrame) -> pd.DataFrame:
+    """Observed load, disease and intensity per row of a (city, pincode, date)-sorted partition."""
+    intensity = pd.cut(group_diff(df, "patient_load"), bins=INTENSITY_BINS, labels=INTENSITY_LABELS)
+    return pd.DataFrame({
+        "city": df["city"].to_numpy(),
+        "pincode": df["pincode"].to_numpy(),
+        "date": df["date"].to_numpy(),
+        "patient_load": df["patient_load"].to_numpy(dtype=np.float64),
+        "disease": df[RISK_COLUMNS].idxmax(axis=1).to_numpy(),
+        "intensity": np.asarray(intensity.astype(str)),
+    })
+
+
+def score_origin(forecast: pd.DataFrame, truth: pd.DataFrame, origin: pd.Timestamp, days: int) -> np.ndarray:
+    """
+    (days, len(SUM_COLUMNS)) sums for one origin. Only series observed on the
+    origin day count, and only forecast days that have an actual.
+    """
+    keys = list(GROUP_COLUMNS)
+    naive = truth.loc[truth["date"] == origin, keys + ["patient_load", "disease"]]
+    naive = naive.rename(columns={"patient_load": "naive_load", "disease": "naive_disease"})
+    scored = forecast.merge(truth, on=keys + ["date"]).merge(naive, on=keys)
+
+    step = (scored["date"] - origin).dt.days.to_numpy() - 1
+    actual = scored["patient_load"].to_numpy()
+    err = scored["predicted_patient_load"].to_numpy(dtype=np.float64) - actual
+    disease = scored["disease"].to_numpy()
+    has_intensity = scored["predicted_intensity"].notna().to_numpy()
+    columns = [
+        np.ones(len(scored)),
+        np.abs(err),
+        err ** 2,
+        np.abs(scored["naive_load"].to_numpy() - actual),
+        scored["predicted_disease_spike"].astype(str).to_numpy() == disease,
+        scored["naive_disease"].to_numpy() == disease,
+        has_intensity & (scored["predicted_intensity"].astype(str).to_numpy() == scored["intensity"].to_numpy()),
+        has_intensity,
+    ]
+    return np.stack([np.bincount(step, weights=np.asarray(c, dtype=np.float64), minlength=days)[:days]
+                     for c in columns], axis=1)
+
+
+def summarize(sums: np.ndarray) -> Dict[str, Any]:
+    """Per-head metrics from one row of SUM_COLUMNS sums."""
+    s = dict(zip(SUM_COLUMNS, (float(v) for v in sums)))
+    n = s["n"] or math.nan
+    return {
+        "n": int(s["n"]),
+        "load": {"mae": round(s["load_abs"] / n, 4), "rmse": round(math.sqrt(s["load_sq"] / n), 4),
+                 "naive_mae": round(s["naive_abs"] / n, 4)},
+        "disease": {"accuracy": round(s["disease_ok"] / n, 4), "naive_accuracy": round(s["naive_disease_ok"] / n, 4)},
+        "intensity": {"accuracy": round(s["intensity_ok"] / s["intensity_n"], 4) if s["intensity_n"] else None},
+    }
+
+
+# ---------- One partition (runs in a worker) ----------
+def backtest_partition(parquet_dir: str, city: str, codes: Dict[str, Dict[Any, int]],
+                       origins: Sequence[pd.Timestamp], days: int, bundle_path: str) -> PartitionResult:
+    """Forecasts and scores every series of one city partition from each of `origins`."""
+    bundle = get_model_bundle(bundle_path)
+    stage_s = dict.fromkeys(STAGES, 0.0)
+
+    t0 = time.perf_counter()
+    df = read_partition(parquet_dir, city, codes=codes)
+    truth = actuals(df)
+    dates = df["date"].to_numpy()
+    stage_s["read"] += time.perf_counter() - t0
+
+    sums = np.zeros((days, len(SUM_COLUMNS)))
+    forecasts = 0
+    for origin in origins:
+        t0 = time.perf_counter()
+        # Only the window before the origin reaches the ring, so a step does not depend on history length.
+        o = np.datetime64(origin)
+        ring = SeriesRing.from_frame(df[(dates > o - np.timedelta64(RING_WINDOW, "D")) & (dates <= o)])
+        t1 = time.perf_counter()
+        forecast = forecast_series(ring, bundle, days)
+        t2 = time.perf_counter()
+        sums += score_origin(forecast, truth, origin, days)
+        t3 = time.perf_counter()
+        stage_s["ring"] += t1 - t0
+        stage_s["forecast"] += t2 - t1
+        stage_s["score"] += t3 - t2
+        forecasts += len(ring)
+
+    n_series = int(df.groupby(list(GROUP_COLUMNS), sort=False).ngroups)
+    return PartitionResult(city, len(origins), n_series, forecasts, sums.tolist(),
+                           {k: round(v, 4) for k, v in stage_s.items()})
+
+
+# ---------- All partitions ----------
+def run_backtest(parquet_dir: str = TRAIN_PARQUET_DIR, bundle_path: str = MODEL_PATH,
+                 n_origins: int = BACKTEST_ORIGINS, step_days: int = BACKTEST_STEP_DAYS,
+                 days: int = BACKTEST_DAYS, jobs: int = BACKTEST_JOBS) -> Dict[str, Any]:
+    """
+    Backtests every city partition of `parquet_dir` (in parallel when
+    jobs > 1). Returns the report: metrics overall and per horizon day,
+    throughput and per-stage seconds.
+    """
+    cities = list_partitions(parquet_dir)
+    codes = category_codes(parquet_dir, CAT_COLUMNS)
+    origins = origin_dates(date_range(parquet_dir)[1], n_origins, step_days, days)
+    jobs = max(1, jobs or (os.cpu_count() or 1))
+    # More workers than cities: interleave each city's origins over several tasks.
+    splits = max(1, min(len(origins), math.ceil(jobs / max(1, len(cities)))))
+    args = [(parquet_dir, city, codes, origins[i::splits], days, bundle_path)
+            for city in cities for i in range(splits)]
+    jobs = min(jobs, len(args))
+    print(f"🧪 Backtest: {len(origins)} origin(s) {origins[0]:%Y-%m-%d} .. {origins[-1]:%Y-%m-%d}, "
+          f"{days}-day horizon, {len(cities)} partition(s) as {len(args)} task(s) on {jobs} worker(s)")
+
+    t0 = time.perf_counter()
+    if jobs == 1:
+        results = [backtest_partition(*a) for a in args]
+    else:
+        # spawn: LightGBM's OpenMP runtime is not fork-safe once the parent has used it.
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(backtest_partition, *zip(*args)))
+    wall_s = time.perf_counter() - t0
+
+    sums = np.sum([r.sums for r in results], axis=0)
+    stage_s = {k: round(sum(r.stage_s[k] for r in results), 4) for k in STAGES}
+    forecasts = sum(r.forecasts for r in results)
+    series = {r.city: r.series for r in results}
+    return {
+        "bundle": bundle_path,
+        "parquet_dir": parquet_dir,
+        "days": days,
+        "origins": [o.strftime("%Y-%m-%d") for o in origins],
+        "step_days": step_days,
+        "jobs": jobs,
+        "threads_per_job": int(os.environ["OMP_NUM_THREADS"]),
+        "partitions": len(cities),
+        "tasks": len(args),
+        "series": sum(series.values()),
+        "forecasts": forecasts,
+        "wall_s": round(wall_s, 3),
+        "series_per_s": round(forecasts / wall_s, 1) if wall_s else None,
+        "stage_s": stage_s,
+        "metrics": summarize(sums.sum(axis=0)),
+        "per_day": [{"day": d + 1, **summarize(row)} for d, row in enumerate(sums)],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'day':>4} {'rows':>8} {'load MAE':>9} {'naive':>8} {'RMSE':>8} "
+          f"{'disease acc':>12} {'naive':>7} {'intensity acc':>14}")
+    for row in report["per_day"] + [{"day": "all", **report["metrics"]}]:
+        intensity = row["intensity"]["accuracy"]
+        print(f"{row['day']:>4} {row['n']:>8,} {row['load']['mae']:>9.3f} {row['load']['naive_mae']:>8.3f} "
+              f"{row['load']['rmse']:>8.3f} {row['disease']['accuracy']:>12.3f} "
+              f"{row['disease']['naive_accuracy']:>7.3f} {'-' if intensity is None else f'{intensity:.3f}':>14}")
+    stages = ", ".join(f"{k} {v:.2f}s" for k, v in report["stage_s"].items())
+    print(f"\n⏱️ Stages (summed over workers): {stages}")
+    print(f"🚀 {report['forecasts']:,} series forecasts ({report['series']:,} series) in {report['wall_s']:.2f}s: "
+          f"{report['series_per_s']:,.0f} series/s with {report['jobs']} worker(s)")
+
+
+def write_report(bundle_path: str, report: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Writes the report as <bundle>.backtest.json next to the bundle (or to `path`)."""
+    path = path or os.path.splitext(bundle_path)[0] + ".backtest.json"
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    return path
+
+
+# ---------- CLI ----------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Rolling-origin backtest of the forecast bundle")
+    ap.add_argument("--origins", type=int, default=BACKTEST_ORIGINS, help="number of forecast origins")
+    ap.add_argument("--step-days", type=int, default=BACKTEST_STEP_DAYS, help="days between origins")
+    ap.add_argument("--days", type=int, default=BACKTEST_DAYS, help="forecast horizon")
+    ap.add_argument("--jobs", type=int, default=BACKTEST_JOBS, help="worker processes (0 = one per core)")
+    ap.add_argument("--model", default=MODEL_PATH, help="bundle to backtest")
+    ap.add_argument("--out", help="report path (default <bundle>.backtest.json)")
+    args = ap.parse_args()
+
+    print("📂 Converting CSV data to Parquet (skipped if up to date)...")
+    with report_stage("ingest"):
+        convert_csv_to_parquet(TRAIN_CSV_PATH, TRAIN_PARQUET_DIR)
+    with report_stage("backtest"):
+        report = run_backtest(TRAIN_PARQUET_DIR, args.model, args.origins, args.step_days, args.days, args.jobs)
+    print_report(report)
+    print(f"\n📈 Backtest report saved as {write_report(args.model, report, args.out)}")
+
+
+# Guarded: the workers are spawned processes that re-import this module.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Performance benchmarks for the forecasting agents and API. Run modules with `python -m benchmarks.<name>`."""
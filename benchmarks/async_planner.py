@@ -0,0 +1,54 @@
+"""
+Wall time of the async Agent 2 planner vs. sequential planning, using the
+local fake LLM (no network) with a fixed per-call latency.
+
+    python -m benchmarks.async_planner [--pincodes 25] [--latency 0.2] [--concurrency 4 8 16]
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import time
+
+from llm_recommendation_agent import AsyncPlanner, run_agent1
+from benchmarks.batch_forecast import make_payloads
+from benchmarks.fake_llm import FakeLLMClient
+
+
+def run(payloads: List[Dict[str, Any]], latency: float, concurrency: int) -> Dict[str, Any]:
+    client = FakeLLMClient(latency_s=latency)
+    planner = AsyncPlanner(client=client, max_concurrency=concurrency)
+    t0 = time.perf_counter()
+    plans = asyncio.run(planner.plan_many(payloads))
+    elapsed = time.perf_counter() - t0
+    assert all("hospitalPlans" in p for p in plans)
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "plans_per_s": len(payloads) / elapsed,
+        "peak_in_flight": client.peak_in_flight,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pincodes", type=int, default=25)
+    ap.add_argument("--latency", type=float, default=0.2, help="fake LLM seconds per call")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    payloads = make_payloads(args.pincodes)
+    run_agent1(payloads[0])  # warm the model registry and hospital store
+    results = [run(payloads, args.latency, c) for c in args.concurrency]
+    for r in results:
+        print(f"concurrency {r['concurrency']:>3}: {r['seconds']:7.2f}s  {r['plans_per_s']:7.1f} plans/s  "
+              f"(peak in flight {r['peak_in_flight']})")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput of run_agent1_batch vs. calling run_agent1 once per pincode.
+
+    python -m benchmarks.batch_forecast --sizes 1 10 100 1000 10000 [--http] [--json out.json]
+
+Uses FORECAST_MODEL_PATH / HOSPITAL_DATA_PATH like the agent itself. The
+per-request loop is capped at --max-loop rows since it grows linearly.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import json
+import time
+import numpy as np
+
+from ML_andRetriever_agent import run_agent1, run_agent1_batch, get_hospital_store, HOSPITAL_DATA_PATH
+
+
+def make_payloads(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    pincodes = get_hospital_store(HOSPITAL_DATA_PATH).pincodes()
+    return [
+        {
+            "pincode": int(pincodes[i % len(pincodes)]),
+            "aqi_index": float(rng.uniform(0, 400)),
+            "temperature_mean_c": float(rng.uniform(15, 40)),
+            "relative_humidity_mean": float(rng.uniform(20, 95)),
+            "rain_mm": float(rng.uniform(0, 20)),
+            "uv_index_mean": float(rng.uniform(0, 11)),
+        }
+        for i in range(n)
+    ]
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_agent(n: int, max_loop: int) -> Dict[str, Any]:
+    payloads = make_payloads(n)
+    row: Dict[str, Any] = {"n": n}
+    batch_s = _timed(lambda: list(run_agent1_batch(payloads)))
+    row["batch_seconds"] = batch_s
+    row["batch_rows_per_s"] = n / batch_s
+    if n <= max_loop:
+        loop_s = _timed(lambda: [run_agent1(p) for p in payloads])
+        row["loop_seconds"] = loop_s
+        row["loop_rows_per_s"] = n / loop_s
+        row["speedup"] = loop_s / batch_s
+    return row
+
+
+def bench_http(n: int, max_loop: int) -> Dict[str, Any]:
+    from fastapi.testclient import TestClient
+    from app import app
+
+    client = TestClient(app)
+    payloads = make_payloads(n)
+    row: Dict[str, Any] = {"n": n}
+
+    def batch():
+        with client.stream("POST", "/predict_forecast/batch", json={"requests": payloads}) as r:
+            r.raise_for_status()
+            lines = sum(1 for line in r.iter_lines() if line)
+        assert lines == n, (lines, n)
+
+    batch_s = _timed(batch)
+    row["batch_seconds"] = batch_s
+    row["batch_rows_per_s"] = n / batch_s
+    if n <= max_loop:
+        loop_s = _timed(lambda: [client.post("/predict_forecast", json=p).raise_for_status() for p in payloads])
+        row["loop_seconds"] = loop_s
+        row["loop_rows_per_s"] = n / loop_s
+        row["speedup"] = loop_s / batch_s
+    return row
+
+
+def _print(title: str, rows: List[Dict[str, Any]]) -> None:
+    print(f"\n{title}")
+    print(f"{'n':>8} {'batch rows/s':>14} {'loop rows/s':>13} {'speedup':>9}")
+    for r in rows:
+        loop = f"{r['loop_rows_per_s']:13.1f}" if "loop_rows_per_s" in r else f"{'-':>13}"
+        speed = f"{r['speedup']:8.1f}x" if "speedup" in r else f"{'-':>9}"
+        print(f"{r['n']:>8} {r['batch_rows_per_s']:14.1f} {loop} {speed}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    ap.add_argument("--max-loop", type=int, default=1000, help="largest n to also run one-at-a-time")
+    ap.add_argument("--http", action="store_true", help="also benchmark the FastAPI endpoints in-process")
+    ap.add_argument("--max-http-loop", type=int, default=100, help="largest n to also POST one-at-a-time (renders a chart each)")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    # Warm the model registry and hospital store so the first size is not penalized.
+    list(run_agent1_batch(make_payloads(1)))
+
+    results: Dict[str, Any] = {"agent": [bench_agent(n, args.max_loop) for n in args.sizes]}
+    _print("run_agent1_batch vs run_agent1", results["agent"])
+    if args.http:
+        results["http"] = [bench_http(n, args.max_http_loop) for n in args.sizes]
+        _print("/predict_forecast/batch vs /predict_forecast", results["http"])
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
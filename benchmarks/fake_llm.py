@@ -0,0 +1,102 @@
+"""
+Local stand-in for Gemini, for exercising the planners without network or API keys.
+
+FakeLLMClient implements the LLMClient protocol from llm_recommendation_agent:
+it sleeps for a configurable latency, optionally fails, and answers with a
+schema-valid plan for every hospital listed in the prompt.
+FakeStreamingLLMClient also streams that answer in small chunks at a fixed
+generation speed, like Gemini's stream=True.
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterator, Dict, List
+import asyncio
+import json
+import re
+
+_HOSPITALS_RE = re.compile(r"### Hospitals Data\s*(\[.*\])\s*Return valid JSON", re.DOTALL)
+_FIELD_RE = re.compile(r"- (Type|Severity|Pincode): (.*)")
+
+
+def fake_plan_text(prompt: str) -> str:
+    """A valid planner response for the hospitals embedded in `prompt`."""
+    match = _HOSPITALS_RE.search(prompt)
+    hospitals: List[Dict[str, Any]] = json.loads(match.group(1)) if match else []
+    fields = dict(_FIELD_RE.findall(prompt))
+    plans = [
+        {
+            "hospital_id": h.get("hospital_id"),
+            "hospital_name": h.get("hospital_name"),
+            "specialty": h.get("specialty"),
+            "role": "Support-Overflow",
+            "rationale": ["fake LLM"],
+            "recommendedActions": {"staffing": [], "capacity": [], "inventory": [], "coordination": []},
+        }
+        for h in hospitals
+    ]
+    return json.dumps({
+        "pincode": fields.get("Pincode", "").strip(),
+        "surgeType": fields.get("Type", "").strip(),
+        "surgeSeverity": fields.get("Severity", "").strip(),
+        "environmentalContext": {},
+        "hospitalPlans": plans,
+    })
+
+
+class FakeLLMClient:
+    """
+    `latency_s` per call; the first `fail_first` calls raise `error`
+    (e.g. "429 quota exceeded" to exercise the fallback path).
+    Tracks calls per model and the peak number of concurrent calls.
+    """
+
+    def __init__(self, latency_s: float = 0.05, fail_first: int = 0, error: str = "503 unavailable"):
+        self.latency_s = latency_s
+        self.fail_first = fail_first
+        self.error = error
+        self.calls: Dict[str, int] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def generate(self, model_name: str, prompt: str) -> str:
+        self.calls[model_name] = self.calls.get(model_name, 0) + 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_s)
+            if sum(self.calls.values()) <= self.fail_first:
+                raise RuntimeError(self.error)
+            return fake_plan_text(prompt)
+        finally:
+            self.in_flight -= 1
+
+
+class FakeStreamingLLMClient(FakeLLMClient):
+    """
+    Streams the fake plan `chunk_chars` characters at a time: `latency_s`
+    before the first chunk, then `chunk_latency_s` per chunk. generate()
+    returns the same text after the whole stream's duration.
+    """
+
+    def __init__(self, latency_s: float = 0.05, chunk_chars: int = 40, chunk_latency_s: float = 0.01,
+                 fail_first: int = 0, error: str = "503 unavailable"):
+        super().__init__(latency_s, fail_first, error)
+        self.chunk_chars = chunk_chars
+        self.chunk_latency_s = chunk_latency_s
+
+    async def stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        self.calls[model_name] = self.calls.get(model_name, 0) + 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_s)
+            if sum(self.calls.values()) <= self.fail_first:
+                raise RuntimeError(self.error)
+            text = fake_plan_text(prompt)
+            for i in range(0, len(text), self.chunk_chars):
+                await asyncio.sleep(self.chunk_latency_s)
+                yield text[i:i + self.chunk_chars]
+        finally:
+            self.in_flight -= 1
+
+    async def generate(self, model_name: str, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.stream(model_name, prompt)])
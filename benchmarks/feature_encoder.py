@@ -0,0 +1,135 @@
+"""
+Parity check and timing: NumPy FeatureEncoder + raw booster predict vs. the
+previous per-request pandas feature frame + sklearn-wrapper predict.
+Both paths read the lag features from the same lag store (lag_store.py).
+
+    python -m benchmarks.feature_encoder [--n 2000] [--json out.json]
+
+Exits non-zero if any prediction differs from the pandas path.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+from datetime import datetime
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from ML_andRetriever_agent import (
+    Agent1Request, MODEL_PATH, _load_models, _feature_encoder, _build_feature_matrix,
+)
+from feature_encoder import LAG_DAYS, LAG_COLUMNS
+from lag_store import get_lag_store
+from inference_engine import InferenceEngine
+from benchmarks.batch_forecast import make_payloads
+
+
+def reference_feature_frame(req: Agent1Request, features: List[str]) -> pd.DataFrame:
+    """
+    The pandas path _build_feature_frame used before the encoder (kept
+    verbatim for comparison), with the lag columns read from the lag store.
+    """
+    base = {
+        "city": 0,
+        "pincode": int(req.pincode),
+        "population_density": 2000,
+        "no_of_hospitals": 5,
+        "avg_capacity": 150,
+        "pm2_5": req.aqi_index * 0.6,
+        "pm10": req.aqi_index * 0.4,
+        "temperature_mean_c": req.temperature_mean_c,
+        "relative_humidity_mean": req.relative_humidity_mean,
+        "uv_index_mean": req.uv_index_mean,
+        "rain_mm": req.rain_mm,
+        "is_weekend": 0,
+        "is_festival": 0,
+        "school_open": 1,
+        "month": datetime.now().month,
+        "respiratory_risk": 0.3,
+        "flu_risk": 0.3,
+        "vector_risk": 0.3,
+        "gastro_risk": 0.3,
+    }
+    lags = get_lag_store().lags(req.pincode)  # NaN for unknown days, filled with 0.0 below
+    for li, lag in enumerate(LAG_DAYS):
+        for c, col in enumerate(LAG_COLUMNS):
+            base[f"{col}_lag{lag}"] = 0.0 if lags is None else float(lags[li, c])
+
+    df = pd.DataFrame([base])
+    for f in features:
+        if f not in df.columns:
+            df[f] = 0.0
+    df = df[features].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    return df
+
+
+def check_parity(bundle: Dict[str, Any], reqs: List[Agent1Request]) -> int:
+    features = bundle["features"]
+    encoder = _feature_encoder(features)
+    engine = InferenceEngine(bundle)
+    mismatches = 0
+    for req in reqs:
+        df = reference_feature_frame(req, features)
+        X = _build_feature_matrix([req], encoder)
+        if not np.array_equal(df.to_numpy(dtype=float), X):
+            mismatches += 1
+            continue
+        ref_load = bundle["load_model"].predict(df)
+        ref_disease = bundle["disease_model"].predict(df).astype(str)
+        out = engine.predict(X)
+        if not (np.allclose(ref_load, out.load, rtol=0, atol=1e-9) and np.array_equal(ref_disease, out.disease)):
+            mismatches += 1
+    return mismatches
+
+
+def per_row_us(fn, reqs: List[Agent1Request]) -> float:
+    t0 = time.perf_counter()
+    for req in reqs:
+        fn(req)
+    return (time.perf_counter() - t0) / len(reqs) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=2000)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    bundle = _load_models(MODEL_PATH)
+    features = bundle["features"]
+    load_model, disease_model = bundle["load_model"], bundle["disease_model"]
+    encoder = _feature_encoder(features)
+    engine = InferenceEngine(bundle)
+    reqs = [Agent1Request(**p) for p in make_payloads(args.n)]
+
+    mismatches = check_parity(bundle, reqs)
+    results = {
+        "n": args.n,
+        "mismatches": mismatches,
+        "build_us": {
+            "pandas": per_row_us(lambda r: reference_feature_frame(r, features), reqs),
+            "encoder": per_row_us(lambda r: _build_feature_matrix([r], encoder), reqs),
+        },
+        "build_and_predict_us": {
+            "pandas": per_row_us(lambda r: (lambda df: (load_model.predict(df), disease_model.predict(df)))(
+                reference_feature_frame(r, features)), reqs),
+            "encoder": per_row_us(lambda r: engine.predict(_build_feature_matrix([r], encoder)), reqs),
+        },
+    }
+
+    print(f"parity: {args.n - mismatches}/{args.n} rows identical")
+    for stage in ("build_us", "build_and_predict_us"):
+        old, new = results[stage]["pandas"], results[stage]["encoder"]
+        print(f"{stage:>22}: pandas {old:9.1f} us/row   encoder {new:9.1f} us/row   ({old / new:.1f}x)")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Tiny trained model fixture: synthetic CSVs (benchmarks/synthetic_data.py)
+run through the real training pipeline with a handful of trees per head.
+
+    python -m benchmarks.fixture --scale 1 --out /tmp/bench/scale-1 [--trees 50] [--force] [--json out.json]
+
+Writes the CSVs, the Parquet copy and Dataset cache, the joblib bundle and a
+lag store to --out, and times each stage (generate, ingest, dataset, train,
+lag_store) with the process's peak RSS after each. The paths are what the
+agent and API read through HOSPITAL_DATA_PATH / FORECAST_MODEL_PATH /
+LAG_STORE_PATH (see fixture_env). An existing fixture with the same
+parameters is reused unless --force; training is then not re-timed.
+"""
+from __future__ import annotations
+from dataclasses import replace
+from typing import Any, Dict
+import argparse
+import json
+import os
+import shutil
+import time
+
+BENCH_FIXTURE_TREES = int(os.getenv("BENCH_FIXTURE_TREES", "50"))
+
+
+def fixture_env(fixture: Dict[str, Any]) -> Dict[str, str]:
+    """Environment that points the agent / API at a fixture (caches off, so every request reaches the model)."""
+    return {
+        "FORECAST_MODEL_PATH": fixture["model_path"],
+        "HOSPITAL_DATA_PATH": fixture["hospitals_csv"],
+        "LAG_STORE_PATH": fixture["lag_store_path"],
+        "FORECAST_CACHE_ENABLED": "0",
+        "FORECAST_TABLE_ENABLED": "0",
+    }
+
+
+def build_fixture(out_dir: str, scale: int = 1, days: int = 365, trees: int = BENCH_FIXTURE_TREES,
+                  seed: int = 0, force: bool = False) -> Dict[str, Any]:
+    """Builds (or reuses) the fixture in `out_dir`; returns its paths, stage seconds and peak RSS."""
+    params = {"scale": scale, "days": days, "trees": trees, "seed": seed}
+    meta_path = os.path.join(out_dir, "fixture.json")
+    if not force and os.path.exists(meta_path):
+        with open(meta_path) as fh:
+            fixture = json.load(fh)
+        if fixture.get("params") == params and os.path.exists(fixture["model_path"]):
+            return {**fixture, "reused": True}
+
+    # Imported here so `fixture_env` stays cheap for callers that only need the paths.
+    import joblib
+    from benchmarks.synthetic_data import write_csvs
+    from lag_store import build_lag_store
+    from series_forecaster import SeriesRing
+    from training_data import CAT_COLUMNS, build_training_data, category_codes, convert_csv_to_parquet, \
+        list_partitions, read_partition
+    from training_driver import HEADS, train_heads
+    from training_features import peak_rss_mb
+
+    parquet_dir = os.path.join(out_dir, "patient_load_parquet")
+    cache_dir = os.path.join(out_dir, "train_dataset_cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    stages: Dict[str, Dict[str, float]] = {}
+
+    def stage(name: str, t0: float) -> None:
+        stages[name] = {"seconds": round(time.perf_counter() - t0, 3), "peak_rss_mb": round(peak_rss_mb(), 1)}
+        print(f"⏱️ {name}: {stages[name]['seconds']:.2f}s, peak RSS {stages[name]['peak_rss_mb']:.0f} MB")
+
+    t0 = time.perf_counter()
+    paths = write_csvs(out_dir, scale, days, seed)
+    stage("generate", t0)
+
+    t0 = time.perf_counter()
+    convert_csv_to_parquet(paths["history"], parquet_dir, force=True)
+    stage("ingest", t0)
+
+    t0 = time.perf_counter()
+    data = build_training_data(parquet_dir, cache_dir)
+    stage("dataset", t0)
+
+    t0 = time.perf_counter()
+    models, report = train_heads(data, [replace(h, num_boost_round=trees) for h in HEADS])
+    model_path = os.path.join(out_dir, "model.joblib")
+    joblib.dump({**models, "features": data.features}, model_path)
+    stage("train", t0)
+
+    t0 = time.perf_counter()
+    codes = category_codes(parquet_dir, CAT_COLUMNS)
+    ring = SeriesRing.concat([SeriesRing.from_frame(read_partition(parquet_dir, city, codes=codes))
+                              for city in list_partitions(parquet_dir)])
+    lag_store_path = os.path.join(out_dir, "lag_store.bin")
+    build_lag_store(lag_store_path, ring)
+    stage("lag_store", t0)
+
+    fixture = {
+        "params": params,
+        "hospitals_csv": paths["hospitals"],
+        "history_csv": paths["history"],
+        "parquet_dir": parquet_dir,
+        "model_path": model_path,
+        "lag_store_path": lag_store_path,
+        "n_series": len(ring),
+        "n_train_rows": data.n_rows,
+        "stages": stages,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "training": {k: report[k] for k in ("wall_s", "jobs", "threads_per_job", "n_rows")},
+    }
+    with open(meta_path, "w") as fh:
+        json.dump(fixture, fh, indent=2)
+    return {**fixture, "reused": False}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--trees", type=int, default=BENCH_FIXTURE_TREES, help="boosting rounds per head")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--force", action="store_true", help="rebuild even if a matching fixture exists")
+    ap.add_argument("--json", help="write the fixture description to this file")
+    args = ap.parse_args()
+
+    fixture = build_fixture(args.out, args.scale, args.days, args.trees, args.seed, args.force)
+    print(f"{'reused' if fixture['reused'] else 'built'} scale-{args.scale} fixture: {fixture['n_series']:,} series, "
+          f"{fixture['n_train_rows']:,} training rows, model {fixture['model_path']}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(fixture, fh, indent=2)
+
+
+# Guarded: training workers are spawned processes that re-import this module.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Cost of the recursive forecast vs. horizon and vs. history length, and a
+check that every lag is rolled forward correctly.
+
+    python -m benchmarks.forecast_horizon [--rows 2000] [--days 1,2,3,7,14] [--history 30,180,730] [--json out.json]
+
+1. Parity: app.forecast_arrays and the agent's _forecast_many over 14 days
+   are compared with a naive reference that appends each prediction to a
+   per-row list and reads lag k as the k-th last entry.
+2. Horizon sweep: serving forecast time for --rows pincodes per horizon.
+3. History sweep: series_forecaster on rings built from synthetic histories
+   of different lengths; the forecast step only touches the 14-day window.
+
+Exits non-zero if the parity check fails.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import app
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+from forecast_horizon import MAX_FORECAST_DAYS
+from inference_engine import HeadOutputs, InferenceEngine
+from lag_store import get_lag_store
+from model_registry import get_model_bundle
+from series_forecaster import SeriesRing, forecast_series
+from training_data import BASE_FEATURES
+import ML_andRetriever_agent as agent
+from benchmarks.batch_forecast import make_payloads
+
+
+def reference_forecast(X0: np.ndarray, encoder: Any, pincodes: List[Any], engine: InferenceEngine,
+                       days: int) -> HeadOutputs:
+    """Row-by-row lag bookkeeping on plain lists: lag k of the next day is series[-k]."""
+    store = get_lag_store()
+    series = []
+    for p in pincodes:
+        h = store.history(p)
+        rows = list(h.astype(np.float64)) if h is not None else [np.full(len(LAG_COLUMNS), np.nan)] * max(LAG_DAYS)
+        series.append(rows)
+
+    steps = []
+    for _ in range(days):
+        X = X0.copy()
+        for j, rows in enumerate(series):
+            for c, column in enumerate(LAG_COLUMNS):
+                for k in LAG_DAYS:
+                    i = encoder.col(f"{column}_lag{k}")
+                    if i is not None:
+                        X[j, i] = encoder.template[i] if np.isnan(rows[-k][c]) else rows[-k][c]
+        step = engine.predict(X)
+        steps.append(step)
+        for j, rows in enumerate(series):
+            nxt = rows[-1].copy()
+            nxt[0] = step.load[j]
+            rows.append(nxt)
+    return HeadOutputs.stack(steps)
+
+
+def same(a: HeadOutputs, b: HeadOutputs) -> bool:
+    ok = np.allclose(a.load, b.load, rtol=0, atol=1e-9) and (a.disease == b.disease).all()
+    ok = ok and np.allclose(a.disease_confidence, b.disease_confidence, rtol=0, atol=1e-12)
+    if a.intensity is not None:
+        ok = ok and (a.intensity == b.intensity).all()
+    return bool(ok)
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def timed_forecast(ring: SeriesRing, bundle: Dict[str, Any], days: int) -> float:
+    t0 = time.perf_counter()
+    forecast_series(ring, bundle, days)
+    return time.perf_counter() - t0
+
+
+def synthetic_history(n_series: int, n_days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n = n_series * n_days
+    df = pd.DataFrame({c: rng.uniform(0, 100, n) for c in BASE_FEATURES})
+    df["city"] = np.repeat(np.arange(n_series) % 10, n_days)
+    df["pincode"] = np.repeat(600000 + np.arange(n_series), n_days)
+    df["date"] = np.tile(pd.date_range("2024-01-01", periods=n_days).to_numpy(), n_series)
+    for c in LAG_COLUMNS:
+        df[c] = rng.uniform(0, 300, n)
+    return df
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=2000, help="pincode rows per serving forecast")
+    ap.add_argument("--days", default="1,2,3,7,14")
+    ap.add_argument("--history", default="30,180,730", help="history lengths (days) for the series sweep")
+    ap.add_argument("--series", type=int, default=500)
+    ap.add_argument("--parity-rows", type=int, default=50)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    bundle = get_model_bundle()
+    engine = InferenceEngine(bundle)
+    results: Dict[str, Any] = {}
+
+    # ----- parity -----
+    payloads = make_payloads(args.parity_rows, seed=3)
+    reqs = [app.ForecastRequest(**p) for p in payloads]
+    api_encoder = app.compile_encoder(bundle["features"], app.FEATURE_DEFAULTS)
+    api_ref = reference_forecast(app.make_base_input_batch(reqs, api_encoder), api_encoder,
+                                 [r.pincode for r in reqs], engine, MAX_FORECAST_DAYS)
+    api_ok = same(app.forecast_arrays(reqs, bundle, MAX_FORECAST_DAYS), api_ref)
+
+    a_reqs = [agent.Agent1Request(**p) for p in payloads]
+    a_encoder = agent._feature_encoder(bundle["features"])
+    agent_ref = reference_forecast(agent._build_feature_matrix(a_reqs, a_encoder), a_encoder,
+                                   [r.pincode for r in a_reqs], engine, MAX_FORECAST_DAYS)
+    agent_ok = same(agent._forecast_many(a_reqs, bundle, MAX_FORECAST_DAYS), agent_ref)
+    # Day i of a forecast does not depend on the horizon it is part of.
+    prefix_ok = same(app.forecast_arrays(reqs, bundle, 3), app.forecast_arrays(reqs, bundle, 14).first(3))
+    parity_ok = api_ok and agent_ok and prefix_ok
+    results["parity"] = {"api": api_ok, "agent1": agent_ok, "prefix": prefix_ok}
+    print(f"parity vs reference ({MAX_FORECAST_DAYS} days, {args.parity_rows} rows): "
+          f"api {'OK' if api_ok else 'FAIL'}, agent1 {'OK' if agent_ok else 'FAIL'}, "
+          f"3-day prefix {'OK' if prefix_ok else 'FAIL'}")
+
+    # ----- horizon sweep -----
+    reqs = [app.ForecastRequest(**p) for p in make_payloads(args.rows, seed=4)]
+    horizons = [int(d) for d in args.days.split(",")]
+    sweep = []
+    print(f"\n{'days':>5} {'seconds':>9} {'ms/day':>8}   ({args.rows} rows)")
+    for days in horizons:
+        s = best_of(lambda: app.forecast_arrays(reqs, bundle, days))
+        sweep.append({"days": days, "seconds": s, "ms_per_day": s / days * 1e3})
+        print(f"{days:>5} {s:>9.4f} {s / days * 1e3:>8.2f}")
+    slope, intercept = np.polyfit(horizons, [r["seconds"] for r in sweep], 1)
+    fitted = np.polyval([slope, intercept], horizons)
+    actual = np.array([r["seconds"] for r in sweep])
+    r2 = 1 - ((actual - fitted) ** 2).sum() / ((actual - actual.mean()) ** 2).sum()
+    results["horizon"] = {"rows": args.rows, "runs": sweep, "seconds_per_day": slope,
+                          "fixed_seconds": intercept, "r2": r2}
+    print(f"linear fit: {slope * 1e3:.2f} ms/day + {intercept * 1e3:.2f} ms fixed (R^2 {r2:.4f})")
+
+    # ----- history sweep -----
+    print(f"\n{'history':>8} {'ring build s':>13} {'7-day forecast s':>17}   ({args.series} series)")
+    hist = []
+    for n_days in (int(h) for h in args.history.split(",")):
+        df = synthetic_history(args.series, n_days)
+        build_s = best_of(lambda: SeriesRing.from_frame(df))
+        forecast_s = min(timed_forecast(SeriesRing.from_frame(df), bundle, 7) for _ in range(3))
+        hist.append({"history_days": n_days, "ring_build_seconds": build_s, "forecast_seconds": forecast_s})
+        print(f"{n_days:>8} {build_s:>13.4f} {forecast_s:>17.4f}")
+    results["history"] = {"series": args.series, "runs": hist}
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if not parity_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
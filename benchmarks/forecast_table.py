@@ -0,0 +1,145 @@
+"""
+Serving /predict_forecast and run_agent1 from the materialized daily table
+vs. computing the forecast live.
+
+    python -m benchmarks.forecast_table [--lookups 20000] [--threads 16] [--json out.json]
+
+Writes a synthetic baseline (one reading per hospital pincode) to a temp
+dir, materializes the table there, then checks that every baseline request
+served from the table equals the live forecast (forecast cache cleared) and
+that off-baseline requests fall back to live inference. Times single-thread
+and concurrent table reads. Exits non-zero on any mismatch or if the
+single-thread p99 read exceeds --budget-ms.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+import app
+from forecast_cache import forecast_cache, quantize
+from forecast_horizon import FORECAST_DAYS
+from forecast_table import forecast_table, materialize
+from lag_store import get_lag_store
+from model_registry import get_registry
+from ML_andRetriever_agent import HOSPITAL_DATA_PATH, get_hospital_store, run_agent1
+from benchmarks.batch_forecast import make_payloads
+
+
+def latency_ms(fn: Callable[[], Any], n: int) -> np.ndarray:
+    out = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - t0
+    return out * 1e3
+
+
+def summary(lat: np.ndarray) -> Dict[str, float]:
+    return {"p50_ms": float(np.percentile(lat, 50)), "p99_ms": float(np.percentile(lat, 99)),
+            "mean_ms": float(lat.mean())}
+
+
+def live(fn: Callable[[], Any]) -> Any:
+    """fn() with the table off and an empty forecast cache, i.e. computed by the model."""
+    forecast_table.enabled = False
+    forecast_cache.clear()
+    try:
+        return fn()
+    finally:
+        forecast_table.enabled = True
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lookups", type=int, default=20000)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--budget-ms", type=float, default=1.0, help="single-thread p99 table read budget")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="forecast_table_")
+    baseline_path, table_path = os.path.join(tmp, "baseline.csv"), os.path.join(tmp, "table.sqlite3")
+    # make_payloads cycles through the hospital pincodes: one reading each.
+    baseline = make_payloads(len(get_hospital_store(HOSPITAL_DATA_PATH).pincodes()), seed=7)
+    pd.DataFrame(baseline).to_csv(baseline_path, index=False)
+
+    t0 = time.perf_counter()
+    built = materialize(baseline_path, table_path)
+    build_s = time.perf_counter() - t0
+    forecast_table.path = table_path
+    forecast_table.reload()
+    print(f"materialized {built['pincodes']} pincodes x {len(built['seconds'])} namespaces in {build_s:.2f}s "
+          f"({built['bytes'] / 1024:.1f} KiB)")
+
+    # ----- parity -----
+    mismatches = 0
+    for p in baseline:
+        off = {**p, "aqi_index": p["aqi_index"] + 50}
+        for payload, expect_hit in ((p, True), (off, False)):
+            req = app.ForecastRequest(**payload)
+            hits = forecast_table.hits
+            served = app.cached_forecast(req)
+            agent = run_agent1(payload)
+            hit = forecast_table.hits - hits == 2
+            ok = (hit == expect_hit and served == live(lambda: app.cached_forecast(req))
+                  and agent == live(lambda: run_agent1(payload)))
+            mismatches += int(not ok)
+    print(f"parity: {'OK' if not mismatches else f'{mismatches} mismatching payloads'} "
+          f"({len(baseline)} baseline + {len(baseline)} off-baseline requests)")
+
+    # ----- latency -----
+    q = quantize(baseline[0], forecast_cache.buckets)
+    version = f"{get_registry().version}:{get_lag_store().version}"
+    get = lambda: forecast_table.get("api", version, q, forecast_cache.buckets, FORECAST_DAYS)
+    req = app.ForecastRequest(**baseline[0])
+    results: Dict[str, Any] = {"build_seconds": build_s, "build": built}
+    results["table_get"] = summary(latency_ms(get, args.lookups))
+    results["cached_forecast_table_hit"] = summary(latency_ms(lambda: app.cached_forecast(req), 2000))
+    results["cached_forecast_live"] = summary(latency_ms(lambda: live(lambda: app.cached_forecast(req)), 200))
+    results["run_agent1_table_hit"] = summary(latency_ms(lambda: run_agent1(baseline[0]), 2000))
+    results["run_agent1_live"] = summary(latency_ms(lambda: live(lambda: run_agent1(baseline[0])), 200))
+
+    lat: List[float] = []
+
+    def worker(n: int) -> None:
+        for _ in range(n):
+            t0 = time.perf_counter()
+            get()
+            lat.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(worker, [args.lookups // args.threads] * args.threads))
+    wall = time.perf_counter() - t0
+    results["table_get_concurrent"] = {**summary(np.array(lat) * 1e3), "threads": args.threads,
+                                       "lookups_per_s": len(lat) / wall}
+
+    print(f"{'path':>28} {'p50 ms':>8} {'p99 ms':>8}")
+    for name in ("table_get", "cached_forecast_table_hit", "cached_forecast_live",
+                 "run_agent1_table_hit", "run_agent1_live", "table_get_concurrent"):
+        r = results[name]
+        print(f"{name:>28} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}")
+    print(f"concurrent reads: {results['table_get_concurrent']['lookups_per_s']:,.0f} lookups/s "
+          f"on {args.threads} threads")
+    print(f"table metrics: {forecast_table.metrics()}")
+
+    p99 = results["table_get"]["p99_ms"]
+    ok = p99 <= args.budget_ms
+    print(f"single-thread p99 table read: {p99:.3f}ms (budget {args.budget_ms:.3f}ms) {'OK' if ok else 'MISSED'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2, default=str)
+    if mismatches or not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cost of serving all three heads with InferenceEngine.predict vs. the old two
+separate calls (load + disease labels), and vs. three heads done naively
+(labels and probabilities as separate calls per classifier).
+
+    python -m benchmarks.inference_engine [--sizes 1,10,100,1000,10000] [--json out.json]
+
+Exits non-zero if the engine's loads / labels differ from the per-head calls.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import json
+import sys
+import numpy as np
+
+from ML_andRetriever_agent import MODEL_PATH, _load_models
+from feature_encoder import predict_values, predict_proba
+from inference_engine import InferenceEngine
+from benchmarks.tree_evaluator import make_rows, best_of
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1,10,100,1000,10000")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    bundle = _load_models(MODEL_PATH)
+    load_model, disease_model = bundle["load_model"], bundle["disease_model"]
+    intensity_model = bundle.get("intensity_model")
+    if intensity_model is None:
+        sys.exit("Bundle has no intensity_model; retrain with train_patient_forecast_model.py first")
+    engine = InferenceEngine(bundle)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    X_all = make_rows(bundle, max(sizes))
+
+    def two_heads(X):
+        return predict_values(load_model, X), disease_model.predict(X)
+
+    def three_heads_naive(X):
+        return (predict_values(load_model, X),
+                disease_model.predict(X), predict_proba(disease_model, X).max(axis=1),
+                intensity_model.predict(X), predict_proba(intensity_model, X).max(axis=1))
+
+    mismatches = 0
+    rows: List[Dict[str, Any]] = []
+    print(f"{'n':>7} {'2 heads ms':>11} {'3 naive ms':>11} {'engine ms':>10} {'vs 2 heads':>11}")
+    for n in sizes:
+        X = X_all[:n]
+        out = engine.predict(X)
+        mismatches += int(not np.allclose(out.load, predict_values(load_model, X), rtol=0, atol=1e-9))
+        mismatches += int(not np.array_equal(out.disease, disease_model.predict(X).astype(str)))
+        mismatches += int(not np.array_equal(out.intensity, intensity_model.predict(X).astype(str)))
+
+        repeat = 20 if n <= 100 else 3
+        row = {
+            "n": n,
+            "two_heads_ms": best_of(lambda: two_heads(X), repeat) * 1e3,
+            "three_heads_naive_ms": best_of(lambda: three_heads_naive(X), repeat) * 1e3,
+            "engine_ms": best_of(lambda: engine.predict(X), repeat) * 1e3,
+        }
+        row["engine_overhead"] = row["engine_ms"] / row["two_heads_ms"]
+        rows.append(row)
+        print(f"{n:>7} {row['two_heads_ms']:>11.3f} {row['three_heads_naive_ms']:>11.3f} "
+              f"{row['engine_ms']:>10.3f} {row['engine_overhead']:>10.2f}x")
+
+    print(f"\nparity: {'OK' if not mismatches else f'{mismatches} mismatches'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(rows, fh, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Parity check, runtime and memory: one-pass float32 lag block
+(training_features.py) vs. the previous 30x groupby().shift() loop.
+
+    python -m benchmarks.lag_features [--pincodes 200] [--days 730] [--csv history.csv] [--json out.json]
+
+Without --csv a synthetic history of pincodes x days is generated.
+Exits non-zero if any lag value or load_diff differs from the groupby path.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Tuple
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from feature_encoder import LAG_COLUMNS
+from training_data import cast_history_dtypes
+from training_features import add_lag_features, group_diff, frame_mb
+
+
+def reference_add_lag_features(df, lag_days=[1, 2, 3, 7, 14]):
+    """add_lag_features from train_patient_forecast_model.py before the rewrite (verbatim)."""
+    for lag in lag_days:
+        for col in ['patient_load', 'respiratory_cases', 'flu_cases', 'vector_cases', 'gastro_cases', 'other_cases']:
+            df[f'{col}_lag{lag}'] = df.groupby(['city', 'pincode'])[col].shift(lag)
+    return df
+
+
+def make_history(pincodes: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """Sorted (city, pincode, date) frame with the columns the lag stage touches."""
+    rng = np.random.default_rng(seed)
+    n = pincodes * days
+    df = pd.DataFrame({
+        "city": np.repeat(np.arange(pincodes) // 10, days),
+        "pincode": np.repeat(560000 + np.arange(pincodes), days),
+        "date": np.tile(pd.date_range("2023-01-01", periods=days).to_numpy(), pincodes),
+        "is_weekend": rng.integers(0, 2, n),
+        "is_festival": rng.integers(0, 2, n),
+        "school_open": rng.integers(0, 2, n),
+        "month": rng.integers(1, 13, n),
+        "patient_load": rng.normal(200, 40, n).round(),
+    })
+    for col in LAG_COLUMNS[1:]:
+        df[col] = rng.integers(0, 80, n)
+    return df
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+    """(result, seconds, peak traced MB) for one call."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pincodes", type=int, default=200)
+    ap.add_argument("--days", type=int, default=730)
+    ap.add_argument("--csv", help="history CSV in the training format instead of synthetic data")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        df.columns = [c.strip().lower() for c in df.columns]
+        df["date"] = pd.to_datetime(df["date"])
+        df = df.sort_values(["city", "pincode", "date"]).reset_index(drop=True)
+    else:
+        df = make_history(args.pincodes, args.days)
+    input_mb = frame_mb(df)
+
+    old, old_s, old_peak = measure(lambda: reference_add_lag_features(df.copy()).dropna().reset_index(drop=True))
+    new, new_s, new_peak = measure(lambda: add_lag_features(cast_history_dtypes(df.copy())).dropna().reset_index(drop=True))
+
+    lag_cols = [c for c in old.columns if "_lag" in c]
+    same_rows = len(old) == len(new)
+    value_mismatches = int(sum(
+        (~np.isclose(old[c].to_numpy(float), new[c].to_numpy(float), rtol=1e-6, atol=0)).sum() for c in lag_cols
+    )) if same_rows else -1
+    ref_diff = old.groupby(["city", "pincode"])["patient_load"].diff().fillna(0).to_numpy()
+    diff_mismatches = int((~np.isclose(ref_diff, group_diff(new, "patient_load"))).sum()) if same_rows else -1
+
+    results: Dict[str, Any] = {
+        "rows": len(df),
+        "input_mb": round(input_mb, 2),
+        "groupby": {"seconds": round(old_s, 3), "peak_mb": round(old_peak, 1), "output_mb": round(frame_mb(old), 1)},
+        "one_pass": {"seconds": round(new_s, 3), "peak_mb": round(new_peak, 1), "output_mb": round(frame_mb(new), 1)},
+        "value_mismatches": value_mismatches,
+        "diff_mismatches": diff_mismatches,
+    }
+
+    print(f"rows: {len(df):,} ({input_mb:.1f} MB in)")
+    for name in ("groupby", "one_pass"):
+        r = results[name]
+        print(f"{name:>9}: {r['seconds']:7.3f}s  peak {r['peak_mb']:8.1f} MB  output {r['output_mb']:8.1f} MB")
+    print(f"speedup: {old_s / new_s:.1f}x   peak memory: {old_peak / new_peak:.1f}x lower")
+    print(f"parity: {value_mismatches} lag mismatches, {diff_mismatches} load_diff mismatches")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if value_mismatches or diff_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
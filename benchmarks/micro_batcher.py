@@ -0,0 +1,103 @@
+"""
+Throughput and latency of /predict_forecast's compute path under concurrent
+load, with and without the micro-batcher.
+
+    python -m benchmarks.micro_batcher [--concurrency 1,8,32,64] [--requests 2000] [--json out.json]
+
+Each of `concurrency` threads calls app.cached_forecast back to back (forecast
+cache off, so every call reaches the model). Reports requests/s, p50/p99
+latency and the batcher's batch-size histogram. Exits non-zero if batched and
+unbatched predictions differ.
+"""
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+import argparse
+import json
+import sys
+import time
+import numpy as np
+
+import app
+from micro_batcher import MicroBatcher
+from benchmarks.batch_forecast import make_payloads
+
+
+def drive(reqs: List[Any], concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+
+    def call(req):
+        t0 = time.perf_counter()
+        preds = app.cached_forecast(req)
+        latencies.append(time.perf_counter() - t0)
+        return preds
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, reqs))
+    wall = time.perf_counter() - t0
+    lat = np.array(latencies) * 1e3
+    return {
+        "rps": len(reqs) / wall,
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--concurrency", default="1,8,32,64")
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--wait-ms", type=float, default=None, help="override MICRO_BATCH_WAIT_MS")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    app.forecast_cache.enabled = False
+    reqs = [app.ForecastRequest(**p) for p in make_payloads(args.requests, seed=3)]
+    batcher = app.forecast_batcher
+    if args.wait_ms is not None:
+        batcher = app.forecast_batcher = MicroBatcher(app.forecast_group, wait_ms=args.wait_ms, max_size=batcher.max_size)
+
+    mismatches = 0
+    rows: List[Dict[str, Any]] = []
+    print(f"{'threads':>7} {'off rps':>9} {'off p50':>8} {'off p99':>8} {'on rps':>9} {'on p50':>8} {'on p99':>8} {'mean batch':>10}")
+    for c in (int(x) for x in args.concurrency.split(",")):
+        batcher.enabled = False
+        off = drive(reqs, c)
+        batcher.enabled = True
+        before = batcher.metrics()
+        on = drive(reqs, c)
+        after = batcher.metrics()
+        # pool.map keeps input order, so the two runs line up request by request.
+        for a, b in zip(off["results"], on["results"]):
+            mismatches += int(any(
+                abs(x["predicted_patient_load"] - y["predicted_patient_load"]) > 1e-9
+                or x["predicted_disease_spike"] != y["predicted_disease_spike"]
+                or x["predicted_intensity"] != y["predicted_intensity"]
+                for x, y in zip(a, b)
+            ))
+        batches = after["batches"] - before["batches"]
+        row = {
+            "concurrency": c,
+            "off": {k: v for k, v in off.items() if k != "results"},
+            "on": {k: v for k, v in on.items() if k != "results"},
+            "mean_batch_size": (after["items"] - before["items"]) / max(1, batches),
+        }
+        rows.append(row)
+        print(f"{c:>7} {off['rps']:>9.0f} {off['p50_ms']:>8.2f} {off['p99_ms']:>8.2f} "
+              f"{on['rps']:>9.0f} {on['p50_ms']:>8.2f} {on['p99_ms']:>8.2f} {row['mean_batch_size']:>10.1f}")
+
+    metrics = batcher.metrics()
+    print(f"\nbatch sizes: {metrics['batch_size_histogram']['buckets']}")
+    print(f"queue wait ms: {metrics['queue_wait_ms_histogram']['buckets']}")
+    print(f"parity: {'OK' if not mismatches else f'{mismatches} mismatching requests'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"runs": rows, "batcher": metrics}, fh, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
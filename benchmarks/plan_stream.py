@@ -0,0 +1,118 @@
+"""
+Time to first hospital plan with /plan/stream vs. waiting for the whole
+planner response, using the local fake streaming LLM (no network).
+
+    python -m benchmarks.plan_stream [--pincodes 5] [--latency 0.3] [--chunk-latency 0.01] [--modes llm hybrid]
+
+Streams each payload through the API (NDJSON over a local uvicorn server,
+so chunks arrive as they are flushed) and checks that the "plan" events and
+the final "done" plan match AsyncPlanner.plan() on the same payload. Exits
+non-zero on any mismatch.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import app
+from llm_cache import llm_cache
+from llm_recommendation_agent import AsyncPlanner, run_agent1
+from benchmarks.batch_forecast import make_payloads
+from benchmarks.fake_llm import FakeStreamingLLMClient
+
+
+def start_server() -> tuple:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def stream_once(client: httpx.Client, payload: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    first_plan = None
+    events: List[Dict[str, Any]] = []
+    with client.stream("POST", f"/plan/stream?mode={mode}&format=ndjson", json=payload) as r:
+        for line in r.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            events.append(event)
+            if event["event"] == "plan" and first_plan is None:
+                first_plan = time.perf_counter() - t0
+    return {"first_plan_s": first_plan, "total_s": time.perf_counter() - t0, "events": events}
+
+
+def strip_timing(plan: Dict[str, Any]) -> Dict[str, Any]:
+    stats = {k: v for k, v in plan.get("plannerStats", {}).items() if k != "shardLatencyS"}
+    return {**plan, "plannerStats": stats}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pincodes", type=int, default=5)
+    ap.add_argument("--latency", type=float, default=0.3, help="fake LLM seconds to first chunk")
+    ap.add_argument("--chunk-chars", type=int, default=40)
+    ap.add_argument("--chunk-latency", type=float, default=0.01, help="fake LLM seconds per chunk")
+    ap.add_argument("--modes", nargs="+", default=["llm", "hybrid"])
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    llm_cache.enabled = False  # every request really streams from the (fake) LLM
+    fake = FakeStreamingLLMClient(args.latency, args.chunk_chars, args.chunk_latency)
+    app._plan_streamer = AsyncPlanner(client=fake)
+    reference = AsyncPlanner(client=fake)
+    payloads = make_payloads(args.pincodes, seed=5)
+    run_agent1(payloads[0])  # warm the model registry and hospital store
+
+    mismatches = 0
+    results: Dict[str, Any] = {}
+    server, base_url = start_server()
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        for mode in args.modes:
+            runs = []
+            for payload in payloads:
+                run = stream_once(client, payload, mode)
+                t0 = time.perf_counter()
+                expected = asyncio.run(reference.plan(payload, mode))
+                blocking_s = time.perf_counter() - t0
+
+                done = [e["data"] for e in run["events"] if e["event"] == "done"]
+                plans = [e["data"] for e in run["events"] if e["event"] == "plan"]
+                by_id = {p["hospital_id"]: p for p in expected["hospitalPlans"]}
+                ok = (len(done) == 1 and strip_timing(done[0]) == strip_timing(expected)
+                      and len(plans) == len(by_id) and all(by_id.get(p["hospital_id"]) == p for p in plans))
+                mismatches += int(not ok)
+                runs.append({"first_plan_s": run["first_plan_s"], "stream_total_s": run["total_s"],
+                             "blocking_s": blocking_s, "plans": len(plans), "ok": ok})
+
+            med = {k: statistics.median(r[k] for r in runs if r[k] is not None)
+                   for k in ("first_plan_s", "stream_total_s", "blocking_s", "plans")}
+            results[mode] = {"runs": runs, "median": med}
+            print(f"{mode:>7}: first plan {med['first_plan_s']:.3f}s, stream done {med['stream_total_s']:.3f}s, "
+                  f"non-streaming plan() {med['blocking_s']:.3f}s ({med['plans']:.0f} hospitals)")
+
+    server.should_exit = True
+    print(f"parity: {'OK' if not mismatches else f'{mismatches} mismatching payloads'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Memory of N API workers started by serve.py with the models preloaded in the
+parent (shared copy-on-write) vs. loaded separately in every worker.
+
+    python -m benchmarks.prefork_memory [--workers 1,2,4] [--requests 200] [--json out.json]
+
+For each worker count and mode, serve.py is started on a free port, every
+worker is driven with forecast requests, and RSS / PSS / shared / private
+memory is read from /proc (Linux only). "footprint" is the PSS of parent +
+workers: the real memory used, with shared pages counted once.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from serve import memory_report
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BODY = json.dumps({"pincode": 600002, "aqi_index": 90, "temperature_mean_c": 28,
+                   "relative_humidity_mean": 60, "rain_mm": 1, "uv_index_mean": 3.5}).encode()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as fh:
+        return [int(p) for p in fh.read().split()]
+
+
+def wait_ready(port: int, workers: int, timeout_s: float = 60.0) -> None:
+    # Connections land on arbitrary workers; require a run of consecutive 200s.
+    deadline = time.monotonic() + timeout_s
+    streak = 0
+    while streak < workers * 10:
+        if time.monotonic() > deadline:
+            raise TimeoutError("workers did not become ready")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=2) as r:
+                streak = streak + 1 if r.status == 200 else 0
+        except OSError:
+            streak = 0
+            time.sleep(0.1)
+
+
+def drive(port: int, n: int) -> None:
+    for _ in range(n):
+        req = urllib.request.Request(f"http://127.0.0.1:{port}/predict_forecast?chart=none", data=BODY,
+                                     headers={"content-type": "application/json"})
+        urllib.request.urlopen(req, timeout=10).read()
+
+
+def measure(workers: int, preload: bool, requests: int) -> Dict[str, Any]:
+    port = free_port()
+    cmd = [sys.executable, "-W", "ignore", "serve.py", "--workers", str(workers), "--port", str(port),
+           "--host", "127.0.0.1", "--report-interval", "0", "--log-level", "warning"]
+    if not preload:
+        cmd.append("--no-preload")
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port, workers)
+        drive(port, requests)
+        time.sleep(0.5)
+        return memory_report(proc.pid, children(proc.pid))
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    mib = lambda kb: kb / 1024
+    results: List[Dict[str, Any]] = []
+    print(f"{'workers':>7} {'mode':>10} {'sum rss':>9} {'sum pss':>9} {'shared/wkr':>11} {'private/wkr':>12} {'footprint':>10}")
+    for n in (int(w) for w in args.workers.split(",")):
+        for preload in (False, True):
+            report = measure(n, preload, args.requests)
+            t = report["totals"]
+            row = {"workers": n, "mode": "preload" if preload else "per-worker", **report}
+            results.append(row)
+            print(f"{n:>7} {row['mode']:>10} {mib(t['rss_kb']):>9.1f} {mib(t['pss_kb']):>9.1f} "
+                  f"{mib(t['shared_kb']) / n:>11.1f} {mib(t['private_kb']) / n:>12.1f} {mib(t['footprint_kb']):>10.1f}")
+    print("(MiB; footprint = PSS of parent + workers)")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+API cold start: import cost of app.py and time to the first healthy / ready
+response, for the background warm-up vs. warming before accepting traffic.
+
+    python -m benchmarks.startup [--runs 3] [--target-s 1.0] [--json out.json]
+
+Each run is a fresh interpreter: it imports app, starts it (lifespan) under
+TestClient, then polls /healthz and /readyz. Times are measured from the
+start of `import app`, so the test client's own imports are not counted.
+Also prints the slowest modules from `python -X importtime -c "import app"`.
+Exits non-zero if the median time to first healthy response (background
+mode) exceeds --target-s.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import json, time
+from fastapi.testclient import TestClient
+t0 = time.perf_counter()
+import app
+t_import = time.perf_counter()
+out = {"import_s": t_import - t0}
+with TestClient(app.app) as client:
+    assert client.get("/healthz").status_code == 200
+    out["healthy_s"] = time.perf_counter() - t0
+    while client.get("/readyz").status_code != 200:
+        if app.warmup.state == "failed":
+            raise SystemExit(json.dumps(app.warmup.status()))
+        time.sleep(0.005)
+    out["ready_s"] = time.perf_counter() - t0
+    client.post("/predict_forecast?chart=none", json={"pincode": 600002, "aqi_index": 90, "temperature_mean_c": 28,
+                                                      "relative_humidity_mean": 60, "rain_mm": 1, "uv_index_mean": 3.5})
+    out["first_forecast_s"] = time.perf_counter() - t0
+print(json.dumps(out))
+"""
+
+
+def run_child(mode: str) -> Dict[str, float]:
+    env = {**os.environ, "APP_WARMUP_MODE": mode, "PYTHONPATH": ROOT}
+    proc = subprocess.run([sys.executable, "-W", "ignore", "-c", CHILD], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def import_profile(top: int) -> List[Dict[str, Any]]:
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        # Nested imports are indented below their parent; keep direct imports of app.py and app itself.
+        depth = len(name) - len(name.lstrip()) - 1
+        if depth > 2:
+            continue
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1e3, "cumulative_ms": int(cum_us) / 1e3})
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:top]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--target-s", type=float, default=1.0, help="median import -> first /healthz 200 budget")
+    ap.add_argument("--top", type=int, default=10, help="slowest top-level imports to show")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+
+    results: Dict[str, Any] = {"imports": import_profile(args.top)}
+    print("slowest top-level imports of app.py (cumulative ms):")
+    for r in results["imports"]:
+        print(f"   {r['module']:<28} {r['cumulative_ms']:>8.1f}")
+
+    print(f"\n{'mode':>10} {'import s':>9} {'healthy s':>10} {'ready s':>8} {'1st forecast s':>15}")
+    for mode in ("background", "blocking"):
+        runs = [run_child(mode) for _ in range(args.runs)]
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        results[mode] = {"runs": runs, "median": med}
+        print(f"{mode:>10} {med['import_s']:>9.3f} {med['healthy_s']:>10.3f} {med['ready_s']:>8.3f} "
+              f"{med['first_forecast_s']:>15.3f}")
+
+    healthy = results["background"]["median"]["healthy_s"]
+    ok = healthy <= args.target_s
+    print(f"\ntime to first healthy response: {healthy:.3f}s (target {args.target_s:.3f}s) {'OK' if ok else 'MISSED'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
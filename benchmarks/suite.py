@@ -0,0 +1,276 @@
+"""
+End-to-end benchmark suite for Agent 1, the FastAPI service and training,
+on synthetic data at several scales. Results are saved as JSON so runs can
+be compared over time.
+
+    python -m benchmarks.suite [--scales 1,10,100] [--requests 300] [--concurrency 1,16,64] [--batch 2000]
+                               [--trees 50] [--fixtures DIR] [--reuse-fixtures] [--json out.json] [--compare old.json]
+
+For each scale a fresh interpreter builds the tiny model fixture
+(benchmarks/fixture.py: synthetic CSVs, real training pipeline), which gives
+training time and peak RSS per stage. A second interpreter, pointed at the
+fixture through the environment (forecast cache and table off, so every
+request reaches the model), then measures:
+
+- micro: _build_feature_matrix for 1 and 1,000 rows, _load_hospitals_by_pincode,
+  and add_lag_features over the whole history;
+- single requests: latency percentiles of run_agent1 and of
+  POST /predict_forecast through an in-process ASGI client;
+- batch: rows/s of run_agent1_batch and /predict_forecast/batch (NDJSON);
+- concurrent load: --concurrency clients on /predict_forecast over the ASGI
+  client, requests/s and latency percentiles.
+
+Results go to --json (default benchmarks/results/suite-<UTC time>.json)
+together with the git commit, Python version and CPU count. --compare prints
+every metric next to the same one from an earlier results file.
+"""
+from __future__ import annotations
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+from benchmarks.fixture import BENCH_FIXTURE_TREES, fixture_env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_FIXTURE_DIR = os.getenv("BENCH_FIXTURE_DIR", os.path.join(tempfile.gettempdir(), "project_life_bench"))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    lat = np.array(seconds) * 1e3
+    return {
+        "n": len(lat),
+        "mean_ms": round(float(lat.mean()), 4),
+        "p50_ms": round(float(np.percentile(lat, 50)), 4),
+        "p95_ms": round(float(np.percentile(lat, 95)), 4),
+        "p99_ms": round(float(np.percentile(lat, 99)), 4),
+        "max_ms": round(float(lat.max()), 4),
+    }
+
+
+def per_call(fn: Callable[[Any], Any], args: List[Any]) -> List[float]:
+    out = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(a)
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def best_of(fn: Callable[[], Any], repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# ---------- Measurements (child interpreter, environment already points at the fixture) ----------
+async def drive_http(client: Any, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    """`concurrency` clients posting `payloads` to /predict_forecast back to back."""
+    latencies: List[float] = []
+    queue = iter(payloads)
+
+    async def worker() -> None:
+        for p in queue:
+            t0 = time.perf_counter()
+            r = await client.post("/predict_forecast", params={"chart": "none"}, json=p)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+    return {"concurrency": concurrency, "rps": round(len(payloads) / wall, 1), **latency_stats(latencies)}
+
+
+def measure(fixture: Dict[str, Any], requests: int, concurrency: List[int], batch: int) -> Dict[str, Any]:
+    import httpx
+    import pandas as pd
+    import app
+    import ML_andRetriever_agent as agent
+    from training_features import add_lag_features
+    from benchmarks.batch_forecast import make_payloads
+
+    payloads = make_payloads(requests, seed=1)
+    agent.run_agent1(payloads[0])  # loads the bundle, lag store and hospital index
+    encoder = agent._feature_encoder(agent._load_models()["features"])
+    reqs = [agent.Agent1Request(**p) for p in make_payloads(1000, seed=2)]
+    pincodes = [r.pincode for r in reqs]
+
+    history = pd.read_csv(fixture["history_csv"])
+    history["date"] = pd.to_datetime(history["date"])
+    history = history.sort_values(["city", "pincode", "date"]).reset_index(drop=True)
+    lag_s = best_of(lambda: add_lag_features(history))
+    results: Dict[str, Any] = {"micro": {
+        "feature_matrix_1": latency_stats(per_call(lambda r: agent._build_feature_matrix([r], encoder), reqs)),
+        "feature_matrix_1000_s": round(best_of(lambda: agent._build_feature_matrix(reqs, encoder)), 5),
+        "hospitals_by_pincode": latency_stats(per_call(agent._load_hospitals_by_pincode, pincodes)),
+        "add_lag_features": {"rows": len(history), "seconds": round(lag_s, 4),
+                             "rows_per_s": round(len(history) / lag_s, 1)},
+    }}
+
+    async def http_runs() -> Tuple[List[float], float, List[Dict[str, Any]]]:
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            single = []
+            for p in payloads:
+                t0 = time.perf_counter()
+                (await client.post("/predict_forecast", params={"chart": "none"}, json=p)).raise_for_status()
+                single.append(time.perf_counter() - t0)
+            batch_payloads = make_payloads(batch, seed=3)
+            t0 = time.perf_counter()
+            r = await client.post("/predict_forecast/batch", json={"requests": batch_payloads})
+            r.raise_for_status()
+            assert len(r.text.splitlines()) == batch
+            batch_s = time.perf_counter() - t0
+            loads = [await drive_http(client, make_payloads(requests, seed=4), c) for c in concurrency]
+        return single, batch_s, loads
+
+    single_http, http_batch_s, loads = asyncio.run(http_runs())
+    results["single"] = {
+        "run_agent1": latency_stats(per_call(agent.run_agent1, payloads)),
+        "predict_forecast": latency_stats(single_http),
+    }
+    agent_batch_s = best_of(lambda: list(agent.run_agent1_batch(make_payloads(batch, seed=3))), repeat=1)
+    results["batch"] = {
+        "rows": batch,
+        "run_agent1_batch_rows_per_s": round(batch / agent_batch_s, 1),
+        "predict_forecast_batch_rows_per_s": round(batch / http_batch_s, 1),
+    }
+    results["concurrent"] = loads
+    return results
+
+
+# ---------- Orchestration ----------
+def run_child(args: List[str], env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Runs `python -m <args> --json <tmp>` in a fresh interpreter and returns the JSON it wrote."""
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        subprocess.run([sys.executable, "-W", "ignore", "-m", *args, "--json", path], cwd=ROOT, check=True,
+                       env={**os.environ, "PYTHONPATH": ROOT, **(env or {})})
+        with open(path) as fh:
+            return json.load(fh)
+    finally:
+        os.remove(path)
+
+
+def run_scale(scale: int, args: argparse.Namespace) -> Dict[str, Any]:
+    out_dir = os.path.join(args.fixtures, f"scale-{scale}")
+    print(f"\n🏗️ Scale {scale}x: fixture in {out_dir}")
+    fixture_args = ["benchmarks.fixture", "--scale", str(scale), "--out", out_dir, "--trees", str(args.trees)]
+    fixture = run_child(fixture_args + ([] if args.reuse_fixtures else ["--force"]))
+    print(f"📏 Scale {scale}x: measuring ({fixture['n_series']:,} series)")
+    measured = run_child(["benchmarks.suite", "--measure", os.path.join(out_dir, "fixture.json"),
+                          "--requests", str(args.requests), "--concurrency", args.concurrency,
+                          "--batch", str(args.batch)], env=fixture_env(fixture))
+    return {
+        "fixture": {k: fixture[k] for k in ("params", "n_series", "n_train_rows", "reused")},
+        "training": {"stages": fixture["stages"], "peak_rss_mb": fixture["peak_rss_mb"], **fixture["training"]},
+        **measured,
+    }
+
+
+def run_metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(obj: Any, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """(dotted path, value) for every numeric leaf; list items are keyed by concurrency when they have one."""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from flatten(v, f"{prefix}{k}.")
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            key = f"c{v['concurrency']}" if isinstance(v, dict) and "concurrency" in v else str(i)
+            yield from flatten(v, f"{prefix}{key}.")
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix.rstrip("."), float(obj)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    before = dict(flatten(old.get("scales", {})))
+    after = dict(flatten(new.get("scales", {})))
+    print(f"\n{'metric':<64} {'before':>12} {'after':>12} {'ratio':>7}   "
+          f"({old['meta'].get('commit')} -> {new['meta'].get('commit')})")
+    for key in (k for k in after if k in before):
+        ratio = f"{after[key] / before[key]:.2f}" if before[key] else "-"
+        print(f"{key:<64} {before[key]:>12.4g} {after[key]:>12.4g} {ratio:>7}")
+
+
+def print_summary(results: Dict[str, Any]) -> None:
+    print(f"\n{'scale':>5} {'series':>7} {'train s':>8} {'peak MB':>8} {'agent p50':>10} {'agent p99':>10} "
+          f"{'http p50':>9} {'http p99':>9} {'batch rows/s':>13} {'best rps':>9}")
+    for scale, r in results["scales"].items():
+        agent, http = r["single"]["run_agent1"], r["single"]["predict_forecast"]
+        print(f"{scale + 'x':>5} {r['fixture']['n_series']:>7,} {r['training']['stages']['train']['seconds']:>8.2f} "
+              f"{r['training']['peak_rss_mb']:>8.0f} {agent['p50_ms']:>10.2f} {agent['p99_ms']:>10.2f} "
+              f"{http['p50_ms']:>9.2f} {http['p99_ms']:>9.2f} {r['batch']['run_agent1_batch_rows_per_s']:>13,.0f} "
+              f"{max(c['rps'] for c in r['concurrent']):>9,.0f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scales", default="1,10,100")
+    ap.add_argument("--requests", type=int, default=300, help="requests per latency / concurrency run")
+    ap.add_argument("--concurrency", default="1,16,64")
+    ap.add_argument("--batch", type=int, default=2000, help="payloads per batch run")
+    ap.add_argument("--trees", type=int, default=BENCH_FIXTURE_TREES, help="boosting rounds per head of the fixture")
+    ap.add_argument("--fixtures", default=BENCH_FIXTURE_DIR, help="directory for the per-scale fixtures")
+    ap.add_argument("--reuse-fixtures", action="store_true", help="skip retraining when a matching fixture exists")
+    ap.add_argument("--compare", help="earlier results file to compare against")
+    ap.add_argument("--json", help="results file (default benchmarks/results/suite-<UTC time>.json)")
+    ap.add_argument("--measure", help=argparse.SUPPRESS)  # child mode: fixture.json to measure
+    args = ap.parse_args()
+    concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    if args.measure:
+        with open(args.measure) as fh:
+            results = measure(json.load(fh), args.requests, concurrency, args.batch)
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+        return
+
+    results = {"meta": run_metadata(), "settings": {k: v for k, v in vars(args).items() if k != "measure"},
+               "scales": {}}
+    for scale in (int(s) for s in args.scales.split(",")):
+        results["scales"][str(scale)] = run_scale(scale, args)
+    print_summary(results)
+
+    path = args.json
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"suite-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    with open(path, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"\n📁 Results saved as {path}")
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(json.load(fh), results)
+
+
+# Guarded: the fixture's training workers are spawned processes.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Synthetic hospital and history CSVs in the repo's formats, at a scale factor.
+
+    python -m benchmarks.synthetic_data --scale 10 --out /tmp/bench [--days 365] [--seed 0]
+
+Scale 1 matches the shipped data: 5 cities x 5 pincodes, 24 hospitals per
+pincode (600 rows of hospital_details.csv) and one year of daily history
+(patient_load_daily_1y_multicity.csv). Scale N keeps the 5 cities and has N
+times the pincodes and hospitals, so 10x / 100x is 250 / 2,500 series and
+91k / 912k history rows. Patient load follows the day before plus the air
+quality, temperature and rain of the day, so a model fitted on it has
+something to learn.
+"""
+from __future__ import annotations
+from typing import Dict, Tuple
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+CITIES = {"Bengaluru": 560000, "Chennai": 600000, "Hyderabad": 500000, "Mumbai": 400000, "Pune": 411000}
+PINCODES_PER_CITY = 5
+HOSPITALS_PER_PINCODE = 24
+SPECIALTIES = ["Cardiology", "Dermatology", "ENT", "General Medicine", "Gastroenterology", "Nephrology",
+               "Neurology", "Oncology", "Orthopedics", "Pediatrics", "Pulmonology", "Psychiatry",
+               "Urology", "Gynecology", "Multi-Speciality"]
+HOSPITAL_NAMES = ["Apollo Hospital", "Fortis Hospital", "Manipal Hospital", "Wellness Hospital", "City Care Clinic",
+                  "Lifeline Hospital", "Sunrise Medical Centre", "Pulse Multi-Speciality Hospital"]
+CASE_COLUMNS = ["respiratory_cases", "flu_cases", "vector_cases", "gastro_cases", "other_cases"]
+
+
+def pincodes(scale: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(city names, pincodes) of every series at `scale`, city by city."""
+    per_city = PINCODES_PER_CITY * scale
+    cities = np.repeat(list(CITIES), per_city)
+    codes = np.concatenate([base + 1 + np.arange(per_city) for base in CITIES.values()])
+    return cities, codes
+
+
+def make_hospitals(scale: int = 1, seed: int = 0) -> pd.DataFrame:
+    """hospital_details.csv rows: HOSPITALS_PER_PINCODE per pincode."""
+    rng = np.random.default_rng(seed)
+    cities, codes = pincodes(scale)
+    city = np.repeat(cities, HOSPITALS_PER_PINCODE)
+    pincode = np.repeat(codes, HOSPITALS_PER_PINCODE)
+    n = len(pincode)
+    total_beds = rng.integers(30, 401, n)
+    return pd.DataFrame({
+        "hospital_id": np.arange(1, n + 1),
+        "hospital_name": rng.choice(HOSPITAL_NAMES, n),
+        "city": city,
+        "pincode": pincode,
+        "specialty": rng.choice(SPECIALTIES, n),
+        "total_beds": total_beds,
+        "icu_beds": np.maximum(5, (total_beds * rng.uniform(0.03, 0.2, n)).astype(int)),
+        "ventilators": np.maximum(2, (total_beds * rng.uniform(0.01, 0.16, n)).astype(int)),
+        "doctors_available": rng.integers(5, 51, n),
+        "nurses_available": rng.integers(10, 121, n),
+        "oxygen_cylinders": rng.integers(10, 201, n),
+        "ppe_kits": rng.integers(20, 400, n),
+        "emergency_available": rng.choice(["Yes", "No"], n),
+        "rating": rng.integers(30, 51, n) / 10,
+        "contact_number": [f"+91{v}" for v in rng.integers(6_000_000_000, 9_999_999_999, n)],
+        "last_updated": "2025-11-29 02:05:03",
+    })
+
+
+def make_history(scale: int = 1, days: int = 365, seed: int = 0, start: str = "2024-01-01") -> pd.DataFrame:
+    """patient_load_daily_1y_multicity.csv rows for every pincode at `scale`, sorted by (city, pincode, date)."""
+    rng = np.random.default_rng(seed)
+    cities, codes = pincodes(scale)
+    n_series = len(codes)
+    dates = pd.date_range(start, periods=days)
+    shape = (n_series, days)
+
+    pm2_5 = rng.uniform(10, 150, shape)
+    temperature = rng.uniform(18, 38, shape)
+    rain = rng.uniform(0, 10, shape)
+    level = rng.uniform(100, 250, n_series)
+    load = np.empty(shape)
+    load[:, 0] = level
+    drive = 0.8 * pm2_5 + 3.0 * (temperature - 28) + 4.0 * rain + rng.normal(0, 25, shape)
+    for t in range(1, days):
+        load[:, t] = 0.6 * load[:, t - 1] + 0.4 * (level + drive[:, t])
+    load = np.clip(load, 50, None)
+
+    n = n_series * days
+    df = pd.DataFrame({
+        "date": np.tile(dates.strftime("%Y-%m-%d").to_numpy(), n_series),
+        "city": np.repeat(cities, days),
+        "pincode": np.repeat(codes, days),
+        "population_density": rng.integers(2000, 2500, n),
+        "no_of_hospitals": 5,
+        "avg_capacity": 150,
+        "pm2_5": pm2_5.ravel(),
+        "pm10": rng.uniform(10, 200, n),
+        "temperature_mean_c": temperature.ravel(),
+        "relative_humidity_mean": rng.uniform(30, 90, n),
+        "uv_index_mean": rng.uniform(1, 10, n),
+        "rain_mm": rain.ravel(),
+        "is_weekend": np.tile((dates.dayofweek >= 5).astype(int), n_series),
+        "is_festival": 0,
+        "school_open": 1,
+        "month": np.tile(dates.month.to_numpy(), n_series),
+    })
+    for risk in ["respiratory_risk", "flu_risk", "vector_risk", "gastro_risk"]:
+        df[risk] = rng.uniform(0.1, 0.5, n)
+    df["patient_load"] = load.ravel()
+    for col in CASE_COLUMNS:
+        df[col] = rng.integers(0, 60, n)
+    return df
+
+
+def write_csvs(out_dir: str, scale: int = 1, days: int = 365, seed: int = 0) -> Dict[str, str]:
+    """Writes hospital_details.csv and patient_load_daily_1y_multicity.csv to `out_dir`; returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "hospitals": os.path.join(out_dir, "hospital_details.csv"),
+        "history": os.path.join(out_dir, "patient_load_daily_1y_multicity.csv"),
+    }
+    make_hospitals(scale, seed).to_csv(paths["hospitals"], index=False)
+    make_history(scale, days, seed).to_csv(paths["history"], index=False)
+    return paths
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=int, default=1)
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for name, path in write_csvs(args.out, args.scale, args.days, args.seed).items():
+        print(f"{name}: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Parity check and timing: NumPy tree evaluator (tree_evaluator.py) vs.
+LightGBM's native booster.predict (and the bundle's wrapper predict), per head, for batch sizes 1 .. 10k.
+
+    python -m benchmarks.tree_evaluator [--sizes 1,10,100,1000,10000] [--json out.json]
+
+Rows are API-style feature rows with random lag values so every split is
+exercised. Exits non-zero if outputs differ beyond --atol (float64) /
+--atol32 (float32), or if any predicted class differs.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List
+import argparse
+import json
+import sys
+import time
+import warnings
+import numpy as np
+
+from ML_andRetriever_agent import Agent1Request, MODEL_PATH, _load_models, _feature_encoder, _build_feature_matrix
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+from tree_evaluator import MODEL_KEYS, compile_bundle
+from benchmarks.batch_forecast import make_payloads
+
+
+def make_rows(bundle: Dict[str, Any], n: int, seed: int = 0) -> np.ndarray:
+    encoder = _feature_encoder(bundle["features"])
+    X = _build_feature_matrix([Agent1Request(**p) for p in make_payloads(n, seed)], encoder)
+    rng = np.random.default_rng(seed)
+    for col in LAG_COLUMNS:
+        for i in encoder.lag_indices(col, LAG_DAYS).values():
+            X[:, i] = rng.uniform(0, 400 if col == "patient_load" else 80, n).round()
+    return X
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="1,10,100,1000,10000")
+    ap.add_argument("--atol", type=float, default=1e-9)
+    ap.add_argument("--atol32", type=float, default=1e-4)
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args()
+    # sklearn-wrapped heads warn on unnamed arrays; the wrapper column is timed as served.
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    bundle = _load_models(MODEL_PATH)
+    compiled = {"float64": compile_bundle(bundle, np.float64), "float32": compile_bundle(bundle, np.float32)}
+    sizes = [int(s) for s in args.sizes.split(",")]
+    X_all = make_rows(bundle, max(sizes))
+
+    failures = 0
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    for key in MODEL_KEYS:
+        if key not in bundle:
+            continue
+        booster = bundle[key].booster_
+        rows = results[key] = []
+        for n in sizes:
+            X = X_all[:n]
+            native = booster.predict(X)
+            row: Dict[str, Any] = {"n": n}
+            repeat = 20 if n <= 100 else 3
+            row["wrapper_ms"] = best_of(lambda: bundle[key].predict(X), repeat) * 1e3
+            row["native_ms"] = best_of(lambda: booster.predict(X), repeat) * 1e3
+            for name, comp in compiled.items():
+                model = comp[key]
+                out = model.predict_raw(X)
+                err = float(np.abs(out - native).max())
+                tol = args.atol if name == "float64" else args.atol32
+                label_diff = 0
+                if out.ndim == 2:
+                    label_diff = int((out.argmax(axis=1) != native.argmax(axis=1)).sum())
+                row[f"{name}_ms"] = best_of(lambda: model.predict_raw(X), repeat) * 1e3
+                row[f"{name}_max_abs_err"] = err
+                row[f"{name}_label_mismatches"] = label_diff
+                failures += int(err > tol or label_diff > 0)
+            rows.append(row)
+
+        print(f"\n{key} ({len(compiled['float64'][key].roots)} trees)")
+        print(f"{'n':>7} {'wrapper ms':>10} {'native ms':>10} {'np64 ms':>10} {'np32 ms':>10} {'err64':>9} {'err32':>9}")
+        for r in rows:
+            print(f"{r['n']:>7} {r['wrapper_ms']:>10.3f} {r['native_ms']:>10.3f} {r['float64_ms']:>10.3f} {r['float32_ms']:>10.3f} "
+                  f"{r['float64_max_abs_err']:>9.1e} {r['float32_max_abs_err']:>9.1e}")
+
+    print(f"\nparity: {'OK' if not failures else f'{failures} size/head/dtype combinations out of tolerance'}")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# agents_project_life/booster_models.py
+"""
+sklearn-style wrappers around raw LightGBM Boosters.
+
+Training builds its own lgb.Dataset and calls lgb.train, which returns a bare
+Booster; these classes give it the LGBMRegressor / LGBMClassifier surface the
+serving code uses (booster_, classes_, predict, predict_proba). They are
+pickled into the joblib bundle by qualified name, so they live in this module
+and must stay importable as booster_models.BoosterRegressor / BoosterClassifier.
+"""
+from __future__ import annotations
+from typing import Any, Sequence
+import numpy as np
+
+
+class BoosterRegressor:
+    """
+    Minimal LGBMRegressor stand-in around a Booster trained with lgb.train.
+    Exposes booster_ and predict() so feature_encoder.predict_values and
+    existing callers work unchanged.
+    """
+
+    def __init__(self, booster: Any):
+        self.booster_ = booster
+        self.feature_name_ = booster.feature_name()
+        self.n_features_in_ = len(self.feature_name_)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.booster_.predict(X)
+
+
+class BoosterClassifier(BoosterRegressor):
+    """LGBMClassifier stand-in: booster_ predicts class probabilities, classes_ maps them to labels."""
+
+    def __init__(self, booster: Any, classes: Sequence[Any]):
+        super().__init__(booster)
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        proba = self.booster_.predict(X)
+        if proba.ndim == 1:
+            return np.column_stack([1.0 - proba, proba])
+        return proba
+
+    def predict(self, X: Any) -> np.ndarray:
+        # argmax of the two-column binary form is the same p > 0.5 rule LGBMClassifier.predict uses.
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
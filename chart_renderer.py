@@ -0,0 +1,202 @@
+# agents_project_life/chart_renderer.py
+"""
+Forecast chart rendering for the API, kept off the request thread.
+
+PNGs are rendered in a small process pool (so matplotlib does not hold the
+server's GIL) and cached in a bounded LRU keyed by the forecast content, so
+repeat forecasts reuse the same bytes. A pool broken by a crashed worker is
+replaced and the lost render is retried once.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+from io import BytesIO
+import hashlib
+import json
+import multiprocessing
+import threading
+import os
+
+# ---------- Config ----------
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_MAX_BYTES = int(os.getenv("CHART_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Chart specs (pincode + points) remembered so /charts/<key>.png can render on first fetch.
+CHART_SPEC_CACHE_SIZE = int(os.getenv("CHART_SPEC_CACHE_SIZE", "10000"))
+CHART_RENDER_TIMEOUT_S = float(os.getenv("CHART_RENDER_TIMEOUT_S", "30"))
+
+ChartSpec = Tuple[int, Tuple[str, ...], Tuple[float, ...]]
+
+
+# ---------- Rendering ----------
+def render_forecast_png(pincode: int, dates: List[str], loads: List[float]) -> bytes:
+    """Renders the predicted patient load line chart as PNG bytes."""
+    # Figure + Agg canvas instead of pyplot: no global state, safe in any worker.
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(7, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(dates, loads, marker="o", linewidth=2, color="blue")
+    ax.set_title(f"Predicted Patient Load (Pincode: {pincode})")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Predicted Patient Load")
+    ax.grid(True)
+    fig.tight_layout()
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def chart_spec(pincode: int, preds: List[Dict[str, Any]]) -> ChartSpec:
+    return (
+        int(pincode),
+        tuple(p["date"] for p in preds),
+        tuple(float(p["predicted_patient_load"]) for p in preds),
+    )
+
+
+def chart_key(spec: ChartSpec) -> str:
+    """Content hash of a chart; identical forecasts map to the same key."""
+    return hashlib.sha1(json.dumps(spec, separators=(",", ":")).encode()).hexdigest()
+
+
+# ---------- Cache + pool ----------
+class ChartService:
+    """
+    LRU of rendered PNG bytes (bounded by total size) plus an LRU of chart
+    specs, backed by a lazily started process pool. Concurrent requests for
+    the same chart share one render.
+    """
+
+    def __init__(self, workers: int = CHART_WORKERS, max_bytes: int = CHART_CACHE_MAX_BYTES,
+                 max_specs: int = CHART_SPEC_CACHE_SIZE):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.max_specs = max_specs
+        # Re-entrant: a render that already finished runs its done-callback inside get_png.
+        self._lock = threading.RLock()
+        self._pngs: "OrderedDict[str, bytes]" = OrderedDict()
+        self._specs: "OrderedDict[str, ChartSpec]" = OrderedDict()
+        # key -> (render future, pool it was submitted to)
+        self._pending: Dict[str, Tuple[Future, ProcessPoolExecutor]] = {}
+        self._bytes = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.pool_restarts = 0
+
+    def register(self, spec: ChartSpec) -> str:
+        """Remembers a chart so it can be rendered on demand; returns its key."""
+        key = chart_key(spec)
+        with self._lock:
+            self._specs[key] = spec
+            self._specs.move_to_end(key)
+            while len(self._specs) > self.max_specs:
+                self._specs.popitem(last=False)
+        return key
+
+    def get_png(self, key: str, timeout: float = CHART_RENDER_TIMEOUT_S) -> Optional[bytes]:
+        """
+        PNG bytes for a registered key, rendering it if needed; None if the key
+        is unknown. Raises concurrent.futures.TimeoutError after `timeout` seconds.
+        """
+        for attempt in range(2):
+            with self._lock:
+                png = self._pngs.get(key)
+                if png is not None:
+                    self._pngs.move_to_end(key)
+                    self.hits += 1
+                    return png
+                pending = self._pending.get(key)
+                if pending is None:
+                    spec = self._specs.get(key)
+                    if spec is None:
+                        return None
+                    self.misses += int(attempt == 0)
+                    pending = self._submit(key, spec)
+            try:
+                return pending[0].result(timeout=timeout)
+            except BrokenProcessPool:
+                # A worker died during the render: replace the pool and render once more.
+                self._discard_pool(key, pending)
+                if attempt:
+                    raise
+
+    def render(self, spec: ChartSpec) -> bytes:
+        return self.get_png(self.register(spec))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._pngs),
+                "bytes": self._bytes,
+                "specs": len(self._specs),
+                "pending": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "renders": self.renders,
+                "pool_restarts": self.pool_restarts,
+            }
+
+    # Callers must hold self._lock.
+    def _submit(self, key: str, spec: ChartSpec) -> Tuple[Future, ProcessPoolExecutor]:
+        args = (render_forecast_png, spec[0], list(spec[1]), list(spec[2]))
+        pool = self._executor()
+        try:
+            fut = pool.submit(*args)
+        except BrokenProcessPool:
+            # Broken by a worker that died on an earlier render.
+            self._replace_pool(pool)
+            pool = self._executor()
+            fut = pool.submit(*args)
+        pending = (fut, pool)
+        self._pending[key] = pending
+        fut.add_done_callback(lambda f, k=key: self._store(k, f))
+        return pending
+
+    def _replace_pool(self, pool: ProcessPoolExecutor) -> None:
+        # Several threads can see the same broken pool; only the first one replaces it.
+        if self._pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self.pool_restarts += 1
+
+    def _discard_pool(self, key: str, pending: Tuple[Future, ProcessPoolExecutor]) -> None:
+        with self._lock:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            self._replace_pool(pending[1])
+
+    def _store(self, key: str, fut: Future) -> None:
+        with self._lock:
+            if self._pending.get(key, (None,))[0] is fut:
+                del self._pending[key]
+            if fut.cancelled() or fut.exception() is not None:
+                return
+            png = fut.result()
+            self.renders += 1
+            if key not in self._pngs:
+                self._pngs[key] = png
+                self._bytes += len(png)
+            while self._bytes > self.max_bytes and self._pngs:
+                _, old = self._pngs.popitem(last=False)
+                self._bytes -= len(old)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a threaded server process is not safe.
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+chart_service = ChartService()
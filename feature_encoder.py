@@ -0,0 +1,137 @@
+# agents_project_life/feature_encoder.py
+"""
+NumPy feature rows for the forecast models.
+
+A FeatureEncoder is compiled once per `bundle["features"]` list: a fixed
+column -> index map and a template row holding the constant defaults.
+Serving copies the template and fills only the request-dependent columns
+in place, then hands the array straight to the LightGBM boosters.
+build_feature_rows is the one request -> row mapping used by both the API
+and Agent 1.
+"""
+from __future__ import annotations
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+
+LAG_DAYS = (1, 2, 3, 7, 14)
+LAG_COLUMNS = (
+    "patient_load",
+    "respiratory_cases",
+    "flu_cases",
+    "vector_cases",
+    "gastro_cases",
+    "other_cases",
+)
+RISK_FEATURES = ("respiratory_risk", "flu_risk", "vector_risk", "gastro_risk")
+
+# Constant feature values the serving inputs do not carry; everything else
+# not filled from the request stays at 0.0. The risks are placeholders for
+# callers that do not compute them (the API overwrites them per request).
+FEATURE_DEFAULTS = {
+    "city": 0,
+    "population_density": 2000,
+    "no_of_hospitals": 5,
+    "avg_capacity": 150,
+    "is_weekend": 0,
+    "is_festival": 0,
+    "school_open": 1,
+    **{risk: 0.3 for risk in RISK_FEATURES},
+}
+
+
+# ---------- Encoder ----------
+class FeatureEncoder:
+    """
+    Fixed layout for one model feature list. Features without a default
+    start at 0.0, which matches the previous "missing column -> 0.0" rule.
+    """
+
+    def __init__(self, features: Sequence[str], defaults: Optional[Dict[str, float]] = None, dtype: Any = np.float64):
+        self.features: Tuple[str, ...] = tuple(features)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.features)}
+        self.dtype = np.dtype(dtype)
+        self.template = np.zeros(len(self.features), dtype=self.dtype)
+        for name, value in (defaults or {}).items():
+            i = self.index.get(name)
+            if i is not None:
+                self.template[i] = value
+
+    @property
+    def n_features(self) -> int:
+        return len(self.features)
+
+    def col(self, name: str) -> Optional[int]:
+        """Column index of `name`, or None if the model does not use it."""
+        return self.index.get(name)
+
+    def matrix(self, n: int) -> np.ndarray:
+        """Fresh (n, n_features) C-contiguous array initialised from the template."""
+        return np.tile(self.template, (n, 1))
+
+    def fill(self, X: np.ndarray, name: str, values: Any) -> bool:
+        """Sets column `name` of X in place; a no-op for features the model does not use."""
+        i = self.index.get(name)
+        if i is None:
+            return False
+        X[:, i] = values
+        return True
+
+    def lag_indices(self, column: str, lags: Iterable[int] = LAG_DAYS) -> Dict[int, int]:
+        """{lag: column index} for the `<column>_lag<k>` features present in the model."""
+        out = {}
+        for lag in lags:
+            i = self.index.get(f"{column}_lag{lag}")
+            if i is not None:
+                out[lag] = i
+        return out
+
+
+@lru_cache(maxsize=16)
+def _compile(features: Tuple[str, ...], defaults: Tuple[Tuple[str, float], ...], dtype: str) -> FeatureEncoder:
+    return FeatureEncoder(features, dict(defaults), dtype)
+
+
+def compile_encoder(features: Sequence[str], defaults: Optional[Dict[str, float]] = None, dtype: Any = np.float64) -> FeatureEncoder:
+    """Cached FeatureEncoder for this feature list/defaults, so it is built once per model bundle."""
+    return _compile(tuple(features), tuple(sorted((defaults or {}).items())), np.dtype(dtype).str)
+
+
+# ---------- Request rows ----------
+def build_feature_rows(reqs: Sequence[Any], encoder: FeatureEncoder, month: Optional[int] = None) -> np.ndarray:
+    """
+    One row per request (anything with pincode, aqi_index and the weather
+    fields) in the model's column order: defaults from the encoder template,
+    the request inputs and the month. Lag and risk features are left to the
+    caller.
+    """
+    X = encoder.matrix(len(reqs))
+    aqi = np.array([r.aqi_index for r in reqs], dtype=float)
+    encoder.fill(X, "pincode", [int(r.pincode) for r in reqs])
+    encoder.fill(X, "pm2_5", aqi * 0.6)
+    encoder.fill(X, "pm10", aqi * 0.4)
+    encoder.fill(X, "temperature_mean_c", [r.temperature_mean_c for r in reqs])
+    encoder.fill(X, "relative_humidity_mean", [r.relative_humidity_mean for r in reqs])
+    encoder.fill(X, "uv_index_mean", [r.uv_index_mean for r in reqs])
+    encoder.fill(X, "rain_mm", [r.rain_mm for r in reqs])
+    encoder.fill(X, "month", month if month is not None else datetime.now().month)
+    return X
+
+
+# ---------- Raw booster prediction ----------
+def predict_values(model: Any, X: np.ndarray) -> np.ndarray:
+    """Regressor output straight from the LightGBM booster, skipping the sklearn wrapper checks."""
+    booster = getattr(model, "booster_", None)
+    if booster is None:
+        return np.asarray(model.predict(X))
+    return booster.predict(X)
+
+
+def predict_proba(model: Any, X: np.ndarray) -> np.ndarray:
+    """(rows, classes) class probabilities from one booster call; binary heads get both columns."""
+    booster = getattr(model, "booster_", None)
+    proba = booster.predict(X) if booster is not None else np.asarray(model.predict_proba(X))
+    if proba.ndim == 1:
+        return np.column_stack([1.0 - proba, proba])
+    return proba
@@ -0,0 +1,150 @@
+# agents_project_life/forecast_cache.py
+"""
+TTL + LRU cache for the recursive 3-day forecast.
+
+Keys are the pincode, the forecast date, the model version and the
+environmental inputs quantized to configurable buckets, so near-identical
+readings from the dashboard share one forecast. Concurrent misses for the
+same key are coalesced into a single computation.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+import threading
+import time
+import os
+
+T = TypeVar("T")
+
+# ---------- Config ----------
+FORECAST_CACHE_ENABLED = os.getenv("FORECAST_CACHE_ENABLED", "1") == "1"
+FORECAST_CACHE_TTL_S = float(os.getenv("FORECAST_CACHE_TTL_S", "900"))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "10000"))
+# Bucket width per input, e.g. "aqi_index=5,temperature_mean_c=0.5"; overrides the defaults below.
+DEFAULT_BUCKETS = {
+    "aqi_index": 5.0,
+    "temperature_mean_c": 0.5,
+    "relative_humidity_mean": 2.0,
+    "rain_mm": 0.5,
+    "uv_index_mean": 0.5,
+}
+
+
+def _parse_buckets(spec: str) -> Dict[str, float]:
+    buckets = dict(DEFAULT_BUCKETS)
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, width = part.partition("=")
+        buckets[name.strip()] = float(width)
+    return buckets
+
+
+FORECAST_CACHE_BUCKETS = _parse_buckets(os.getenv("FORECAST_CACHE_BUCKETS", ""))
+
+
+# ---------- Quantization ----------
+def quantize(payload: Dict[str, Any], buckets: Dict[str, float] = FORECAST_CACHE_BUCKETS) -> Dict[str, Any]:
+    """Copy of `payload` with each bucketed input snapped to the nearest bucket value."""
+    out = dict(payload)
+    for name, width in buckets.items():
+        value = out.get(name)
+        if value is None or width <= 0:
+            continue
+        out[name] = round(round(float(value) / width) * width, 6)
+    return out
+
+
+# ---------- Cache ----------
+class ForecastCache:
+    """Thread-safe TTL + LRU map with single-flight computation of misses."""
+
+    def __init__(self, ttl_s: float = FORECAST_CACHE_TTL_S, max_entries: int = FORECAST_CACHE_MAX_ENTRIES,
+                 buckets: Dict[str, float] = FORECAST_CACHE_BUCKETS, enabled: bool = FORECAST_CACHE_ENABLED):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.buckets = dict(buckets)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def key(self, namespace: str, model_version: Optional[str], payload: Dict[str, Any],
+            forecast_date: Optional[date] = None) -> Tuple:
+        q = quantize(payload, self.buckets)
+        day = (forecast_date or date.today()).isoformat()
+        return (namespace, model_version, day, str(q.get("pincode"))) + tuple(
+            q.get(name) for name in sorted(self.buckets)
+        )
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """Cached value for `key`, or compute() it once even if many threads miss together."""
+        if not self.enabled:
+            return compute()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._data[key]
+                self.expired += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[key] = fut
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return fut.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._data[key] = (time.monotonic() + self.ttl_s, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        fut.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._data),
+                "inflight": len(self._inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
+
+
+forecast_cache = ForecastCache()
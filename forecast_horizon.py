@@ -0,0 +1,121 @@
+# agents_project_life/forecast_horizon.py
+"""
+Forecast horizon and lag roll-forward shared by the serving paths.
+
+A LagRing holds the last 14 days of every lagged column per row in one
+(rows, window, column) array with a shared write position. After each
+forecast day the predicted patient load (case counts carried forward from
+the latest day) is pushed as the newest day, and every `<column>_lag<k>`
+feature is refilled from its fixed slot. A step therefore costs O(rows)
+whatever the horizon or the length of the history behind the window, and
+lag k of day d is day d - k: a prediction once d > k, observed history
+before that.
+
+Day-level outputs can be returned as 24 hourly buckets per day, splitting
+the daily load by FORECAST_HOURLY_PROFILE (uniform by default; the models
+themselves are daily).
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import os
+import numpy as np
+
+from feature_encoder import FeatureEncoder, LAG_COLUMNS, LAG_DAYS
+
+# ---------- Config ----------
+FORECAST_DAYS = int(os.getenv("FORECAST_DAYS", "3"))
+# Lags reach back 14 days, so every lag of a 14-day horizon is still a real day or a prediction.
+MAX_FORECAST_DAYS = int(os.getenv("FORECAST_MAX_DAYS", str(max(LAG_DAYS))))
+RESOLUTIONS = ("daily", "hourly")
+# 24 comma-separated weights for splitting a day's load over its hours; normalized.
+FORECAST_HOURLY_PROFILE = os.getenv("FORECAST_HOURLY_PROFILE", "")
+
+
+def _parse_profile(spec: str) -> np.ndarray:
+    weights = np.array([float(w) for w in spec.split(",")], dtype=float) if spec.strip() else np.ones(24)
+    if weights.shape != (24,) or (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("FORECAST_HOURLY_PROFILE must be 24 non-negative weights")
+    return weights / weights.sum()
+
+
+HOURLY_SHARES = _parse_profile(FORECAST_HOURLY_PROFILE)
+
+
+def check_horizon(days: int, resolution: str = "daily") -> None:
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        raise ValueError(f"Forecast horizon must be between 1 and {MAX_FORECAST_DAYS} days, got {days}")
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Resolution must be one of {RESOLUTIONS}, got {resolution!r}")
+
+
+# ---------- Lag ring ----------
+class LagRing:
+    """
+    values[r, (head - k) % window, c] is row r's column c, k days before the
+    next day to forecast. All rows advance together, so one head index
+    serves every row. NaN marks unknown days.
+    """
+
+    def __init__(self, values: np.ndarray, columns: Sequence[str] = LAG_COLUMNS, head: int = 0):
+        self.values = values
+        self.columns = list(columns)
+        self.window = values.shape[1]
+        self.head = head  # slot the next day is written to; (head - 1) % window is the latest day
+        if self.window < max(LAG_DAYS):
+            raise ValueError(f"Lag window of {self.window} days is shorter than lag {max(LAG_DAYS)}")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @classmethod
+    def from_store(cls, store: Any, pincodes: Sequence[Any]) -> "LagRing":
+        """Ring over the lag store's window for each pincode (all NaN for unknown ones)."""
+        values, _ = store.window_many(pincodes)
+        return cls(values.astype(np.float64), LAG_COLUMNS[:values.shape[2]])
+
+    def lag(self, k: int) -> np.ndarray:
+        """(rows, columns) values k days before the next day."""
+        return self.values[:, (self.head - k) % self.window]
+
+    def push(self, day_values: np.ndarray) -> None:
+        """Appends one day (rows, columns) for every row, overwriting the oldest."""
+        self.values[:, self.head] = day_values
+        self.head = (self.head + 1) % self.window
+
+    def advance(self, load: np.ndarray) -> None:
+        """Pushes a forecast day: predicted patient load, other columns carried forward."""
+        nxt = self.lag(1).copy()
+        nxt[:, self.columns.index("patient_load")] = load
+        self.push(nxt)
+
+    def fill(self, X: np.ndarray, encoder: FeatureEncoder, lag_days: Sequence[int] = LAG_DAYS) -> None:
+        """Sets every `<column>_lag<k>` feature of X; unknown days get the encoder default (0.0)."""
+        for c, column in enumerate(self.columns):
+            for lag, i in encoder.lag_indices(column, lag_days).items():
+                v = self.lag(lag)[:, c]
+                X[:, i] = np.where(np.isnan(v), encoder.template[i], v)
+
+    def roller(self, encoder: FeatureEncoder) -> Callable[[np.ndarray, Any], None]:
+        """`roll` callback for InferenceEngine.forecast: advance by the step's load, refill the lags."""
+        def roll(X: np.ndarray, step: Any) -> None:
+            self.advance(step.load)
+            self.fill(X, encoder)
+        return roll
+
+
+# ---------- Buckets ----------
+def hourly_buckets(daily: List[Dict[str, Any]], load_key: str = "predicted_patient_load",
+                   digits: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    24 buckets per daily bucket: the same fields plus "hour" (start of the
+    hour, ISO format), with the day's load split by HOURLY_SHARES.
+    """
+    out = []
+    for bucket in daily:
+        start = datetime.strptime(bucket["date"], "%Y-%m-%d")
+        for h, share in enumerate(HOURLY_SHARES):
+            load = float(bucket[load_key]) * float(share)
+            out.append({**bucket, "hour": (start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:00"),
+                        load_key: round(load, digits) if digits is not None else load})
+    return out
@@ -0,0 +1,331 @@
+# agents_project_life/forecast_table.py
+"""
+Materialized daily forecast table.
+
+Once a day (after `lag_store.py append`) the job below forecasts every
+pincode in hospital_details.csv from that day's baseline readings, for the
+API and for Agent 1, and writes FORECAST_TABLE_DAYS days of all head
+outputs into one SQLite file. /predict_forecast and run_agent1 look the
+pincode up first and serve the stored outputs when the request's quantized
+inputs equal the baseline and the table was built today for the model
+bundle, lag store and cache buckets currently served; anything else falls
+through to the forecast cache and live inference, so a table hit returns
+exactly what the cache would have computed.
+
+The job writes a new file and renames it over the old one. Readers open it
+read-only and immutable (no locking) with one connection per thread, and
+reopen on their next stat() check after a rebuild.
+
+    python forecast_table.py build [baseline.csv]
+
+The baseline CSV has one row per pincode with the request's input columns
+(history-style rows with a date and pm2_5 instead of aqi_index also work;
+the latest date per pincode is used).
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import json
+import sqlite3
+import threading
+import time
+import os
+import numpy as np
+
+from forecast_cache import quantize
+from forecast_horizon import MAX_FORECAST_DAYS
+from inference_engine import HeadOutputs
+
+# ---------- Config ----------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FORECAST_TABLE_ENABLED = os.getenv("FORECAST_TABLE_ENABLED", "1") == "1"
+FORECAST_TABLE_PATH = os.getenv("FORECAST_TABLE_PATH", os.path.join(BASE_DIR, "forecast_table.sqlite3"))
+FORECAST_BASELINE_PATH = os.getenv("FORECAST_BASELINE_PATH", os.path.join(BASE_DIR, "forecast_baseline.csv"))
+# Days materialized per pincode; requests for any horizon up to this are served from the table.
+FORECAST_TABLE_DAYS = int(os.getenv("FORECAST_TABLE_DAYS", str(MAX_FORECAST_DAYS)))
+# Minimum seconds between two stat() checks for a rebuilt file.
+RELOAD_CHECK_INTERVAL_S = float(os.getenv("FORECAST_TABLE_RELOAD_CHECK_INTERVAL_S", "5"))
+
+INPUT_COLUMNS = ("aqi_index", "temperature_mean_c", "relative_humidity_mean", "rain_mm", "uv_index_mean")
+
+_SCHEMA = f"""
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE baselines (
+    pincode INTEGER PRIMARY KEY,
+    {", ".join(f"{c} REAL NOT NULL" for c in INPUT_COLUMNS)}
+);
+CREATE TABLE forecasts (
+    namespace TEXT NOT NULL,
+    pincode INTEGER NOT NULL,
+    step INTEGER NOT NULL,
+    patient_load REAL NOT NULL,
+    disease TEXT NOT NULL,
+    disease_confidence REAL NOT NULL,
+    intensity TEXT,
+    intensity_confidence REAL,
+    PRIMARY KEY (namespace, pincode, step)
+) WITHOUT ROWID;
+"""
+
+_LOOKUP_SQL = f"""
+SELECT {", ".join(f"b.{c}" for c in INPUT_COLUMNS)},
+       f.patient_load, f.disease, f.disease_confidence, f.intensity, f.intensity_confidence
+FROM baselines b JOIN forecasts f ON f.pincode = b.pincode
+WHERE b.pincode = ? AND f.namespace = ? AND f.step < ?
+ORDER BY f.step
+"""
+
+
+# ---------- Build ----------
+def load_baseline(path: str = FORECAST_BASELINE_PATH) -> "pd.DataFrame":
+    """pincode + INPUT_COLUMNS, one row per pincode (the latest date if the CSV has several)."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if "aqi_index" not in df.columns and "pm2_5" in df.columns:
+        df["aqi_index"] = df["pm2_5"] / 0.6  # inverse of the pm2_5 = aqi * 0.6 the forecasters use
+    missing = [c for c in ("pincode",) + INPUT_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Baseline {path} is missing columns {missing}")
+    if "date" in df.columns:
+        df = df.sort_values("date", kind="stable")
+    df = df.drop_duplicates("pincode", keep="last")
+    return df[["pincode", *INPUT_COLUMNS]].reset_index(drop=True)
+
+
+def build_forecast_table(path: str, baseline: "pd.DataFrame",
+                         forecasters: Mapping[str, Callable[[List[Dict[str, Any]]], HeadOutputs]],
+                         version: str, buckets: Mapping[str, float], day: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Forecasts every baseline row with each of `forecasters` (namespace ->
+    fn(quantized payloads) -> stacked (days, rows) HeadOutputs) and writes
+    the table atomically. `version` and `buckets` must be what the servers
+    use in their forecast cache keys, or they will not serve the table.
+    """
+    payloads = [quantize({"pincode": int(row["pincode"]), **{c: float(row[c]) for c in INPUT_COLUMNS}}, buckets)
+                for row in baseline.to_dict("records")]
+    day = day or date.today()
+    rows: List[Tuple] = []
+    summary: Dict[str, Any] = {"path": path, "day": day.isoformat(), "pincodes": len(payloads), "seconds": {}}
+    for namespace, forecast in forecasters.items():
+        t0 = time.perf_counter()
+        out = forecast(payloads) if payloads else None
+        summary["seconds"][namespace] = round(time.perf_counter() - t0, 4)
+        for j, p in enumerate(payloads):
+            col = out.column(j)
+            for step in range(len(col.load)):
+                rows.append((
+                    namespace, p["pincode"], step, float(col.load[step]), str(col.disease[step]),
+                    float(col.disease_confidence[step]),
+                    str(col.intensity[step]) if col.intensity is not None else None,
+                    float(col.intensity_confidence[step]) if col.intensity is not None else None,
+                ))
+
+    tmp = f"{path}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.executescript(_SCHEMA)
+        meta = {"day": day.isoformat(), "version": version, "buckets": json.dumps(dict(buckets), sort_keys=True),
+                "namespaces": json.dumps(list(forecasters)), "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.executemany(f"INSERT INTO baselines VALUES (?{', ?' * len(INPUT_COLUMNS)})",
+                         [(p["pincode"], *(p[c] for c in INPUT_COLUMNS)) for p in payloads])
+        conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp, path)
+    summary["rows"] = len(rows)
+    summary["bytes"] = os.path.getsize(path)
+    return summary
+
+
+def materialize(baseline_path: str = FORECAST_BASELINE_PATH, path: str = FORECAST_TABLE_PATH,
+                days: int = FORECAST_TABLE_DAYS) -> Dict[str, Any]:
+    """
+    The daily job: today's table for every hospital pincode with a baseline
+    row, forecast by the same code paths /predict_forecast and run_agent1 use.
+    """
+    # Deferred: the serving modules import this one.
+    import app
+    from forecast_cache import forecast_cache
+    from hospital_store import get_hospital_store
+    from lag_store import get_lag_store
+    from model_registry import get_model_bundle, get_registry
+    from ML_andRetriever_agent import HOSPITAL_DATA_PATH, Agent1Request, _forecast_many
+
+    baseline = load_baseline(baseline_path)
+    pincodes = {int(p) for p in get_hospital_store(HOSPITAL_DATA_PATH).pincodes()}
+    known = baseline["pincode"].astype(int)
+    skipped = sorted(pincodes - set(known))
+    baseline = baseline[known.isin(pincodes)]
+
+    bundle = get_model_bundle()
+    forecasters = {
+        "api": lambda ps: app.forecast_arrays([app.ForecastRequest(**p) for p in ps], bundle, days),
+        "agent1": lambda ps: _forecast_many([Agent1Request(**p) for p in ps], bundle, days),
+    }
+    version = f"{get_registry().version}:{get_lag_store().version}"
+    summary = build_forecast_table(path, baseline, forecasters, version, forecast_cache.buckets)
+    summary["skipped"] = skipped
+    return summary
+
+
+# ---------- Table ----------
+class ForecastTable:
+    """Read side of the materialized table; safe to share across threads."""
+
+    def __init__(self, path: str = FORECAST_TABLE_PATH, check_interval_s: float = RELOAD_CHECK_INTERVAL_S,
+                 enabled: bool = FORECAST_TABLE_ENABLED):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        # (identity, meta) of the current file; identity changes on every rebuild.
+        self._state: Optional[Tuple[Tuple[int, int, int], Dict[str, Any]]] = None
+        self._next_check = 0.0
+        self.load_count = 0
+        self.hits = 0
+        self.misses = 0      # pincode not in the table
+        self.mismatches = 0  # inputs differ from the day's baseline, or a longer horizon than stored
+        self.stale = 0       # built for another day / model / lag store / bucket widths
+        self.last_error: Optional[str] = None
+
+    def get(self, namespace: str, version: str, payload: Dict[str, Any],
+            buckets: Mapping[str, float], days: int) -> Optional[HeadOutputs]:
+        """
+        Stored outputs for an already-quantized request payload and a
+        `days`-day horizon, or None if the request has to be forecast live.
+        """
+        if not self.enabled:
+            return None
+        state = self._snapshot()
+        if state is None:
+            return None
+        meta = state[1]
+        if meta["version"] != version or meta["day"] != date.today().isoformat() or meta["buckets"] != dict(buckets):
+            self._count("stale")
+            return None
+        try:
+            rows = self._conn(state[0]).execute(_LOOKUP_SQL, (int(payload["pincode"]), namespace, days)).fetchall()
+        except sqlite3.Error as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            return None
+        if not rows:
+            self._count("misses")
+            return None
+        k = len(INPUT_COLUMNS)
+        if len(rows) < days or any(rows[0][i] != payload.get(c) for i, c in enumerate(INPUT_COLUMNS)):
+            self._count("mismatches")
+            return None
+        self._count("hits")
+        has_intensity = rows[0][k + 3] is not None
+        return HeadOutputs(
+            load=np.array([r[k] for r in rows], dtype=float),
+            disease=np.array([r[k + 1] for r in rows]),
+            disease_confidence=np.array([r[k + 2] for r in rows], dtype=float),
+            intensity=np.array([r[k + 3] for r in rows]) if has_intensity else None,
+            intensity_confidence=np.array([r[k + 4] for r in rows], dtype=float) if has_intensity else None,
+        )
+
+    def _count(self, name: str) -> None:
+        # get() runs on many request threads at once; += on the counters is not atomic.
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def __len__(self) -> int:
+        state = self._snapshot()
+        if state is None:
+            return 0
+        return self._conn(state[0]).execute("SELECT COUNT(*) FROM baselines").fetchone()[0]
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._state
+        meta = state[1] if state else {}
+        with self._stats_lock:
+            hits, misses, mismatches, stale = self.hits, self.misses, self.mismatches, self.stale
+        lookups = hits + misses + mismatches + stale
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "day": meta.get("day"),
+            "built_at": meta.get("built_at"),
+            "hits": hits,
+            "misses": misses,
+            "mismatches": mismatches,
+            "stale": stale,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "load_count": self.load_count,
+            "last_error": self.last_error,
+        }
+
+    # ----- loading -----
+    def _conn(self, identity: Tuple[int, int, int]) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "identity", None) != identity:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            # immutable: the file is never modified in place (rebuilds are renamed over it), so skip locking.
+            local.conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True, check_same_thread=False)
+            local.identity = identity
+        return local.conn
+
+    def _snapshot(self):
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._state
+
+    def reload(self) -> None:
+        with self._lock:
+            self._state = None
+            self._refresh()
+
+    def _refresh(self) -> None:
+        self._next_check = time.monotonic() + self.check_interval_s
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._state = None
+            return
+        identity = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self._state is not None and self._state[0] == identity:
+            return
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro&immutable=1", uri=True)
+            try:
+                meta: Dict[str, Any] = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            finally:
+                conn.close()
+            meta["buckets"] = json.loads(meta["buckets"])
+            self._state = (identity, meta)
+            self.load_count += 1
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+
+
+forecast_table = ForecastTable()
+
+
+# ---------- CLI ----------
+if __name__ == "__main__":
+    # python forecast_table.py build [baseline.csv]   -> daily job, after lag_store.py append
+    # python forecast_table.py show                   -> metadata of the current table
+    import sys
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if cmd == "build":
+        summary = materialize(sys.argv[2] if len(sys.argv) > 2 else FORECAST_BASELINE_PATH)
+        print(f"✅ Materialized {summary['pincodes']} pincodes ({summary['rows']} rows, "
+              f"{summary['bytes'] / 1024:.1f} KiB) for {summary['day']}: {summary['seconds']}")
+        if summary["skipped"]:
+            print(f"⚠️ No baseline for {len(summary['skipped'])} pincodes (served live): {summary['skipped'][:10]}")
+    table = ForecastTable()
+    print(f"{len(table)} pincodes; {table.metrics()}")
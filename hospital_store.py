@@ -0,0 +1,286 @@
+# agents_project_life/hospital_store.py
+"""
+Indexed, in-memory view of `hospital_details.csv`.
+
+The CSV is parsed once into compact per-column arrays with pincode, city and
+specialty indexes, plus one pre-serialized record dict per hospital so lookups
+only touch the matching rows. Appends to the file are picked up incrementally;
+any other edit triggers a full re-parse.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional
+from io import BytesIO
+import threading
+import time
+import pandas as pd
+import numpy as np
+import os
+
+# ---------- Config ----------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HOSPITAL_DATA_PATH = os.getenv("HOSPITAL_DATA_PATH", os.path.join(BASE_DIR, "hospital_details.csv"))
+# Minimum seconds between two stat() checks of the CSV.
+RELOAD_CHECK_INTERVAL_S = float(os.getenv("HOSPITAL_RELOAD_CHECK_INTERVAL_S", "5"))
+
+INDEXED_COLUMNS = ("pincode", "city", "specialty")
+# Bytes before the previous end-of-file compared to decide whether a change was a pure append.
+_APPEND_SIGNATURE_BYTES = 256
+
+
+# ---------- Snapshot ----------
+@dataclass
+class _Snapshot:
+    """Immutable state swapped in as a whole on every (re)load."""
+    header: bytes
+    size: int
+    mtime_ns: int
+    tail_signature: bytes
+    columns: Dict[str, np.ndarray]
+    records: List[Dict[str, Any]]
+    indexes: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    # Column dtypes inferred by the full load; appended chunks are parsed with them.
+    dtypes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.records)
+
+
+def _index_key(value: Any) -> str:
+    # Pincodes arrive as int from the API and as str from the CSV; normalize both.
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _compact_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    cols: Dict[str, np.ndarray] = {}
+    for name in df.columns:
+        s = df[name]
+        if pd.api.types.is_integer_dtype(s):
+            cols[name] = pd.to_numeric(s, downcast="integer").to_numpy()
+        elif pd.api.types.is_float_dtype(s):
+            cols[name] = s.to_numpy(dtype=np.float32)
+        else:
+            cols[name] = s.astype(object).to_numpy()
+    return cols
+
+
+def _to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # Same shape as the previous read_csv + astype(str) path, so responses are unchanged.
+    if "pincode" in df.columns:
+        df = df.assign(pincode=df["pincode"].astype(str))
+    return df.to_dict(orient="records")
+
+
+def _build_indexes(columns: Dict[str, np.ndarray], offset: int = 0) -> Dict[str, Dict[str, List[int]]]:
+    indexes: Dict[str, Dict[str, List[int]]] = {}
+    for name in INDEXED_COLUMNS:
+        if name not in columns:
+            continue
+        idx: Dict[str, List[int]] = {}
+        for row, value in enumerate(columns[name].tolist()):
+            idx.setdefault(_index_key(value), []).append(offset + row)
+        indexes[name] = idx
+    return indexes
+
+
+# ---------- Store ----------
+class HospitalStore:
+    """
+    Read-mostly hospital lookup. Returned record dicts are shared between
+    callers and must be treated as read-only.
+    """
+
+    def __init__(self, csv_path: str = HOSPITAL_DATA_PATH, check_interval_s: float = RELOAD_CHECK_INTERVAL_S):
+        self.csv_path = csv_path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._snap: Optional[_Snapshot] = None
+        self._next_check = 0.0
+        self.load_count = 0
+        self.append_count = 0
+        self.last_load_seconds = 0.0
+        self.last_error: Optional[str] = None
+
+    # ----- lookups -----
+    def by_pincode(self, pincode: Any) -> List[Dict[str, Any]]:
+        return self._lookup("pincode", pincode)
+
+    def by_city(self, city: str) -> List[Dict[str, Any]]:
+        return self._lookup("city", city)
+
+    def by_specialty(self, specialty: str) -> List[Dict[str, Any]]:
+        return self._lookup("specialty", specialty)
+
+    def rows_for(self, column: str, value: Any) -> np.ndarray:
+        """Row indices into `columns()` for an indexed column value."""
+        snap = self._snapshot()
+        return snap.indexes.get(column, {}).get(_index_key(value), np.empty(0, dtype=np.int32))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return self._snapshot().columns
+
+    def pincodes(self) -> List[str]:
+        return list(self._snapshot().indexes.get("pincode", {}).keys())
+
+    def __len__(self) -> int:
+        return self._snapshot().n_rows
+
+    def metrics(self) -> Dict[str, Any]:
+        snap = self._snap
+        return {
+            "csv_path": self.csv_path,
+            "rows": snap.n_rows if snap else 0,
+            "load_count": self.load_count,
+            "append_count": self.append_count,
+            "last_load_seconds": self.last_load_seconds,
+            "last_error": self.last_error,
+        }
+
+    def _lookup(self, column: str, value: Any) -> List[Dict[str, Any]]:
+        snap = self._snapshot()
+        rows = snap.indexes.get(column, {}).get(_index_key(value))
+        if rows is None:
+            return []
+        records = snap.records
+        return [records[i] for i in rows]
+
+    # ----- loading -----
+    def _snapshot(self) -> _Snapshot:
+        snap = self._snap
+        if snap is None:
+            with self._lock:
+                if self._snap is None:
+                    self._full_load()
+                return self._snap
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._snap
+
+    def reload(self) -> None:
+        with self._lock:
+            self._full_load()
+
+    def _refresh(self) -> None:
+        self._next_check = time.monotonic() + self.check_interval_s
+        try:
+            st = os.stat(self.csv_path)
+        except OSError:
+            # Keep serving the last good snapshot while the file is being replaced.
+            return
+        snap = self._snap
+        if (st.st_mtime_ns, st.st_size) == (snap.mtime_ns, snap.size):
+            return
+        try:
+            if st.st_size > snap.size and self._is_append(snap):
+                self._append(snap, st)
+            else:
+                self._full_load()
+        except Exception as e:
+            # A half-written file must not take lookups down; retry on the next check.
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    def _is_append(self, snap: _Snapshot) -> bool:
+        if not snap.tail_signature.endswith(b"\n"):
+            return False
+        with open(self.csv_path, "rb") as fh:
+            header = fh.readline()
+            fh.seek(snap.size - len(snap.tail_signature))
+            tail = fh.read(len(snap.tail_signature))
+        return header == snap.header and tail == snap.tail_signature
+
+    def _full_load(self) -> None:
+        if not os.path.exists(self.csv_path):
+            raise FileNotFoundError(f"Hospital data not found at {self.csv_path}")
+
+        t0 = time.perf_counter()
+        with open(self.csv_path, "rb") as fh:
+            raw = fh.read()
+        st = os.stat(self.csv_path)
+        df = pd.read_csv(BytesIO(raw))
+
+        columns = _compact_columns(df)
+        records = _to_records(df)
+        indexes = {
+            name: {k: np.asarray(v, dtype=np.int32) for k, v in idx.items()}
+            for name, idx in _build_indexes(columns).items()
+        }
+        self._snap = _Snapshot(
+            header=raw.split(b"\n", 1)[0] + b"\n",
+            size=len(raw),
+            mtime_ns=st.st_mtime_ns,
+            tail_signature=raw[-_APPEND_SIGNATURE_BYTES:],
+            columns=columns,
+            records=records,
+            indexes=indexes,
+            dtypes=df.dtypes.to_dict(),
+        )
+        self._next_check = time.monotonic() + self.check_interval_s
+        self.load_count += 1
+        self.last_load_seconds = round(time.perf_counter() - t0, 4)
+
+    def _append(self, snap: _Snapshot, st: os.stat_result) -> None:
+        t0 = time.perf_counter()
+        with open(self.csv_path, "rb") as fh:
+            fh.seek(snap.size)
+            added = fh.read(st.st_size - snap.size)
+        if not added.strip():
+            self._snap = replace(snap, size=snap.size + len(added), mtime_ns=st.st_mtime_ns,
+                                 tail_signature=(snap.tail_signature + added)[-_APPEND_SIGNATURE_BYTES:])
+            return
+        try:
+            # Parsed alone, a chunk would get its own inferred dtypes (e.g. int ratings);
+            # use the full load's so columns, records and index keys match a reload.
+            new_df = pd.read_csv(BytesIO(snap.header + added), dtype=snap.dtypes)
+        except (TypeError, ValueError):
+            # The new rows do not fit the loaded dtypes (e.g. a fraction in an int column).
+            self._full_load()
+            return
+        if list(new_df.columns) != list(snap.columns.keys()):
+            self._full_load()
+            return
+
+        new_cols = _compact_columns(new_df)
+        columns = {name: np.concatenate([snap.columns[name], new_cols[name]]) for name in snap.columns}
+        records = snap.records + _to_records(new_df)
+
+        indexes = {name: dict(idx) for name, idx in snap.indexes.items()}
+        for name, added_idx in _build_indexes(new_cols, offset=snap.n_rows).items():
+            target = indexes.setdefault(name, {})
+            for key, rows in added_idx.items():
+                prev = target.get(key)
+                new_rows = np.asarray(rows, dtype=np.int32)
+                target[key] = new_rows if prev is None else np.concatenate([prev, new_rows])
+
+        self._snap = _Snapshot(
+            header=snap.header,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            tail_signature=(snap.tail_signature + added)[-_APPEND_SIGNATURE_BYTES:],
+            columns=columns,
+            records=records,
+            indexes=indexes,
+            dtypes=snap.dtypes,
+        )
+        self.append_count += 1
+        self.last_load_seconds = round(time.perf_counter() - t0, 4)
+
+
+# ---------- Process-wide access ----------
+_stores: Dict[str, HospitalStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_hospital_store(csv_path: str = HOSPITAL_DATA_PATH) -> HospitalStore:
+    """Returns the shared store for `csv_path`, creating it on first use."""
+    key = os.path.abspath(csv_path)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, HospitalStore(key))
+    return store
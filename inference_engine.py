@@ -0,0 +1,102 @@
+# agents_project_life/inference_engine.py
+"""
+Single-pass inference over all forecast heads.
+
+One shared feature matrix goes through the patient-load regressor and the
+disease-spike and spike-intensity classifiers. Each classifier is called
+once for its class probabilities, which give both the label (argmax) and
+its confidence, so serving the intensity head costs one extra booster call
+instead of the AQI lookup it replaces.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from feature_encoder import predict_values, predict_proba
+
+
+# ---------- Result ----------
+@dataclass
+class HeadOutputs:
+    """
+    Predictions of every head for the same rows. Arrays are (rows,) for one
+    pass, or (days, rows) once stacked by InferenceEngine.forecast.
+    intensity fields are None when the bundle has no intensity_model.
+    """
+    load: np.ndarray
+    disease: np.ndarray
+    disease_confidence: np.ndarray
+    intensity: Optional[np.ndarray] = None
+    intensity_confidence: Optional[np.ndarray] = None
+
+    @classmethod
+    def stack(cls, steps: List["HeadOutputs"]) -> "HeadOutputs":
+        has_intensity = steps[0].intensity is not None
+        return cls(
+            load=np.vstack([s.load for s in steps]),
+            disease=np.vstack([s.disease for s in steps]),
+            disease_confidence=np.vstack([s.disease_confidence for s in steps]),
+            intensity=np.vstack([s.intensity for s in steps]) if has_intensity else None,
+            intensity_confidence=np.vstack([s.intensity_confidence for s in steps]) if has_intensity else None,
+        )
+
+    def column(self, j: int) -> "HeadOutputs":
+        """Per-day outputs of row j from a stacked (days, rows) result."""
+        return HeadOutputs(
+            load=self.load[:, j],
+            disease=self.disease[:, j],
+            disease_confidence=self.disease_confidence[:, j],
+            intensity=self.intensity[:, j] if self.intensity is not None else None,
+            intensity_confidence=self.intensity_confidence[:, j] if self.intensity is not None else None,
+        )
+
+    def first(self, days: int) -> "HeadOutputs":
+        """The first `days` forecast days of a stacked result or of a column."""
+        return HeadOutputs(
+            load=self.load[:days],
+            disease=self.disease[:days],
+            disease_confidence=self.disease_confidence[:days],
+            intensity=self.intensity[:days] if self.intensity is not None else None,
+            intensity_confidence=self.intensity_confidence[:days] if self.intensity is not None else None,
+        )
+
+
+def _labels(model: Any, proba: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # argmax of the two-column binary form is the same p > 0.5 rule LGBMClassifier.predict uses.
+    idx = proba.argmax(axis=1)
+    return np.asarray(model.classes_)[idx].astype(str), proba[np.arange(len(proba)), idx]
+
+
+# ---------- Engine ----------
+class InferenceEngine:
+    """All heads of one model bundle behind a single predict(X)."""
+
+    def __init__(self, bundle: Dict[str, Any]):
+        self.load_model = bundle["load_model"]
+        self.disease_model = bundle["disease_model"]
+        self.intensity_model = bundle.get("intensity_model")
+
+    def predict(self, X: np.ndarray) -> HeadOutputs:
+        load = np.asarray(predict_values(self.load_model, X), dtype=float)
+        disease, disease_conf = _labels(self.disease_model, predict_proba(self.disease_model, X))
+        out = HeadOutputs(load=load, disease=disease, disease_confidence=disease_conf)
+        if self.intensity_model is not None:
+            out.intensity, out.intensity_confidence = _labels(
+                self.intensity_model, predict_proba(self.intensity_model, X)
+            )
+        return out
+
+    def forecast(self, X: np.ndarray, days: int = 3,
+                 roll: Optional[Callable[[np.ndarray, HeadOutputs], None]] = None) -> HeadOutputs:
+        """
+        Recursive `days`-step forecast for every row of X at once: one pass of
+        all heads per day. `roll(X, step)` updates X in place (lag features)
+        between days. Returns (days, rows) arrays.
+        """
+        steps: List[HeadOutputs] = []
+        for i in range(days):
+            if i > 0 and roll is not None:
+                roll(X, steps[-1])
+            steps.append(self.predict(X))
+        return HeadOutputs.stack(steps)
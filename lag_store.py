@@ -0,0 +1,332 @@
+# agents_project_life/lag_store.py
+"""
+Memory-mapped per-pincode lag history for online inference.
+
+One file holds a fixed header, the sorted pincodes and a
+(pincodes, 14 days, 6 columns) float32 ring of patient load and case counts.
+Readers map it read-only, so every worker process shares the same page-cache
+pages instead of its own copy; a pincode -> row dict makes lookups O(1). The
+daily roll-forward writes one slot per pincode in place and then bumps the
+ring head in the header, which readers see on their next lookup.
+
+Only one writer (the daily job) may append at a time. A full rebuild writes
+a new file and renames it over the old one; readers reopen on their next
+stat() check.
+"""
+from __future__ import annotations
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+import threading
+import time
+import os
+import numpy as np
+
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+
+# ---------- Config ----------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LAG_STORE_PATH = os.getenv("LAG_STORE_PATH", os.path.join(BASE_DIR, "lag_store.bin"))
+# Minimum seconds between two stat() checks for a rebuilt file.
+RELOAD_CHECK_INTERVAL_S = float(os.getenv("LAG_STORE_RELOAD_CHECK_INTERVAL_S", "5"))
+
+LAG_WINDOW = max(LAG_DAYS)
+_MAGIC = b"LAGSTOR1"
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("n_rows", "<i8"),
+    ("window", "<i8"),
+    ("n_cols", "<i8"),
+    ("head", "<i8"),      # slot the next day is written to; (head - 1) % window is the latest day
+    ("last_day", "<i8"),  # date.toordinal() of the latest day
+    ("pad", "S16"),
+])  # 64 bytes
+
+
+def _layout(n_rows: int) -> Tuple[int, int]:
+    """(pincode array offset, values offset) for a store with n_rows pincodes."""
+    return _HEADER.itemsize, _HEADER.itemsize + 8 * n_rows
+
+
+# ---------- Build ----------
+def write_lag_store(path: str, pincodes: Sequence[int], history: np.ndarray, last_day: date) -> None:
+    """
+    Writes a new store atomically. `history` is (pincodes, window, columns)
+    in chronological order (last index = `last_day`); NaN marks unknown days.
+    """
+    pincodes = np.asarray(pincodes, dtype=np.int64)
+    history = np.asarray(history, dtype=np.float32)
+    if history.shape[0] != len(pincodes) or history.ndim != 3:
+        raise ValueError("history must be shaped (len(pincodes), window, columns)")
+    order = np.argsort(pincodes, kind="stable")
+    pincodes, history = pincodes[order], history[order]
+    if len(pincodes) and (np.diff(pincodes) == 0).any():
+        raise ValueError("Duplicate pincodes in lag store")
+
+    n, window, n_cols = history.shape
+    header = np.zeros(1, dtype=_HEADER)
+    header[0] = (_MAGIC, n, window, n_cols, 0, last_day.toordinal(), b"")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(header.tobytes())
+        fh.write(pincodes.tobytes())
+        fh.write(np.ascontiguousarray(history).tobytes())
+    os.replace(tmp, path)
+
+
+def build_lag_store(path: str, ring: Any) -> None:
+    """
+    Store from a series_forecaster.SeriesRing (e.g. built from the training
+    history). Keyed by pincode only; if a pincode appears under several
+    cities the last series wins.
+    """
+    order = (np.arange(ring.window) + ring.head) % ring.window  # oldest -> latest slot
+    history = ring.values[:, order].astype(np.float32)
+    last_dates = ring.last_dates.astype("datetime64[D]")
+    last_day = last_dates.max()
+    # Series that end early are shifted so every row's last slot is `last_day`.
+    behind = (last_day - last_dates).astype(np.int64)
+    for gap in np.unique(behind[behind > 0]):
+        rows = behind == gap
+        shifted = np.full_like(history[rows], np.nan)
+        if gap < ring.window:
+            shifted[:, :ring.window - gap] = history[rows][:, gap:]
+        history[rows] = shifted
+
+    pincodes = ring.keys["pincode"].to_numpy(dtype=np.int64)
+    _, last = np.unique(pincodes[::-1], return_index=True)
+    keep = np.sort(len(pincodes) - 1 - last)
+    write_lag_store(path, pincodes[keep], history[keep], last_day.item())
+
+
+# ---------- Store ----------
+class LagStore:
+    """Read side (any number of processes) plus the daily append API."""
+
+    def __init__(self, path: str = LAG_STORE_PATH, check_interval_s: float = RELOAD_CHECK_INTERVAL_S):
+        self.path = path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._state: Optional[Tuple[np.ndarray, np.ndarray, Dict[int, int], Tuple[int, int]]] = None
+        self._next_check = 0.0
+        self.load_count = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_error: Optional[str] = None
+
+    # ----- lookups -----
+    def lags(self, pincode: Any) -> Optional[np.ndarray]:
+        """(len(LAG_DAYS), columns) values for lags 1, 2, 3, 7, 14, or None if unknown."""
+        values, found = self.lags_many([pincode])
+        return values[0] if found[0] else None
+
+    def lags_many(self, pincodes: Iterable[Any], lag_days: Sequence[int] = LAG_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+        """(values (n, len(lag_days), columns), found (n,) bool); rows of unknown pincodes are NaN."""
+        pincodes = list(pincodes)
+        state = self._snapshot()
+        n_cols = len(LAG_COLUMNS) if state is None else state[1].shape[2]
+        out = np.full((len(pincodes), len(lag_days), n_cols), np.nan, dtype=np.float32)
+        found = np.zeros(len(pincodes), dtype=bool)
+        if state is None:
+            self._count(found)
+            return out, found
+
+        header, values, index, _ = state
+        window, head = int(header["window"][0]), int(header["head"][0])
+        slots = [(head - k) % window for k in lag_days]
+        rows = np.fromiter((index.get(int(p), -1) for p in pincodes), dtype=np.int64, count=len(pincodes))
+        found = rows >= 0
+        if found.any():
+            out[found] = values[rows[found]][:, slots]
+        self._count(found)
+        return out, found
+
+    def window_many(self, pincodes: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (values (n, window, columns) oldest day first, found (n,) bool): the
+        whole window per pincode, as a forecast_horizon.LagRing starts from.
+        """
+        pincodes = list(pincodes)
+        state = self._snapshot()
+        if state is None:
+            found = np.zeros(len(pincodes), dtype=bool)
+            self._count(found)
+            return np.full((len(pincodes), LAG_WINDOW, len(LAG_COLUMNS)), np.nan, dtype=np.float32), found
+
+        header, values, index, _ = state
+        window, head = int(header["window"][0]), int(header["head"][0])
+        out = np.full((len(pincodes), window, values.shape[2]), np.nan, dtype=np.float32)
+        rows = np.fromiter((index.get(int(p), -1) for p in pincodes), dtype=np.int64, count=len(pincodes))
+        found = rows >= 0
+        if found.any():
+            out[found] = values[rows[found]][:, (np.arange(window) + head) % window]
+        self._count(found)
+        return out, found
+
+    def _count(self, found: np.ndarray) -> None:
+        # Lookups run on many request threads at once; += on the counters is not atomic.
+        hits = int(found.sum())
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += len(found) - hits
+
+    def history(self, pincode: Any) -> Optional[np.ndarray]:
+        """(window, columns) values for one pincode, oldest day first."""
+        state = self._snapshot()
+        row = None if state is None else state[2].get(int(pincode))
+        if row is None:
+            return None
+        header, values = state[0], state[1]
+        window, head = int(header["window"][0]), int(header["head"][0])
+        return np.array(values[row][(np.arange(window) + head) % window])
+
+    @property
+    def last_day(self) -> Optional[date]:
+        state = self._snapshot()
+        return None if state is None else date.fromordinal(int(state[0]["last_day"][0]))
+
+    @property
+    def version(self) -> Optional[str]:
+        """Changes on every append or rebuild; part of the forecast cache key."""
+        state = self._snapshot()
+        if state is None:
+            return None
+        return f"{state[3][0]}:{int(state[0]['last_day'][0])}:{int(state[0]['head'][0])}"
+
+    def __len__(self) -> int:
+        state = self._snapshot()
+        return 0 if state is None else len(state[2])
+
+    def metrics(self) -> Dict[str, Any]:
+        state = self._snapshot()
+        last_day = None if state is None else date.fromordinal(int(state[0]["last_day"][0]))
+        return {
+            "path": self.path,
+            "pincodes": 0 if state is None else len(state[2]),
+            "last_day": last_day.isoformat() if last_day else None,
+            "age_days": (date.today() - last_day).days if last_day else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "load_count": self.load_count,
+            "last_error": self.last_error,
+        }
+
+    # ----- daily roll-forward -----
+    def append(self, day: date, pincodes: Sequence[Any], values: np.ndarray) -> int:
+        """
+        Writes `day` (must be after last_day) for every pincode in the store:
+        rows for `pincodes` get `values` (len(pincodes), columns), all others
+        NaN. Skipped days are filled with NaN. Returns the number of
+        pincodes updated; unknown pincodes are ignored.
+        """
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Lag store not found at {self.path}; build it first")
+        mm = np.memmap(self.path, dtype=np.uint8, mode="r+")
+        try:
+            header = mm[:_HEADER.itemsize].view(_HEADER)
+            n, window, n_cols = int(header["n_rows"][0]), int(header["window"][0]), int(header["n_cols"][0])
+            gap = day.toordinal() - int(header["last_day"][0])
+            if gap <= 0:
+                raise ValueError(f"{day} is not after the store's last day {date.fromordinal(int(header['last_day'][0]))}")
+            pin_off, val_off = _layout(n)
+            stored = mm[pin_off:val_off].view(np.int64)
+            ring = mm[val_off:].view(np.float32).reshape(n, window, n_cols)
+
+            pincodes = np.asarray(pincodes, dtype=np.int64)
+            values = np.asarray(values, dtype=np.float32).reshape(len(pincodes), n_cols)
+            pos = np.searchsorted(stored, pincodes)
+            known = (pos < n) & (stored[np.minimum(pos, n - 1)] == pincodes) if n else np.zeros(len(pincodes), bool)
+
+            head = int(header["head"][0])
+            for _ in range(min(gap - 1, window)):
+                ring[:, head] = np.nan
+                head = (head + 1) % window
+            day_values = np.full((n, n_cols), np.nan, dtype=np.float32)
+            day_values[pos[known]] = values[known]
+            ring[:, head] = day_values
+            mm.flush()
+            # Publish only after the slot is written, so readers never see a half-filled day as the latest.
+            header["last_day"] = day.toordinal()
+            header["head"] = (head + 1) % window
+            mm.flush()
+            return int(known.sum())
+        finally:
+            del mm
+
+    # ----- loading -----
+    def _snapshot(self):
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            finally:
+                self._lock.release()
+        return self._state
+
+    def reload(self) -> None:
+        with self._lock:
+            self._state = None
+            self._refresh()
+
+    def _refresh(self) -> None:
+        self._next_check = time.monotonic() + self.check_interval_s
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        identity = (st.st_ino, st.st_size)
+        if self._state is not None and self._state[3] == identity:
+            return
+        try:
+            mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+            header = mm[:_HEADER.itemsize].view(_HEADER)
+            if header["magic"][0] != _MAGIC:
+                raise ValueError(f"{self.path} is not a lag store")
+            n, window, n_cols = int(header["n_rows"][0]), int(header["window"][0]), int(header["n_cols"][0])
+            pin_off, val_off = _layout(n)
+            pincodes = mm[pin_off:val_off].view(np.int64)
+            values = mm[val_off:val_off + 4 * n * window * n_cols].view(np.float32).reshape(n, window, n_cols)
+            index = {int(p): i for i, p in enumerate(pincodes.tolist())}
+            # header is a view into the shared mapping, so appends by the writer show up live.
+            self._state = (header, values, index, identity)
+            self.load_count += 1
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+
+
+# ---------- Process-wide access ----------
+_stores: Dict[str, LagStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_lag_store(path: str = LAG_STORE_PATH) -> LagStore:
+    """Process-wide LagStore for `path`."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = LagStore(path)
+        return store
+
+
+# ---------- CLI ----------
+if __name__ == "__main__":
+    # python lag_store.py build               -> from the training Parquet history
+    # python lag_store.py append <day.csv>    -> one day: date, pincode + LAG_COLUMNS
+    import sys
+    import pandas as pd
+
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if cmd == "build":
+        from training_data import TRAIN_PARQUET_DIR, CAT_COLUMNS, list_partitions, read_partition, category_codes
+        from series_forecaster import SeriesRing
+
+        codes = category_codes(TRAIN_PARQUET_DIR, CAT_COLUMNS)
+        ring = SeriesRing.concat([SeriesRing.from_frame(read_partition(TRAIN_PARQUET_DIR, c, codes=codes))
+                                  for c in list_partitions(TRAIN_PARQUET_DIR)])
+        build_lag_store(LAG_STORE_PATH, ring)
+    elif cmd == "append":
+        day_df = pd.read_csv(sys.argv[2])
+        day = pd.to_datetime(day_df["date"]).dt.date.max()
+        n = LagStore().append(day, day_df["pincode"].to_numpy(), day_df[list(LAG_COLUMNS)].to_numpy())
+        print(f"Appended {day} for {n} pincodes")
+    store = LagStore()
+    print(store.metrics())
@@ -0,0 +1,231 @@
+# agents_project_life/llm_cache.py
+"""
+Persistent cache of Gemini planner responses.
+
+Entries live in a small SQLite file keyed by a SHA-256 of the model name
+and the whitespace-normalized prompt, so identical surge type / severity /
+hospital-set prompts are answered from disk across restarts. Entries expire
+after a TTL and the least recently used ones are evicted once the file holds
+more than LLM_CACHE_MAX_BYTES of responses.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import os
+
+T = TypeVar("T")
+
+# ---------- Config ----------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_response_cache.sqlite3")
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", str(24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_WS_RE = re.compile(r"\s+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+)
+"""
+
+
+def prompt_fingerprint(prompt: str, model_name: str) -> str:
+    """Hash of the model name + prompt with whitespace runs collapsed."""
+    normalized = _WS_RE.sub(" ", prompt).strip()
+    return hashlib.sha256(f"{model_name}\n{normalized}".encode("utf-8")).hexdigest()
+
+
+# ---------- Cache ----------
+class LLMResponseCache:
+    """
+    Read-through/write-through store of raw response text.
+    put_parsed() only writes a response after `parse` accepted it, and
+    get_first() drops entries that no longer parse, so malformed model
+    output is never served from the cache.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl_s: float = LLM_CACHE_TTL_S,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES, enabled: bool = LLM_CACHE_ENABLED):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.rejected = 0
+        self.expired = 0
+        self.evictions = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    def _db(self) -> sqlite3.Connection:
+        # Opened lazily so importing the agent never touches the disk.
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+            self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, prompt: str, model_name: str) -> Optional[str]:
+        """Cached response text, or None on a miss / expired entry."""
+        if not self.enabled:
+            return None
+        key = prompt_fingerprint(prompt, model_name)
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                row = db.execute("SELECT response, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[2] + self.ttl_s <= now:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._bytes -= row[1]
+                    self.expired += 1
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                self._record_error(e)
+                return None
+
+    def put(self, prompt: str, model_name: str, response: str) -> None:
+        if not self.enabled:
+            return
+        key = prompt_fingerprint(prompt, model_name)
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                old = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model_name, response, size, now, now),
+                )
+                self._bytes += size - (old[0] if old else 0)
+                self.stores += 1
+                self._evict(db)
+            except sqlite3.Error as e:
+                self._record_error(e)
+
+    def get_first(self, prompt: str, model_names: Sequence[str],
+                  parse: Callable[[str], T]) -> Optional[Tuple[str, str, T]]:
+        """
+        (model name, text, parse(text)) for the first of `model_names` with a
+        cached answer to `prompt` that still parses, or None.
+        """
+        for model_name in model_names:
+            cached = self.get(prompt, model_name)
+            if cached is None:
+                continue
+            try:
+                return model_name, cached, parse(cached)
+            except Exception:
+                # Written by an older parser that accepted it; drop and re-ask.
+                self.invalidate(prompt, model_name)
+        return None
+
+    def put_parsed(self, prompt: str, model_name: str, text: str, parse: Callable[[str], T]) -> T:
+        """parse(text), storing the text under `model_name` once parsing succeeded."""
+        try:
+            value = parse(text)
+        except Exception:
+            with self._lock:
+                self.rejected += 1
+            raise
+        self.put(prompt, model_name, text)
+        return value
+
+    def invalidate(self, prompt: str, model_name: str) -> None:
+        key = prompt_fingerprint(prompt, model_name)
+        with self._lock:
+            try:
+                db = self._db()
+                row = db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._bytes -= row[0]
+            except sqlite3.Error as e:
+                self._record_error(e)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                self._db().execute("DELETE FROM responses")
+                self._bytes = 0
+            except sqlite3.Error as e:
+                self._record_error(e)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = 0
+            if self.enabled and self._conn is not None:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "path": self.path,
+                "entries": entries,
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drops expired entries, then least recently used ones, until under max_bytes."""
+        if self._bytes <= self.max_bytes:
+            return
+        cutoff = time.time() - self.ttl_s
+        freed, n = db.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE created <= ?", (cutoff,)).fetchone()
+        if n:
+            db.execute("DELETE FROM responses WHERE created <= ?", (cutoff,))
+            self._bytes -= freed
+            self.expired += n
+        rows = db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        if doomed:
+            db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+
+    def _record_error(self, e: Exception) -> None:
+        # A broken cache file must never take the planner down; it just stops caching.
+        self.errors += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+        print(f"⚠️ LLM cache error: {self.last_error}")
+
+
+llm_cache = LLMResponseCache()
@@ -1,9 +1,19 @@
 import re
 import json
 import time
+import os
+import random
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
 import google.generativeai as genai
-from typing import Dict, Any
-from ml_model.agents_project_life.ML_andRetriever_agent import run_agent1  # Agent 1 (forecaster + hospital retriever)
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Protocol, Tuple, TypeVar
+from ML_andRetriever_agent import run_agent1, HOSPITAL_DATA_PATH  # Agent 1 (forecaster + hospital retriever)
+from hospital_store import get_hospital_store
+from llm_cache import llm_cache
+from planner_rules import NON_TARGET, rule_plans, select_rows
+from plan_stream import PlanStreamParser
 
 # -----------------------------
 # CONFIGURATION
@@ -13,43 +23,134 @@ genai.configure(api_key=GOOGLE_API_KEY)
 
 PRIMARY_MODEL = "models/gemini-pro-latest"
 FALLBACK_MODEL = "models/gemini-flash-latest"
+# Cached answers are keyed by the model that wrote them; lookups prefer the primary model's.
+CACHE_LOOKUP_MODELS = (PRIMARY_MODEL, FALLBACK_MODEL)
+
+# Max Gemini calls in flight at once for the async planner.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Base delay (seconds) for jittered exponential backoff between retries.
+LLM_BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "1.0"))
+
+# Planner mode: "llm" | "hybrid" | "rules" | "auto" (see run_agent2_llm). The rule-based
+# modes are opt-in; by default every hospital's role and actions come from the LLM.
+PLANNER_MODE = os.getenv("PLANNER_MODE", "llm")
+PLANNER_MODES = ("llm", "hybrid", "rules", "auto")
+# Severities that "auto" plans with rules only (no LLM call).
+PLANNER_RULES_SEVERITIES = [s.strip() for s in os.getenv("PLANNER_RULES_SEVERITIES", "Low,Moderate").split(",") if s.strip()]
+
+# Error substrings that mean "switch to the fallback model" rather than "retry".
+_FALLBACK_ERRORS = ["not found", "quota", "limit", "unavailable"]
+
+
+# -----------------------------
+# MODEL CLIENTS (reused across calls)
+# -----------------------------
+_models: Dict[str, "genai.GenerativeModel"] = {}
+_models_lock = threading.Lock()
+
+
+def get_gemini_model(model_name: str) -> "genai.GenerativeModel":
+    """Returns a shared GenerativeModel per model name instead of building one per attempt."""
+    model = _models.get(model_name)
+    if model is None:
+        with _models_lock:
+            model = _models.setdefault(model_name, genai.GenerativeModel(model_name))
+    return model
+
+
+class LLMClient(Protocol):
+    """Anything that can answer a prompt asynchronously; lets tests plug in a fake LLM."""
+
+    async def generate(self, model_name: str, prompt: str) -> str: ...
+
+
+class StreamingLLMClient(LLMClient, Protocol):
+    """LLMClient that can also yield the answer in chunks while it is generated."""
+
+    def stream(self, model_name: str, prompt: str) -> AsyncIterator[str]: ...
+
+
+class GeminiClient:
+    """LLMClient backed by the shared google.generativeai models."""
+
+    async def generate(self, model_name: str, prompt: str) -> str:
+        response = await get_gemini_model(model_name).generate_content_async(prompt)
+        return response.text if response else ""
+
+    async def stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        response = await get_gemini_model(model_name).generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            # Chunks without text parts (e.g. safety/finish metadata) raise on .text.
+            if chunk.parts:
+                yield chunk.text
+
+
+def _backoff_delay(attempt: int, base: float = LLM_BACKOFF_BASE_S) -> float:
+    # Full jitter: spread retries from concurrent callers instead of retrying in lockstep.
+    return random.uniform(0, base * (2 ** attempt))
 
 
 # -----------------------------
 # GEMINI CALLER WITH FALLBACK
 # -----------------------------
-def call_gemini_with_fallback(prompt: str, retries: int = 2) -> str:
-    """Calls Gemini Pro with auto fallback to Flash if unavailable."""
+T = TypeVar("T")
+
+
+async def call_with_fallback(call: Callable[[str], Awaitable[T]], retries: int = 2,
+                             backoff_base_s: float = LLM_BACKOFF_BASE_S) -> Tuple[str, T]:
+    """
+    Retry / fallback policy shared by every Gemini call path. `call(model_name)`
+    is the call strategy (blocking generate, async generate, or opening a
+    stream); a falsy result counts as an empty answer. Errors that mean the
+    model is unavailable switch to Flash for that attempt; other errors retry
+    Pro with jittered backoff. Returns (model that answered, result).
+    """
     for attempt in range(retries):
         try:
-            model = genai.GenerativeModel(PRIMARY_MODEL)
-            response = model.generate_content(prompt)
-            if response and response.text:
-                return response.text
+            result = await call(PRIMARY_MODEL)
+            if result:
+                return PRIMARY_MODEL, result
 
         except Exception as e:
             err = str(e)
             print(f"⚠️ Gemini Pro error: {err}")
-            if any(k in err.lower() for k in ["not found", "quota", "limit", "unavailable"]):
+            if any(k in err.lower() for k in _FALLBACK_ERRORS):
                 print(f"⚙️ Falling back → {FALLBACK_MODEL}")
                 try:
-                    model = genai.GenerativeModel(FALLBACK_MODEL)
-                    response = model.generate_content(prompt)
-                    if response and response.text:
-                        return response.text
+                    result = await call(FALLBACK_MODEL)
+                    if result:
+                        return FALLBACK_MODEL, result
                 except Exception as f2:
                     print("❌ Fallback model failed:", f2)
                     raise f2
 
             # Retry on transient errors
             if attempt < retries - 1:
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(_backoff_delay(attempt, backoff_base_s))
             else:
                 raise
 
     raise RuntimeError("All Gemini attempts failed.")
 
 
+def gemini_with_fallback(prompt: str, retries: int = 2) -> Tuple[str, str]:
+    """
+    (model that answered, text) from Gemini Pro with auto fallback to Flash.
+    Blocking: runs the shared policy on a private event loop, so it must not
+    be called from a running loop (use AsyncPlanner.call_llm there).
+    """
+    async def generate(model_name: str) -> str:
+        response = get_gemini_model(model_name).generate_content(prompt)
+        return response.text if response else ""
+
+    return asyncio.run(call_with_fallback(generate, retries))
+
+
+def call_gemini_with_fallback(prompt: str, retries: int = 2) -> str:
+    """Calls Gemini Pro with auto fallback to Flash if unavailable."""
+    return gemini_with_fallback(prompt, retries)[1]
+
+
 # -----------------------------
 # JSON CLEANUP / EXTRACTION
 # -----------------------------
@@ -76,24 +177,187 @@ def extract_json_from_text(text: str) -> dict:
 
 
 # -----------------------------
-# AGENT 2 — LLM PLANNER
+# HOSPITAL SHARDING + PLAN MERGING
 # -----------------------------
-def run_agent2_llm(input_payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Uses Gemini 2.x to create individualized hospital surge plans."""
+# Only what the rules and actions need; contact/last_updated/city/pincode are dropped.
+PLANNER_HOSPITAL_FIELDS = [
+    "hospital_id", "hospital_name", "specialty", "total_beds", "icu_beds", "ventilators",
+    "doctors_available", "nurses_available", "oxygen_cylinders", "ppe_kits",
+    "emergency_available", "rating",
+]
+# Prompt budget for the hospital list of one shard (~4 chars per token).
+PLANNER_SHARD_TOKEN_BUDGET = int(os.getenv("PLANNER_SHARD_TOKEN_BUDGET", "1500"))
+# Caps the plans one response must hold, which is what truncates long JSON outputs.
+PLANNER_MAX_HOSPITALS_PER_SHARD = int(os.getenv("PLANNER_MAX_HOSPITALS_PER_SHARD", "10"))
 
-    # 1️⃣ Run Agent 1 (forecaster)
-    agent1_output = run_agent1(input_payload)
+PLAN_ROLES = {"Primary-Surge-Center", "Support-Overflow", "Non-Target"}
+ACTION_KEYS = ["staffing", "capacity", "inventory", "coordination"]
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def compact_hospitals(hospitals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{k: h[k] for k in PLANNER_HOSPITAL_FIELDS if k in h} for h in hospitals]
+
+
+def _compact_json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def shard_hospitals(hospitals: List[Dict[str, Any]], token_budget: int = PLANNER_SHARD_TOKEN_BUDGET,
+                    max_per_shard: int = PLANNER_MAX_HOSPITALS_PER_SHARD,
+                    fields: Optional[List[str]] = PLANNER_HOSPITAL_FIELDS) -> List[List[Dict[str, Any]]]:
+    """
+    Greedy split of hospital records into shards under the token budget and
+    size cap. Records are first reduced to `fields` (None keeps them as-is).
+    """
+    shards: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    used = 0
+    records = hospitals if fields is None else [{k: h[k] for k in fields if k in h} for h in hospitals]
+    for h in records:
+        cost = estimate_tokens(_compact_json(h))
+        if current and (used + cost > token_budget or len(current) >= max_per_shard):
+            shards.append(current)
+            current, used = [], 0
+        current.append(h)
+        used += cost
+    if current or not shards:
+        shards.append(current)
+    return shards
+
+
+def _as_int(value: Any) -> Any:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _plan_header(agent1_output: Dict[str, Any]) -> Dict[str, Any]:
+    surge = agent1_output["surgeForecast"]
+    return {
+        "pincode": str(agent1_output.get("pincode")),
+        "surgeType": surge["primarySurgeType"],
+        "surgeSeverity": surge["primarySurgeSeverity"],
+        "environmentalContext": surge.get("environmentalContext", {}),
+        "hospitalPlans": [],
+    }
+
+
+def _llm_plan_entry(plan: Any, by_id: Dict[Any, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    One LLM hospitalPlan in the output schema, or None unless it names a
+    hospital from `by_id` (its shard) and a known role.
+    """
+    hid = _as_int(plan.get("hospital_id")) if isinstance(plan, dict) else None
+    if hid not in by_id or plan.get("role") not in PLAN_ROLES:
+        return None
+    actions = plan.get("recommendedActions") if isinstance(plan.get("recommendedActions"), dict) else {}
+    rationale = plan.get("rationale")
+    return {
+        "hospital_id": hid,
+        "hospital_name": plan.get("hospital_name") or by_id[hid].get("hospital_name"),
+        "specialty": plan.get("specialty") or by_id[hid].get("specialty"),
+        "role": plan["role"],
+        "rationale": rationale if isinstance(rationale, list) else [str(rationale)] if rationale else [],
+        "recommendedActions": {k: list(actions.get(k) or []) for k in ACTION_KEYS},
+    }
+
+
+def _llm_actions(plan: Any, shard_ids: set) -> Optional[Tuple[Any, Dict[str, List[Any]]]]:
+    """(hospital_id, recommendedActions) from an actions-only LLM entry, or None if unusable."""
+    hid = _as_int(plan.get("hospital_id")) if isinstance(plan, dict) else None
+    actions = plan.get("recommendedActions") if isinstance(plan, dict) else None
+    if hid not in shard_ids or not isinstance(actions, dict):
+        return None
+    return hid, {k: list(actions.get(k) or []) for k in ACTION_KEYS}
+
+
+def merge_shard_plans(agent1_output: Dict[str, Any], shard_hospital_lists: List[List[Dict[str, Any]]],
+                      shard_outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combines per-shard LLM outputs into one plan in the original schema.
+    Header fields come from Agent 1; each hospitalPlan must name a hospital
+    from its own shard and a known role, and gets any missing keys filled in.
+    Plans that fail validation are dropped and reported in plannerStats.
+    """
+    merged = _plan_header(agent1_output)
+    seen = set()
+    invalid = 0
+    for hospitals, output in zip(shard_hospital_lists, shard_outputs):
+        by_id = {_as_int(h.get("hospital_id")): h for h in hospitals}
+        for plan in output.get("hospitalPlans") or []:
+            entry = _llm_plan_entry(plan, by_id)
+            if entry is None or entry["hospital_id"] in seen:
+                invalid += 1
+                continue
+            seen.add(entry["hospital_id"])
+            merged["hospitalPlans"].append(entry)
+    all_ids = [_as_int(h.get("hospital_id")) for shard in shard_hospital_lists for h in shard]
+    merged["plannerStats"] = {
+        "invalidPlans": invalid,
+        "missingHospitalIds": [hid for hid in all_ids if hid not in seen],
+    }
+    return merged
+
+
+def merge_rule_plans(agent1_output: Dict[str, Any], rules_plans: List[Dict[str, Any]],
+                     shard_hospital_lists: List[List[Dict[str, Any]]],
+                     shard_outputs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Rule-assigned plans with recommendedActions overlaid from the LLM
+    (mode="hybrid"). Roles, rationale and capacityCaps are never taken
+    from the LLM; hospitals it skipped keep their template actions.
+    """
+    merged = _plan_header(agent1_output)
+    by_id = {p["hospital_id"]: dict(p) for p in rules_plans}
+    seen = set()
+    invalid = 0
+    for hospitals, output in zip(shard_hospital_lists, shard_outputs):
+        shard_ids = {_as_int(h.get("hospital_id")) for h in hospitals}
+        for plan in output.get("hospitalPlans") or []:
+            found = _llm_actions(plan, shard_ids)
+            if found is None or found[0] in seen:
+                invalid += 1
+                continue
+            hid, actions = found
+            seen.add(hid)
+            by_id[hid]["recommendedActions"] = actions
+    merged["hospitalPlans"] = list(by_id.values())
+    all_ids = [_as_int(h.get("hospital_id")) for shard in shard_hospital_lists for h in shard]
+    merged["plannerStats"] = {
+        "invalidPlans": invalid,
+        "missingHospitalIds": [hid for hid in all_ids if hid not in seen],
+    }
+    return merged
+
+
+# -----------------------------
+# PROMPT
+# -----------------------------
+def agent1_hospitals(agent1_output: Dict[str, Any]) -> List[Dict[str, Any]]:
+    hospitals_data = agent1_output.get("hospitals", [])
+    return hospitals_data.get("records") if isinstance(hospitals_data, dict) else hospitals_data
+
+
+def build_planner_prompt(agent1_output: Dict[str, Any], hospitals: Optional[List[Dict[str, Any]]] = None) -> str:
+    """
+    Builds the hospital planning prompt from Agent 1's forecast and a
+    (shard of) compact hospital records; defaults to all of Agent 1's hospitals.
+    """
     surge = agent1_output["surgeForecast"]
     surge_type = surge["primarySurgeType"]
     surge_severity = surge["primarySurgeSeverity"]
     env = surge.get("environmentalContext", {})
     pincode = agent1_output.get("pincode")
 
-    hospitals_data = agent1_output.get("hospitals", [])
-    hospitals = hospitals_data.get("records") if isinstance(hospitals_data, dict) else hospitals_data
+    if hospitals is None:
+        hospitals = compact_hospitals(agent1_hospitals(agent1_output))
 
-    # 2️⃣ Build contextual prompt
-    context = f"""
+    return f"""
 You are an **AI Hospital Operations Planner**.
 
 You will receive a 72-hour surge forecast and a list of hospitals in pincode {pincode}.
@@ -140,14 +404,44 @@ Generate an individualized operational plan for each hospital based on the surge
 }}
 
 ### Hospitals Data
-{json.dumps(hospitals, indent=2, ensure_ascii=False)}
+{_compact_json(hospitals)}
 
 Return valid JSON only — no markdown, no explanations.
 """
 
-    # 3️⃣ Call Gemini and extract JSON
-    response_text = call_gemini_with_fallback(context)
 
+def build_actions_prompt(agent1_output: Dict[str, Any], hospitals: List[Dict[str, Any]]) -> str:
+    """Asks only for recommendedActions; roles and caps were already assigned by planner_rules."""
+    surge = agent1_output["surgeForecast"]
+    surge_type = surge["primarySurgeType"]
+    surge_severity = surge["primarySurgeSeverity"]
+    pincode = agent1_output.get("pincode")
+
+    return f"""
+You are an **AI Hospital Operations Planner**.
+
+A {surge_severity} {surge_type} surge is forecast for the next 72 hours in pincode {pincode}.
+Each hospital below already has its role and capacityCaps decided — do not change them.
+Write recommendedActions for each hospital.
+
+### Rules
+- Stay within capacityCaps (surge_beds, icu_beds, ventilators, doctors, nurses).
+- Actions must be feasible within 72 hours and fit the hospital's role.
+
+### Output Schema (JSON only)
+{{"hospitalPlans":[{{"hospital_id":<int>,"recommendedActions":{{"staffing":["..."],"capacity":["..."],"inventory":["..."],"coordination":["..."]}}}}]}}
+
+### Hospitals Data
+{_compact_json(hospitals)}
+
+Return valid JSON only — no markdown, no explanations.
+"""
+
+
+# -----------------------------
+# AGENT 2 — LLM PLANNER
+# -----------------------------
+def _parse_plan(response_text: str) -> Dict[str, Any]:
     try:
         return extract_json_from_text(response_text)
     except Exception as e:
@@ -155,6 +449,304 @@ Return valid JSON only — no markdown, no explanations.
         raise ValueError(f"Gemini returned invalid JSON: {e}")
 
 
+def _attach_shard_stats(plan: Dict[str, Any], prompts: List[str], latencies: List[float]) -> Dict[str, Any]:
+    plan["plannerStats"].update({
+        "shards": len(prompts),
+        "promptChars": [len(p) for p in prompts],
+        "promptTokensEst": [estimate_tokens(p) for p in prompts],
+        "shardLatencyS": [round(t, 3) for t in latencies],
+    })
+    return plan
+
+
+def resolve_planner_mode(mode: str, severity: str) -> str:
+    """"auto" plans low-severity surges with rules only and the rest in hybrid mode."""
+    if mode not in PLANNER_MODES:
+        raise ValueError(f"Unknown planner mode {mode!r}; expected one of {PLANNER_MODES}")
+    if mode == "auto":
+        return "rules" if severity in PLANNER_RULES_SEVERITIES else "hybrid"
+    return mode
+
+
+def _pincode_columns(pincode: Any) -> Dict[str, Any]:
+    store = get_hospital_store(HOSPITAL_DATA_PATH)
+    return select_rows(store.columns(), store.rows_for("pincode", pincode))
+
+
+def _plan_requests(agent1_output: Dict[str, Any], mode: str):
+    """Returns (mode, rules_plans, shards, prompts) for one Agent 1 output."""
+    surge = agent1_output["surgeForecast"]
+    mode = resolve_planner_mode(mode, surge["primarySurgeSeverity"])
+    if mode == "llm":
+        shards = shard_hospitals(agent1_hospitals(agent1_output))
+        return mode, None, shards, [build_planner_prompt(agent1_output, shard) for shard in shards]
+
+    t0 = time.perf_counter()
+    plans = rule_plans(surge["primarySurgeType"], surge["primarySurgeSeverity"],
+                       _pincode_columns(agent1_output.get("pincode")))
+    print(f"⚡ Rules assigned {len(plans)} roles in {(time.perf_counter() - t0) * 1e3:.2f} ms")
+    if mode == "rules":
+        return mode, plans, [], []
+
+    targets = [
+        {k: p[k] for k in ("hospital_id", "hospital_name", "specialty", "role", "capacityCaps")}
+        for p in plans if p["role"] != NON_TARGET
+    ]
+    shards = shard_hospitals(targets, fields=None) if targets else []
+    return mode, plans, shards, [build_actions_prompt(agent1_output, shard) for shard in shards]
+
+
+def _finish_plan(agent1_output: Dict[str, Any], mode: str, rules_plans: Optional[List[Dict[str, Any]]],
+                 shards: List[List[Dict[str, Any]]], prompts: List[str],
+                 outputs: List[Dict[str, Any]], latencies: List[float]) -> Dict[str, Any]:
+    if mode == "llm":
+        merged = merge_shard_plans(agent1_output, shards, outputs)
+    else:
+        merged = merge_rule_plans(agent1_output, rules_plans, shards, outputs)
+    merged["plannerStats"]["mode"] = mode
+    return _attach_shard_stats(merged, prompts, latencies)
+
+
+def run_agent2_llm(input_payload: Dict[str, Any], mode: str = PLANNER_MODE) -> Dict[str, Any]:
+    """
+    Uses Gemini 2.x to create individualized hospital surge plans.
+    mode: "llm" (LLM decides everything), "hybrid" (rules assign roles/caps,
+    LLM writes actions for targeted hospitals), "rules" (no LLM call) or
+    "auto" (rules for PLANNER_RULES_SEVERITIES, hybrid otherwise).
+    """
+
+    # 1️⃣ Run Agent 1 (forecaster)
+    agent1_output = run_agent1(input_payload)
+
+    # 2️⃣ Assign roles locally (unless mode="llm") and build one compact prompt per shard
+    mode, rules_plans, shards, prompts = _plan_requests(agent1_output, mode)
+
+    # 3️⃣ Call Gemini for every shard concurrently (through the on-disk cache) and extract JSON
+    def call(prompt: str):
+        t0 = time.perf_counter()
+        found = llm_cache.get_first(prompt, CACHE_LOOKUP_MODELS, _parse_plan)
+        if found is not None:
+            plan = found[2]
+        else:
+            model_name, text = gemini_with_fallback(prompt)
+            plan = llm_cache.put_parsed(prompt, model_name, text, _parse_plan)
+        return plan, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=max(1, min(LLM_MAX_CONCURRENCY, len(prompts)))) as pool:
+        results = list(pool.map(call, prompts))
+
+    # 4️⃣ Merge + validate the per-shard hospitalPlans
+    return _finish_plan(agent1_output, mode, rules_plans, shards, prompts,
+                        [plan for plan, _ in results], [t for _, t in results])
+
+
+# -----------------------------
+# AGENT 2 — ASYNC PLANNER (many pincodes)
+# -----------------------------
+class AsyncPlanner:
+    """
+    Plans many pincodes concurrently. Agent 1 runs in an executor so the
+    event loop stays free, LLM calls share one client and are capped by a
+    semaphore per event loop, and retries back off with jitter via asyncio.sleep.
+    """
+
+    def __init__(self, client: Optional[LLMClient] = None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 executor: Optional[Executor] = None, retries: int = 2, backoff_base_s: float = LLM_BACKOFF_BASE_S):
+        self.client = client or GeminiClient()
+        self.max_concurrency = max_concurrency
+        self.executor = executor
+        self.retries = retries
+        self.backoff_base_s = backoff_base_s
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+        self._semaphores_lock = threading.Lock()
+
+    def _sem(self) -> asyncio.Semaphore:
+        # An asyncio.Semaphore binds to the first loop that waits on it, and one planner is
+        # reused across loops (asyncio.run calls, FastAPI's loop), so each loop gets its own.
+        # max_concurrency therefore caps LLM calls per event loop.
+        loop = asyncio.get_running_loop()
+        sem = self._semaphores.get(loop)
+        if sem is None:
+            with self._semaphores_lock:
+                sem = self._semaphores.setdefault(loop, asyncio.Semaphore(self.max_concurrency))
+        return sem
+
+    async def _generate(self, model_name: str, prompt: str) -> str:
+        async with self._sem():
+            return await self.client.generate(model_name, prompt)
+
+    async def answer(self, prompt: str) -> Tuple[str, str]:
+        """Async twin of gemini_with_fallback: (model that answered, text)."""
+        return await call_with_fallback(lambda model_name: self._generate(model_name, prompt),
+                                        self.retries, self.backoff_base_s)
+
+    async def call_llm(self, prompt: str) -> str:
+        """Async twin of call_gemini_with_fallback."""
+        return (await self.answer(prompt))[1]
+
+    async def _stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        async with self._sem():
+            stream = getattr(self.client, "stream", None)
+            if stream is None:
+                # Non-streaming client: the whole answer arrives as one chunk.
+                yield await self.client.generate(model_name, prompt)
+                return
+            async for chunk in stream(model_name, prompt):
+                yield chunk
+
+    async def open_stream(self, prompt: str) -> Tuple[str, AsyncIterator[str]]:
+        """
+        (model that answered, chunks) with the same retries and Flash fallback
+        as call_llm, but only until the first chunk arrives; a stream that
+        fails midway is raised to the consumer.
+        """
+        async def start(model_name: str) -> Optional[Tuple[str, AsyncIterator[str]]]:
+            # The call strategy here is "start the stream": it succeeds once the first chunk is in.
+            chunks = self._stream(model_name, prompt)
+            try:
+                return await chunks.__anext__(), chunks
+            except StopAsyncIteration:
+                return None
+
+        model_name, (first, rest) = await call_with_fallback(start, self.retries, self.backoff_base_s)
+
+        async def chunks() -> AsyncIterator[str]:
+            try:
+                yield first
+                async for chunk in rest:
+                    yield chunk
+            finally:
+                await rest.aclose()
+
+        return model_name, chunks()
+
+    async def stream_llm(self, prompt: str) -> AsyncIterator[str]:
+        """Streaming twin of call_llm (see open_stream)."""
+        _, chunks = await self.open_stream(prompt)
+        async for chunk in chunks:
+            yield chunk
+
+    async def cached_plan(self, prompt: str) -> Dict[str, Any]:
+        """
+        Parsed plan for one prompt; same read/write-through cache as
+        run_agent2_llm. SQLite calls run in a worker thread, off the event loop.
+        """
+        found = await asyncio.to_thread(llm_cache.get_first, prompt, CACHE_LOOKUP_MODELS, _parse_plan)
+        if found is not None:
+            return found[2]
+        model_name, text = await self.answer(prompt)
+        return await asyncio.to_thread(llm_cache.put_parsed, prompt, model_name, text, _parse_plan)
+
+    async def plan(self, input_payload: Dict[str, Any], mode: str = PLANNER_MODE) -> Dict[str, Any]:
+        """Async twin of run_agent2_llm for one payload."""
+        loop = asyncio.get_running_loop()
+        agent1_output = await loop.run_in_executor(self.executor, run_agent1, input_payload)
+
+        mode, rules_plans, shards, prompts = _plan_requests(agent1_output, mode)
+
+        async def call(prompt: str):
+            t0 = time.perf_counter()
+            plan = await self.cached_plan(prompt)
+            return plan, time.perf_counter() - t0
+
+        results = await asyncio.gather(*(call(p) for p in prompts))
+        return _finish_plan(agent1_output, mode, rules_plans, shards, prompts,
+                            [plan for plan, _ in results], [t for _, t in results])
+
+    async def plan_many(self, payloads: List[Dict[str, Any]], mode: str = PLANNER_MODE,
+                        return_exceptions: bool = False) -> List[Any]:
+        """Plans every payload concurrently; results are in input order."""
+        return await asyncio.gather(*(self.plan(p, mode) for p in payloads), return_exceptions=return_exceptions)
+
+    async def _stream_shard(self, prompt: str, on_entry) -> Tuple[Dict[str, Any], float]:
+        """Streams one prompt (or replays its cached answer) through PlanStreamParser; returns (plan, seconds)."""
+        t0 = time.perf_counter()
+        found = await asyncio.to_thread(llm_cache.get_first, prompt, CACHE_LOOKUP_MODELS, _parse_plan)
+
+        parser = PlanStreamParser()
+        if found is not None:
+            for entry in parser.feed(found[1]):
+                await on_entry(entry)
+            return found[2], time.perf_counter() - t0
+
+        model_name, chunks = await self.open_stream(prompt)
+        async for chunk in chunks:
+            for entry in parser.feed(chunk):
+                await on_entry(entry)
+        # The whole answer is still parsed (and cached) exactly as in plan(); it is what "done" reports.
+        plan = await asyncio.to_thread(llm_cache.put_parsed, prompt, model_name, parser.text, _parse_plan)
+        return plan, time.perf_counter() - t0
+
+    async def plan_stream(self, input_payload: Dict[str, Any], mode: str = PLANNER_MODE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming twin of plan(). Yields {"event", "data"} dicts: "forecast"
+        (Agent 1's surge forecast), one "plan" per hospital as soon as its
+        entry is complete, then "done" with the merged plan, identical to
+        what plan() returns. Hospitals the LLM skipped (hybrid) are sent as
+        "plan" events with their template actions just before "done".
+        """
+        loop = asyncio.get_running_loop()
+        agent1_output = await loop.run_in_executor(self.executor, run_agent1, input_payload)
+        yield {"event": "forecast", "data": {"pincode": agent1_output["pincode"],
+                                             "surgeForecast": agent1_output["surgeForecast"]}}
+
+        mode, rules_plans, shards, prompts = _plan_requests(agent1_output, mode)
+        rules_by_id = {p["hospital_id"]: p for p in rules_plans or []}
+        emitted = set()
+        for plan in rules_plans or []:
+            # Roles come from the rules; only targeted hospitals wait for LLM actions.
+            if mode == "rules" or plan["role"] == NON_TARGET:
+                emitted.add(plan["hospital_id"])
+                yield {"event": "plan", "data": plan}
+
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run(i: int, prompt: str) -> None:
+            try:
+                result = await self._stream_shard(prompt, lambda entry: queue.put(("entry", i, entry)))
+                await queue.put(("shard", i, result))
+            except Exception as e:
+                await queue.put(("error", i, e))
+
+        tasks = [asyncio.create_task(run(i, p)) for i, p in enumerate(prompts)]
+        shard_index = [{_as_int(h.get("hospital_id")): h for h in shard} for shard in shards]
+        results: List[Any] = [None] * len(prompts)
+        try:
+            pending = len(tasks)
+            while pending:
+                kind, i, value = await queue.get()
+                if kind == "error":
+                    raise value
+                if kind == "shard":
+                    results[i] = value
+                    pending -= 1
+                    continue
+                if mode == "llm":
+                    plan = _llm_plan_entry(value, shard_index[i])
+                else:
+                    found = _llm_actions(value, set(shard_index[i]))
+                    plan = {**rules_by_id[found[0]], "recommendedActions": found[1]} if found else None
+                if plan is not None and plan["hospital_id"] not in emitted:
+                    emitted.add(plan["hospital_id"])
+                    yield {"event": "plan", "data": plan}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        merged = _finish_plan(agent1_output, mode, rules_plans, shards, prompts,
+                              [plan for plan, _ in results], [t for _, t in results])
+        for plan in merged["hospitalPlans"]:
+            if plan["hospital_id"] not in emitted:
+                yield {"event": "plan", "data": plan}
+        yield {"event": "done", "data": merged}
+
+
+async def run_agent2_llm_async(input_payload: Dict[str, Any], client: Optional[LLMClient] = None,
+                               mode: str = PLANNER_MODE) -> Dict[str, Any]:
+    return await AsyncPlanner(client=client).plan(input_payload, mode)
+
+
 # -----------------------------
 # TEST LOCALLY
 # -----------------------------
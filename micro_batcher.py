@@ -0,0 +1,173 @@
+# agents_project_life/micro_batcher.py
+"""
+In-process micro-batching for single-row model calls.
+
+Concurrent callers submit one item each; a worker thread collects whatever
+arrives within a short window (or until the batch is full), runs one batched
+call for the whole group and resolves every caller's Future. A caller waits
+at most the window plus one batched call, so throughput rises under load
+while latency keeps a ceiling. The window only applies once the previous
+batch showed concurrent traffic, so a lone request is not held back.
+"""
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+import threading
+import time
+import os
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# ---------- Config ----------
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "1") == "1"
+# How long the first request of a batch waits for company, and the batch size that flushes early.
+MICRO_BATCH_WAIT_MS = float(os.getenv("MICRO_BATCH_WAIT_MS", "2"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "64"))
+# Upper bounds of the histogram buckets (last bucket is open-ended).
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Fixed-bucket counts; bucket i holds values <= bounds[i], the last one everything above."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.total += value
+        self.n += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.n,
+            "mean": round(self.total / self.n, 3) if self.n else 0.0,
+        }
+
+
+# ---------- Batcher ----------
+class MicroBatcher(Generic[T, R]):
+    """
+    `fn` maps a list of items to a list of results in the same order. It runs
+    on one worker thread (started on first use); an exception from `fn`, or a
+    result list of the wrong length, is raised to every caller of that batch.
+    """
+
+    def __init__(self, fn: Callable[[List[T]], List[R]], wait_ms: float = MICRO_BATCH_WAIT_MS,
+                 max_size: int = MICRO_BATCH_MAX_SIZE, enabled: bool = MICRO_BATCH_ENABLED, name: str = "micro-batcher"):
+        self.fn = fn
+        self.wait_s = max(0.0, wait_ms) / 1000.0
+        self.max_size = max(1, max_size)
+        self.enabled = enabled
+        self.name = name
+        self._cond = threading.Condition()
+        self._queue: List[Tuple[T, Future, float]] = []
+        self._worker: Optional[threading.Thread] = None
+        self._last_batch_size = 0
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+
+    def submit(self, item: T) -> "Future[R]":
+        fut: Future = Future()
+        if not self.enabled:
+            # Direct call in the caller's thread; keeps the same Future interface.
+            try:
+                fut.set_result(self._call([item])[0])
+            except Exception as e:
+                fut.set_exception(e)
+            return fut
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append((item, fut, time.perf_counter()))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return fut
+
+    def run(self, item: T, timeout: Optional[float] = None) -> R:
+        """submit() and wait for the result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "wait_ms": self.wait_s * 1000.0,
+                "max_batch_size": self.max_size,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "items": self.items,
+                "failed_batches": self.failed_batches,
+                "batch_size_histogram": self.batch_sizes.snapshot(),
+                "queue_wait_ms_histogram": self.wait_ms.snapshot(),
+            }
+
+    def _call(self, items: List[T]) -> List[R]:
+        results = list(self.fn(items))
+        if len(results) != len(items):
+            raise ValueError(f"{self.name}: batch function returned {len(results)} results for {len(items)} items")
+        return results
+
+    # ---------- Worker ----------
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._worker.start()
+
+    def _next_batch(self) -> List[Tuple[T, Future, float]]:
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            # The window starts when the oldest queued request arrived, not when the worker woke up.
+            # Idle traffic (last batch held one request, nothing else queued) is dispatched at once.
+            busy = self._last_batch_size > 1 or len(self._queue) > 1
+            deadline = self._queue[0][2] + (self.wait_s if busy else 0.0)
+            while len(self._queue) < self.max_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch, self._queue = self._queue[:self.max_size], self._queue[self.max_size:]
+            self._last_batch_size = len(batch)
+            return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            # Callers that cancelled while queued are dropped from the batch.
+            live = [(item, fut) for item, fut, _ in batch if fut.set_running_or_notify_cancel()]
+            failed = False
+            if live:
+                try:
+                    results = self._call([item for item, _ in live])
+                    for (_, fut), result in zip(live, results):
+                        fut.set_result(result)
+                except Exception as e:
+                    failed = True
+                    for _, fut in live:
+                        if not fut.done():
+                            fut.set_exception(e)
+            with self._cond:
+                self.batches += 1
+                self.items += len(batch)
+                self.failed_batches += int(failed)
+                self.batch_sizes.observe(len(batch))
+                for _, _, queued_at in batch:
+                    self.wait_ms.observe((started - queued_at) * 1000.0)
@@ -0,0 +1,234 @@
+# agents_project_life/model_registry.py
+"""
+Process-wide registry for the forecast model bundle.
+
+Loads `final_patient_disease_forecast_model.joblib` once, shares it across
+threads, and hot-reloads it when the file on disk is replaced by a retrain.
+A `.npz` path loads the pickle-free compiled bundle from tree_evaluator.py;
+with FORECAST_MODEL_COMPILE=1 a joblib bundle is compiled on load, keeping the
+LightGBM boosters when the compiled evaluator does not support them.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime
+import hashlib
+import threading
+import time
+import os
+
+from tree_evaluator import UnsupportedModelError, compile_bundle, load_compiled
+
+# ---------- Config ----------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.getenv("FORECAST_MODEL_PATH", os.path.join(BASE_DIR, "final_patient_disease_forecast_model.joblib"))
+# Seconds between two stat() checks of the model file by the watcher thread; 0 disables it.
+RELOAD_CHECK_INTERVAL_S = float(os.getenv("MODEL_RELOAD_CHECK_INTERVAL_S", "5"))
+# Compile joblib bundles into tree_evaluator heads after loading them.
+COMPILE_ON_LOAD = os.getenv("FORECAST_MODEL_COMPILE", "0") == "1"
+
+
+# ---------- Metrics ----------
+@dataclass
+class RegistryMetrics:
+    model_path: str
+    load_count: int = 0
+    reload_count: int = 0
+    failed_reload_count: int = 0
+    last_load_seconds: float = 0.0
+    total_load_seconds: float = 0.0
+    last_loaded_at: Optional[str] = None
+    sha256: Optional[str] = None
+    last_error: Optional[str] = None
+    compiled: bool = False
+    compile_error: Optional[str] = None
+
+
+# ---------- Utilities ----------
+def _file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+# ---------- Registry ----------
+class ModelRegistry:
+    """
+    Holds one deserialized model bundle per model file.
+
+    Readers never pay for a reload: after the first load a watcher thread
+    stat()s the file every `check_interval_s` seconds, confirms a change with
+    a SHA-256 of the contents, loads it and swaps it in atomically, so get()
+    only reads the current bundle. If the new file fails to load (e.g. a
+    retrain is still writing it) the previous bundle keeps serving and the
+    error is recorded in the metrics.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, check_interval_s: float = RELOAD_CHECK_INTERVAL_S,
+                 compile_on_load: bool = COMPILE_ON_LOAD):
+        self.model_path = model_path
+        self.check_interval_s = check_interval_s
+        self.compile_on_load = compile_on_load
+        self._lock = threading.Lock()
+        self._bundle: Optional[Dict[str, Any]] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._watching = False
+        self._stop = threading.Event()
+        self._metrics = RegistryMetrics(model_path=model_path)
+
+    def get(self) -> Dict[str, Any]:
+        """Returns the current bundle, loading it on first use."""
+        bundle = self._bundle
+        if bundle is None:
+            with self._lock:
+                if self._bundle is None:
+                    self._load()
+                bundle = self._bundle
+        if not self._watching:
+            self._start_watcher()
+        return bundle
+
+    def reload(self, force: bool = False) -> bool:
+        """Checks the file now and reloads it if changed (or if `force`). Returns True on reload."""
+        with self._lock:
+            if self._bundle is None or force:
+                self._load()
+                return True
+            return self._reload_if_changed()
+
+    @property
+    def version(self) -> Optional[str]:
+        """SHA-256 of the bundle currently served (None before the first load)."""
+        return self._metrics.sha256
+
+    def metrics(self) -> Dict[str, Any]:
+        return asdict(self._metrics)
+
+    def close(self) -> None:
+        """Stops the watcher thread; get() keeps serving the last bundle."""
+        self._stop.set()
+
+    # ---------- Watcher ----------
+    def _start_watcher(self) -> None:
+        with self._lock:
+            if self._watching:
+                return
+            self._watching = True
+            if self.check_interval_s > 0 and not self._stop.is_set():
+                threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True).start()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval_s):
+            with self._lock:
+                self._reload_if_changed()
+
+    def _after_fork(self) -> None:
+        # Threads do not survive fork(): the child starts its own watcher on its next get().
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watching = False
+
+    # Callers must hold self._lock for the methods below.
+    def _reload_if_changed(self) -> bool:
+        try:
+            current = _file_stat(self.model_path)
+        except OSError as e:
+            self._metrics.last_error = str(e)
+            return False
+        if current == self._stat:
+            return False
+        try:
+            if _file_sha256(self.model_path) == self._metrics.sha256:
+                # Touched or copied over with identical bytes: nothing to load.
+                self._stat = current
+                return False
+            self._load()
+        except Exception as e:
+            self._metrics.failed_reload_count += 1
+            self._metrics.last_error = f"{type(e).__name__}: {e}"
+            return False
+        return True
+
+    def _load(self) -> None:
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Model bundle not found at {self.model_path}")
+
+        stat_before = _file_stat(self.model_path)
+        sha = _file_sha256(self.model_path)
+        t0 = time.perf_counter()
+        compile_error = None
+        if self.model_path.endswith(".npz"):
+            bundle = load_compiled(self.model_path)
+        else:
+            # Deferred: unpickling pulls in LightGBM and sklearn, which should not slow down imports.
+            import joblib
+            bundle = joblib.load(self.model_path)
+            if self.compile_on_load:
+                try:
+                    bundle = compile_bundle(bundle)
+                except UnsupportedModelError as e:
+                    # Linear trees / categorical splits: keep serving the LightGBM boosters.
+                    compile_error = str(e)
+                    print(f"⚠️ Serving LightGBM boosters for {self.model_path}: {e}")
+        elapsed = time.perf_counter() - t0
+
+        for key in ("load_model", "disease_model", "features"):
+            if key not in bundle:
+                raise KeyError(f"Model bundle at {self.model_path} is missing '{key}'")
+
+        is_reload = self._bundle is not None
+        self._bundle = bundle
+        self._stat = stat_before
+
+        m = self._metrics
+        m.load_count += 1
+        m.reload_count += int(is_reload)
+        m.last_load_seconds = round(elapsed, 4)
+        m.total_load_seconds = round(m.total_load_seconds + elapsed, 4)
+        m.last_loaded_at = datetime.now().isoformat(timespec="seconds")
+        m.sha256 = sha
+        m.last_error = None
+        m.compiled = self.model_path.endswith(".npz") or (self.compile_on_load and compile_error is None)
+        m.compile_error = compile_error
+
+
+# ---------- Process-wide access ----------
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(model_path: str = MODEL_PATH) -> ModelRegistry:
+    """Returns the shared registry for `model_path`, creating it on first use."""
+    key = os.path.abspath(model_path)
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.setdefault(key, ModelRegistry(key))
+    return registry
+
+
+def _after_fork_in_child() -> None:
+    global _registries_lock
+    _registries_lock = threading.Lock()
+    for registry in _registries.values():
+        registry._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    # serve.py loads the bundle in the parent and forks the workers.
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_model_bundle(model_path: str = MODEL_PATH) -> Dict[str, Any]:
+    return get_registry(model_path).get()
+
+
+def registry_metrics() -> Dict[str, Dict[str, Any]]:
+    return {path: reg.metrics() for path, reg in list(_registries.items())}
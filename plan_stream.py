@@ -0,0 +1,106 @@
+# agents_project_life/plan_stream.py
+"""
+Incremental parsing of a planner response while it is still being generated.
+
+PlanStreamParser is fed the LLM's text chunks as they arrive and returns each
+entry of the "hospitalPlans" array as soon as its closing brace is seen, so a
+plan can be shown while the model is still writing the next one. It only
+tracks strings, escapes and nesting depth, so markdown fences, text around
+the JSON and arbitrary chunk boundaries are all fine; each finished entry is
+decoded on its own, with a trailing-comma repair if strict JSON fails.
+The full text stays available for the usual whole-response parse at the end.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def parse_entry(text: str) -> Optional[Dict[str, Any]]:
+    """One JSON object from the stream, or None if it cannot be decoded."""
+    for candidate in (text, _TRAILING_COMMA_RE.sub(r"\1", text)):
+        try:
+            value = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return value if isinstance(value, dict) else None
+    return None
+
+
+class PlanStreamParser:
+    """Yields the objects of the `key` array (default "hospitalPlans") from streamed JSON text."""
+
+    def __init__(self, key: str = "hospitalPlans"):
+        self.key = key
+        self._chunks: List[str] = []
+        self._buf = ""            # text from the start of the object being read (or empty between objects)
+        self._in_string = False
+        self._escape = False
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._after_key = False   # saw "<key>": and waiting for "["
+        self._depth = 0
+        self._array_depth: Optional[int] = None  # depth of the target array while inside it
+        self._in_object = False
+        self.entries = 0
+        self.invalid_entries = 0
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consumes one chunk; returns the array entries completed by it, in order."""
+        self._chunks.append(chunk)
+        done: List[Dict[str, Any]] = []
+        for c in chunk:
+            if self._in_object:
+                self._buf += c
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if not self._in_object:
+                        self._last_string = "".join(self._string)
+                elif not self._in_object:
+                    self._string.append(c)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string = []
+                self._after_key = False
+            elif c == ":":
+                self._after_key = self._array_depth is None and self._last_string == self.key
+            elif c in "[{":
+                self._depth += 1
+                if c == "[" and self._after_key:
+                    self._array_depth = self._depth
+                elif c == "{" and self._array_depth is not None and self._depth == self._array_depth + 1:
+                    self._in_object = True
+                    self._buf = c
+                self._after_key = False
+            elif c in "]}":
+                if c == "}" and self._in_object and self._depth == self._array_depth + 1:
+                    self._in_object = False
+                    entry = parse_entry(self._buf)
+                    self._buf = ""
+                    if entry is None:
+                        self.invalid_entries += 1
+                    else:
+                        self.entries += 1
+                        done.append(entry)
+                elif c == "]" and self._depth == self._array_depth:
+                    self._array_depth = None
+                self._depth -= 1
+            elif not c.isspace():
+                self._after_key = False
+            if not c.isspace() and c != ":" and c != '"':
+                self._last_string = None
+        return done
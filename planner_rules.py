@@ -0,0 +1,135 @@
+# agents_project_life/planner_rules.py
+"""
+Deterministic Agent 2 role assignment.
+
+Applies the planner prompt's hard rules (specialty match, Large + emergency +
+rating > 4 => Primary-Surge-Center, small/non-specialty => Support-Overflow,
+irrelevant => Non-Target) with NumPy over the hospital store's columns, and
+derives capacity caps that never exceed the hospital's beds or staff.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List
+import numpy as np
+import os
+
+# ---------- Config ----------
+# Beds at or above which a hospital counts as "Large".
+LARGE_HOSPITAL_BEDS = int(os.getenv("PLANNER_LARGE_HOSPITAL_BEDS", "200"))
+PRIMARY_MIN_RATING = float(os.getenv("PLANNER_PRIMARY_MIN_RATING", "4.0"))
+
+PRIMARY = "Primary-Surge-Center"
+SUPPORT = "Support-Overflow"
+NON_TARGET = "Non-Target"
+
+# Specialties that treat each surge type (surge types are the model's disease classes).
+SURGE_SPECIALTIES: Dict[str, List[str]] = {
+    "respiratory_risk": ["Pulmonology", "ENT", "ICU Care", "Emergency Medicine", "Pediatrics"],
+    "flu_risk": ["General Medicine", "Pulmonology", "ENT", "Pediatrics", "Emergency Medicine"],
+    "vector_risk": ["General Medicine", "Emergency Medicine", "ICU Care", "Pediatrics"],
+    "gastro_risk": ["Gastroenterology", "General Medicine", "Pediatrics", "Nephrology", "Emergency Medicine"],
+}
+# Non-specialist hospitals that can always absorb overflow.
+GENERAL_SPECIALTIES = ["General Medicine", "Emergency Medicine", "ICU Care"]
+
+# Share of a hospital's beds/ICU/staff to earmark for the surge, by role and severity.
+SURGE_SHARE: Dict[str, Dict[str, float]] = {
+    PRIMARY: {"Low": 0.10, "Moderate": 0.20, "High": 0.30, "Severe": 0.40},
+    SUPPORT: {"Low": 0.05, "Moderate": 0.10, "High": 0.15, "Severe": 0.20},
+    NON_TARGET: {"Low": 0.0, "Moderate": 0.0, "High": 0.0, "Severe": 0.0},
+}
+
+# Used when no LLM is asked for recommendedActions (mode="rules").
+DEFAULT_ACTIONS: Dict[str, Dict[str, List[str]]] = {
+    PRIMARY: {
+        "staffing": ["Extend shifts and put {doctors} doctors and {nurses} nurses on surge rota"],
+        "capacity": ["Earmark {surge_beds} beds incl. {icu_beds} ICU beds for {surge_label} admissions"],
+        "inventory": ["Verify oxygen, PPE and {ventilators} ventilators for 72-hour demand"],
+        "coordination": ["Act as referral hub for Support-Overflow hospitals in the pincode"],
+    },
+    SUPPORT: {
+        "staffing": ["Keep {doctors} doctors and {nurses} nurses on call"],
+        "capacity": ["Hold {surge_beds} beds for stable overflow patients"],
+        "inventory": ["Top up consumables for {surge_label} cases"],
+        "coordination": ["Route critical cases to the Primary-Surge-Center"],
+    },
+    NON_TARGET: {"staffing": [], "capacity": [], "inventory": [], "coordination": []},
+}
+
+CAP_COLUMNS = {
+    "surge_beds": "total_beds",
+    "icu_beds": "icu_beds",
+    "ventilators": "ventilators",
+    "doctors": "doctors_available",
+    "nurses": "nurses_available",
+}
+
+
+# ---------- Rules ----------
+def assign_roles(surge_type: str, severity: str, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized role + cap assignment for the hospitals in `columns` (one
+    array per hospital_details.csv column, all the same length).
+    Returns arrays: role, specialty_match, large, and one per capacity cap.
+    """
+    specialty = columns["specialty"].astype(str)
+    beds = columns["total_beds"].astype(np.int64)
+    emergency = np.char.lower(columns["emergency_available"].astype(str)) == "yes"
+    rating = columns["rating"].astype(float)
+
+    match = np.isin(specialty, SURGE_SPECIALTIES.get(surge_type, []))
+    general = np.isin(specialty, GENERAL_SPECIALTIES)
+    large = beds >= LARGE_HOSPITAL_BEDS
+    primary = match & large & emergency & (rating > PRIMARY_MIN_RATING)
+
+    role = np.full(len(specialty), NON_TARGET, dtype=object)
+    role[match | general] = SUPPORT
+    role[primary] = PRIMARY
+
+    share = np.zeros(len(specialty))
+    for name, by_severity in SURGE_SHARE.items():
+        share[role == name] = by_severity.get(severity, by_severity["Low"])
+
+    out: Dict[str, np.ndarray] = {"role": role, "specialty_match": match, "large": large, "emergency": emergency}
+    for cap, column in CAP_COLUMNS.items():
+        available = columns[column].astype(np.int64)
+        out[cap] = np.minimum(np.floor(available * share).astype(np.int64), available)
+    return out
+
+
+def _rationale(role: str, match: bool, large: bool, emergency: bool, rating: float, surge_label: str) -> List[str]:
+    if role == PRIMARY:
+        return [f"Specialty matches {surge_label} surge", f"Large hospital with emergency care and rating {rating:g}"]
+    if role == SUPPORT and match:
+        reason = "Small hospital" if not large else "No emergency care" if not emergency else f"Rating {rating:g} <= {PRIMARY_MIN_RATING:g}"
+        return [f"Specialty matches {surge_label} surge", f"{reason}; supports overflow"]
+    if role == SUPPORT:
+        return ["General care hospital", "Can absorb overflow patients"]
+    return [f"Specialty not relevant to {surge_label} surge"]
+
+
+def rule_plans(surge_type: str, severity: str, columns: Dict[str, np.ndarray], with_actions: bool = True) -> List[Dict[str, Any]]:
+    """hospitalPlans in the planner's output schema, plus a capacityCaps object per hospital."""
+    r = assign_roles(surge_type, severity, columns)
+    surge_label = surge_type.replace("_risk", "")
+    plans = []
+    for i in range(len(r["role"])):
+        role = r["role"][i]
+        caps = {cap: int(r[cap][i]) for cap in CAP_COLUMNS}
+        actions = {k: [] for k in DEFAULT_ACTIONS[NON_TARGET]}
+        if with_actions:
+            actions = {k: [a.format(surge_label=surge_label, **caps) for a in v] for k, v in DEFAULT_ACTIONS[role].items()}
+        plans.append({
+            "hospital_id": int(columns["hospital_id"][i]),
+            "hospital_name": str(columns["hospital_name"][i]),
+            "specialty": str(columns["specialty"][i]),
+            "role": role,
+            "rationale": _rationale(role, bool(r["specialty_match"][i]), bool(r["large"][i]),
+                                    bool(r["emergency"][i]), float(columns["rating"][i]), surge_label),
+            "recommendedActions": actions,
+            "capacityCaps": caps,
+        })
+    return plans
+
+
+def select_rows(columns: Dict[str, np.ndarray], rows: np.ndarray) -> Dict[str, np.ndarray]:
+    return {name: values[rows] for name, values in columns.items()}
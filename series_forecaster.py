@@ -0,0 +1,128 @@
+# agents_project_life/series_forecaster.py
+"""
+Recursive multi-day forecast for every (city, pincode) series at once.
+
+A SeriesRing keeps the last 14 days of the lagged columns per series in one
+(series, window, column) array with a shared write position. Each forecast
+day fills the lag features of all series from the ring, runs one pass of
+all heads (inference_engine.py), and writes the predicted patient load back
+as the newest day, so a step costs O(series) instead of O(history).
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+from forecast_horizon import LagRing
+from inference_engine import InferenceEngine
+
+GROUP_COLUMNS = ["city", "pincode"]
+RING_WINDOW = max(LAG_DAYS)
+
+
+# ---------- Ring buffer ----------
+class SeriesRing(LagRing):
+    """
+    LagRing over history series, with each series' keys, last observed date
+    and static features. values[s, (head - k) % window, c] is series s's
+    column c, k days before the next day to forecast.
+    """
+
+    def __init__(self, keys: pd.DataFrame, last_dates: np.ndarray, statics: pd.DataFrame,
+                 values: np.ndarray, columns: Sequence[str] = LAG_COLUMNS):
+        super().__init__(values, columns)
+        self.keys = keys.reset_index(drop=True)
+        self.last_dates = np.asarray(last_dates, dtype="datetime64[ns]")
+        self.statics = statics.reset_index(drop=True)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Sequence[str] = LAG_COLUMNS,
+                   window: int = RING_WINDOW, group_cols: Sequence[str] = GROUP_COLUMNS) -> "SeriesRing":
+        """
+        Ring holding the last `window` days of each series in `df` (raw
+        history rows). Series shorter than the window are NaN-padded, which
+        LightGBM treats as missing.
+        """
+        df = df.sort_values(list(group_cols) + ["date"]).reset_index(drop=True)
+        tail = df.groupby(list(group_cols), sort=False).tail(window)
+        group_id = tail.groupby(list(group_cols), sort=False).ngroup().to_numpy()
+        # Position counted back from each series' last row: 0 = latest day.
+        back = tail.groupby(list(group_cols), sort=False).cumcount(ascending=False).to_numpy()
+
+        n_series = int(group_id.max()) + 1 if len(tail) else 0
+        values = np.full((n_series, window, len(columns)), np.nan, dtype=np.float64)
+        # Latest day in slot window-1, so head starts at 0 == window % window.
+        values[group_id, window - 1 - back] = tail[list(columns)].to_numpy(dtype=np.float64)
+
+        last = tail[back == 0]
+        return cls(last[list(group_cols)], last["date"].to_numpy(), last, values, columns)
+
+    @classmethod
+    def concat(cls, rings: List["SeriesRing"]) -> "SeriesRing":
+        rings = [r for r in rings if len(r)]
+        if any(r.head != rings[0].head or r.window != rings[0].window for r in rings):
+            raise ValueError("Rings must share window and position to be concatenated")
+        ring = cls(
+            pd.concat([r.keys for r in rings]), np.concatenate([r.last_dates for r in rings]),
+            pd.concat([r.statics for r in rings]), np.concatenate([r.values for r in rings]), rings[0].columns,
+        )
+        ring.head = rings[0].head
+        return ring
+
+
+# ---------- Forecast ----------
+def _feature_matrix(ring: SeriesRing, features: Sequence[str]) -> np.ndarray:
+    X = np.zeros((len(ring), len(features)), dtype=np.float64)
+    col_index = {c: i for i, c in enumerate(ring.columns)}
+    for j, name in enumerate(features):
+        base, _, lag = name.rpartition("_lag")
+        if base in col_index and lag.isdigit():
+            X[:, j] = ring.lag(int(lag))[:, col_index[base]]
+        elif name in ring.statics.columns:
+            X[:, j] = ring.statics[name].to_numpy(dtype=np.float64)
+    return X
+
+
+def forecast_series(ring: SeriesRing, bundle: Dict[str, Any], days: int = 3) -> pd.DataFrame:
+    """
+    Advances every series in `ring` by `days` (in place). Day d is dated
+    last observed date + d. Case counts are carried forward from the latest
+    day and patient_load is replaced by the prediction, as the old
+    single-series forecaster did.
+    """
+    features = bundle["features"]
+    engine = InferenceEngine(bundle)
+
+    frames = []
+    for d in range(1, days + 1):
+        X = _feature_matrix(ring, features)
+        step = engine.predict(X)
+        loads = step.load
+        intensities = step.intensity if step.intensity is not None else np.full(len(ring), None)
+
+        frames.append(pd.DataFrame({
+            "city": ring.keys["city"].to_numpy(),
+            "pincode": ring.keys["pincode"].to_numpy(),
+            "date": ring.last_dates + np.timedelta64(d, "D"),
+            "predicted_patient_load": loads,
+            "predicted_disease_spike": step.disease,
+            "predicted_intensity": intensities,
+            "_step": d,
+            "_series": np.arange(len(ring)),
+        }))
+
+        ring.advance(loads)
+
+    out = pd.concat(frames, ignore_index=True).sort_values(["_series", "_step"], kind="stable")
+    return out.drop(columns=["_step", "_series"]).reset_index(drop=True)
+
+
+def forecast_all_pincodes(history: pd.DataFrame, bundle: Dict[str, Any], days: int = 3,
+                          window: Optional[int] = None) -> pd.DataFrame:
+    """next-`days` forecast rows (series-major, day-minor) for every series in `history`."""
+    ring = SeriesRing.from_frame(history, window=window or RING_WINDOW)
+    return forecast_series(ring, bundle, days)
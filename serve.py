@@ -0,0 +1,265 @@
+# agents_project_life/serve.py
+"""
+Pre-fork launcher for the forecast API (app.py).
+
+The parent process imports the app, loads the model bundle, lag store and
+hospital index once, freezes the GC and binds the listening socket, then
+forks SERVE_WORKERS children that each run uvicorn on the inherited socket.
+The loaded models are shared copy-on-write between all workers instead of
+being loaded again per process as `uvicorn --workers N` does:
+
+    python serve.py [--workers N] [--host 0.0.0.0] [--port 8000] [--no-preload]
+
+Crashed workers are re-forked from the parent after an exponential backoff
+(SERVE_RESTART_BACKOFF_S doubling up to SERVE_RESTART_MAX_BACKOFF_S); more than
+SERVE_MAX_RESTARTS crashes within SERVE_RESTART_WINDOW_S stop the parent with
+exit code 1 instead of re-forking a worker that cannot start. Every SERVE_MEMORY_REPORT_S
+the parent prints per-worker RSS / PSS / shared / private memory (Linux
+/proc/<pid>/smaps_rollup). --no-preload loads everything inside each worker
+instead, as a baseline for that report.
+"""
+from __future__ import annotations
+import os
+
+# One OpenMP thread per worker: N workers already fill N cores, and the parent
+# must not start an OpenMP pool before forking (libgomp is not fork-safe).
+os.environ.setdefault("OMP_NUM_THREADS", os.getenv("SERVE_THREADS_PER_WORKER", "1"))
+
+from collections import deque
+from typing import Any, Dict, List, Optional
+import argparse
+import gc
+import signal
+import socket
+import sys
+import time
+
+# ---------- Config ----------
+SERVE_HOST = os.getenv("SERVE_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8000"))
+# 0 = one worker per core.
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0"))
+# Seconds between memory reports from the parent; 0 disables them.
+SERVE_MEMORY_REPORT_S = float(os.getenv("SERVE_MEMORY_REPORT_S", "60"))
+SERVE_LOG_LEVEL = os.getenv("SERVE_LOG_LEVEL", "info")
+# Delay before re-forking a crashed worker, doubled for every other crash in the window.
+SERVE_RESTART_BACKOFF_S = float(os.getenv("SERVE_RESTART_BACKOFF_S", "0.5"))
+SERVE_RESTART_MAX_BACKOFF_S = float(os.getenv("SERVE_RESTART_MAX_BACKOFF_S", "30"))
+# More crashes than this within the window stop the parent.
+SERVE_MAX_RESTARTS = int(os.getenv("SERVE_MAX_RESTARTS", "10"))
+SERVE_RESTART_WINDOW_S = float(os.getenv("SERVE_RESTART_WINDOW_S", "60"))
+
+_SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+# ---------- Memory ----------
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    KiB from /proc/<pid>/smaps_rollup: rss, pss (shared pages split between
+    the processes using them), shared and private. None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            lines = fh.read().splitlines()
+    except OSError:
+        return None
+    raw: Dict[str, int] = {}
+    for line in lines:
+        name, _, rest = line.partition(":")
+        if name in _SMAPS_FIELDS:
+            raw[name] = int(rest.split()[0])
+    return {
+        "rss_kb": raw.get("Rss", 0),
+        "pss_kb": raw.get("Pss", 0),
+        "shared_kb": raw.get("Shared_Clean", 0) + raw.get("Shared_Dirty", 0),
+        "private_kb": raw.get("Private_Clean", 0) + raw.get("Private_Dirty", 0),
+    }
+
+
+def memory_report(parent: int, workers: List[int]) -> Dict[str, Any]:
+    """Per-process memory for the parent and workers, plus worker totals."""
+    procs = {"parent": process_memory(parent)}
+    procs.update({f"worker-{pid}": process_memory(pid) for pid in workers})
+    live = [m for name, m in procs.items() if m and name != "parent"]
+    totals = {k: sum(m[k] for m in live) for k in ("rss_kb", "pss_kb", "shared_kb", "private_kb")}
+    # PSS over every process is the real footprint; summed RSS counts shared pages once per worker.
+    totals["footprint_kb"] = totals["pss_kb"] + (procs["parent"] or {}).get("pss_kb", 0)
+    return {"processes": procs, "workers": len(live), "totals": totals}
+
+
+def print_memory_report(report: Dict[str, Any]) -> None:
+    print(f"🧠 Memory (MiB)   {'rss':>8} {'pss':>8} {'shared':>8} {'private':>8}", flush=True)
+    for name, m in report["processes"].items():
+        if m:
+            print(f"   {name:<14} {m['rss_kb'] / 1024:>8.1f} {m['pss_kb'] / 1024:>8.1f} "
+                  f"{m['shared_kb'] / 1024:>8.1f} {m['private_kb'] / 1024:>8.1f}", flush=True)
+    t = report["totals"]
+    print(f"   {'workers':<14} {t['rss_kb'] / 1024:>8.1f} {t['pss_kb'] / 1024:>8.1f} "
+          f"{t['shared_kb'] / 1024:>8.1f} {t['private_kb'] / 1024:>8.1f}   footprint {t['footprint_kb'] / 1024:.1f}",
+          flush=True)
+
+
+# ---------- Preload ----------
+def preload() -> Dict[str, float]:
+    """Imports the app and loads everything workers share; returns per-step seconds."""
+    timings: Dict[str, float] = {}
+
+    def step(name: str, fn) -> Any:
+        t0 = time.perf_counter()
+        out = fn()
+        timings[name] = round(time.perf_counter() - t0, 4)
+        return out
+
+    step("import_app", lambda: __import__("app"))
+    from model_registry import get_model_bundle
+    from lag_store import get_lag_store
+    from hospital_store import get_hospital_store
+    from ML_andRetriever_agent import HOSPITAL_DATA_PATH
+
+    step("model_bundle", get_model_bundle)
+    step("lag_store", lambda: len(get_lag_store()))
+    step("hospital_index", lambda: len(get_hospital_store(HOSPITAL_DATA_PATH)))
+    # Objects that exist now are never collected again, so the collector does
+    # not write to (and un-share) their pages in the workers.
+    gc.collect()
+    gc.freeze()
+    return timings
+
+
+# ---------- Workers ----------
+class RestartPolicy:
+    """Backoff between re-forks of crashed workers and a cap on crashes per sliding window."""
+
+    def __init__(self, backoff_s: float = SERVE_RESTART_BACKOFF_S, max_backoff_s: float = SERVE_RESTART_MAX_BACKOFF_S,
+                 max_restarts: int = SERVE_MAX_RESTARTS, window_s: float = SERVE_RESTART_WINDOW_S):
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.max_restarts = max_restarts
+        self.window_s = window_s
+        self._crashes: deque = deque()
+
+    def crashed(self, now: float) -> Optional[float]:
+        """Records a crash at `now`; seconds to wait before re-forking, or None to give up."""
+        self._crashes.append(now)
+        while self._crashes[0] <= now - self.window_s:
+            self._crashes.popleft()
+        recent = len(self._crashes)
+        if recent > self.max_restarts:
+            return None
+        return min(self.max_backoff_s, self.backoff_s * 2 ** (recent - 1))
+
+
+def run_worker(sock: socket.socket, log_level: str, load_in_worker: bool) -> None:
+    import uvicorn
+
+    if load_in_worker:
+        preload()
+    import app as app_module
+
+    config = uvicorn.Config(app_module.app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(sock: socket.socket, log_level: str, load_in_worker: bool) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            run_worker(sock, log_level, load_in_worker)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(host: str = SERVE_HOST, port: int = SERVE_PORT, workers: int = SERVE_WORKERS,
+          preload_models: bool = True, report_interval_s: float = SERVE_MEMORY_REPORT_S,
+          log_level: str = SERVE_LOG_LEVEL, restart_policy: Optional[RestartPolicy] = None) -> int:
+    """Runs until stopped by a signal (returns 0) or by too many worker crashes (returns 1)."""
+    workers = workers or (os.cpu_count() or 1)
+    restart_policy = restart_policy or RestartPolicy()
+    if preload_models:
+        timings = preload()
+        print(f"📦 Preloaded in parent: {timings}", flush=True)
+    sock = bind_socket(host, port)
+    print(f"🚀 Serving app:app on {host}:{sock.getsockname()[1]} with {workers} worker(s) "
+          f"(OMP_NUM_THREADS={os.environ['OMP_NUM_THREADS']})", flush=True)
+
+    pids = {fork_worker(sock, log_level, not preload_models) for _ in range(workers)}
+    # Monotonic times at which a replacement worker is due.
+    pending: List[float] = []
+    stopping = False
+    exit_code = 0
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        pending.clear()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    next_report = time.monotonic() + report_interval_s if report_interval_s > 0 else float("inf")
+    while pids or pending:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG) if pids else (0, 0)
+        except ChildProcessError:
+            pid, status = 0, 0
+            pids.clear()
+        if pid:
+            pids.discard(pid)
+            if not stopping:
+                delay = restart_policy.crashed(time.monotonic())
+                if delay is None:
+                    print(f"❌ Worker {pid} exited ({status}); more than {restart_policy.max_restarts} crashes in "
+                          f"{restart_policy.window_s:g}s, stopping", flush=True)
+                    exit_code = 1
+                    stop(None, None)
+                else:
+                    print(f"⚠️ Worker {pid} exited ({status}); forking a replacement in {delay:g}s", flush=True)
+                    pending.append(time.monotonic() + delay)
+            continue
+        now = time.monotonic()
+        due = [t for t in pending if t <= now]
+        if due:
+            pending[:] = [t for t in pending if t > now]
+            for _ in due:
+                pids.add(fork_worker(sock, log_level, not preload_models))
+        if time.monotonic() >= next_report:
+            print_memory_report(memory_report(os.getpid(), sorted(pids)))
+            next_report = time.monotonic() + report_interval_s
+        time.sleep(0.2)
+    sock.close()
+    return exit_code
+
+
+# ---------- CLI ----------
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Pre-fork launcher for app.py")
+    ap.add_argument("--host", default=SERVE_HOST)
+    ap.add_argument("--port", type=int, default=SERVE_PORT)
+    ap.add_argument("--workers", type=int, default=SERVE_WORKERS, help="0 = one per core")
+    ap.add_argument("--no-preload", action="store_true", help="load models in each worker (baseline)")
+    ap.add_argument("--report-interval", type=float, default=SERVE_MEMORY_REPORT_S, help="seconds; 0 disables")
+    ap.add_argument("--log-level", default=SERVE_LOG_LEVEL)
+    args = ap.parse_args()
+    sys.exit(serve(args.host, args.port, args.workers, not args.no_preload, args.report_interval, args.log_level))
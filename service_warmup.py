@@ -0,0 +1,129 @@
+# agents_project_life/service_warmup.py
+"""
+Background warm-up for the API process.
+
+Importing app.py only defines routes; the model bundle, lag store and first
+LightGBM predict are warmed by registered steps once the server starts, so
+a worker accepts connections (and answers /healthz) straight away and
+/readyz turns 200 when every step has finished. Requests that arrive
+earlier still work: they load whatever they need on demand.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import time
+import os
+
+# ---------- Config ----------
+# "background": warm in a thread after startup (default)
+# "blocking": warm before the server accepts traffic; a failing step aborts startup
+# "off": nothing is warmed, the first requests pay the loading cost
+APP_WARMUP_MODE = os.getenv("APP_WARMUP_MODE", "background")
+WARMUP_MODES = ("background", "blocking", "off")
+
+
+def process_age_seconds() -> Optional[float]:
+    """Seconds since this process started (from /proc on Linux), None where unavailable."""
+    try:
+        with open("/proc/self/stat") as fh:
+            # Fields after the ")" of the command name start at field 3; starttime is field 22.
+            start_ticks = int(fh.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as fh:
+            uptime = float(fh.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK")), 4)
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    seconds: Optional[float] = None
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Named warm-up steps run once, in registration order."""
+
+    def __init__(self, mode: str = APP_WARMUP_MODE):
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"APP_WARMUP_MODE must be one of {WARMUP_MODES}, got {mode!r}")
+        self.mode = mode
+        self._steps: List[tuple] = []
+        self._results: List[WarmupStep] = []
+        # Re-entrant: start() finishes the "off" mode while holding it.
+        self._lock = threading.RLock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.state = "pending"
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        # Process start (interpreter, imports, preload) to start(); measured when the server starts.
+        self.boot_seconds: Optional[float] = None
+
+    def add(self, name: str, fn: Callable[[], Any]) -> None:
+        self._steps.append((name, fn))
+
+    def start(self) -> None:
+        """Runs the steps according to the mode; called from the app's startup hook."""
+        with self._lock:
+            if self.state != "pending":
+                return
+            self.started_at = time.perf_counter()
+            self.boot_seconds = process_age_seconds()
+            if self.mode == "off":
+                self._finish("ready")
+                return
+            self.state = "warming"
+        if self.mode == "blocking":
+            self._run(raise_errors=True)
+        else:
+            self._thread = threading.Thread(target=self._run, name="app-warmup", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "mode": self.mode,
+                "boot_seconds": self.boot_seconds,
+                "warmup_seconds": self.seconds,
+                "steps": [asdict(s) for s in self._results],
+                "pending_steps": [name for name, _ in self._steps[len(self._results):]],
+            }
+
+    def _run(self, raise_errors: bool = False) -> None:
+        failed = False
+        for name, fn in self._steps:
+            t0 = time.perf_counter()
+            step = WarmupStep(name)
+            try:
+                fn()
+            except Exception as e:
+                step.error = f"{type(e).__name__}: {e}"
+                failed = True
+                if raise_errors:
+                    self._record(step, t0)
+                    self._finish("failed")
+                    raise
+            self._record(step, t0)
+        self._finish("failed" if failed else "ready")
+
+    def _record(self, step: WarmupStep, t0: float) -> None:
+        step.seconds = round(time.perf_counter() - t0, 4)
+        with self._lock:
+            self._results.append(step)
+
+    def _finish(self, state: str) -> None:
+        with self._lock:
+            self.state = state
+            self.seconds = round(time.perf_counter() - self.started_at, 4)
+        self._done.set()
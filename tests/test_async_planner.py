@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+import llm_recommendation_agent as agent2
+from benchmarks.fake_llm import FakeLLMClient, FakeStreamingLLMClient, fake_plan_text
+from llm_cache import LLMResponseCache
+from llm_recommendation_agent import FALLBACK_MODEL, PRIMARY_MODEL, AsyncPlanner
+
+PROMPT = "### Hospitals Data\n[]\nReturn valid JSON"
+
+
+def _calls(planner, n):
+    async def go():
+        return await asyncio.gather(*(planner.call_llm(PROMPT) for _ in range(n)))
+    return asyncio.run(go())
+
+
+def test_planner_is_reusable_across_event_loops():
+    planner = AsyncPlanner(client=FakeLLMClient(latency_s=0.01), max_concurrency=2)
+    for _ in range(3):
+        assert len(_calls(planner, 5)) == 5
+    assert planner.client.peak_in_flight == 2
+
+
+def test_unavailable_model_falls_back_to_flash():
+    planner = AsyncPlanner(client=FakeLLMClient(latency_s=0, fail_first=1, error="429 quota exceeded"))
+    assert asyncio.run(planner.call_llm(PROMPT)) == fake_plan_text(PROMPT)
+    assert planner.client.calls == {PRIMARY_MODEL: 1, FALLBACK_MODEL: 1}
+
+
+def test_transient_error_retries_primary():
+    planner = AsyncPlanner(client=FakeLLMClient(latency_s=0, fail_first=1, error="500 internal"), backoff_base_s=0)
+    assert asyncio.run(planner.call_llm(PROMPT)) == fake_plan_text(PROMPT)
+    assert planner.client.calls == {PRIMARY_MODEL: 2}
+
+
+def test_stream_retries_until_first_chunk():
+    client = FakeStreamingLLMClient(latency_s=0, chunk_latency_s=0, fail_first=1, error="503 unavailable")
+    planner = AsyncPlanner(client=client)
+
+    async def collect():
+        return "".join([chunk async for chunk in planner.stream_llm(PROMPT)])
+
+    assert asyncio.run(collect()) == fake_plan_text(PROMPT)
+    assert client.calls == {PRIMARY_MODEL: 1, FALLBACK_MODEL: 1}
+
+
+def test_blocking_caller_uses_the_same_policy(monkeypatch):
+    calls = []
+
+    class Model:
+        def __init__(self, name):
+            self.name = name
+
+        def generate_content(self, prompt):
+            calls.append(self.name)
+            if len(calls) == 1:
+                raise RuntimeError("model not found")
+            return type("Response", (), {"text": "ok"})()
+
+    monkeypatch.setattr(agent2, "get_gemini_model", Model)
+    assert agent2.call_gemini_with_fallback(PROMPT) == "ok"
+    assert calls == [PRIMARY_MODEL, FALLBACK_MODEL]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), enabled=True)
+    monkeypatch.setattr(agent2, "llm_cache", cache)
+    return cache
+
+
+def test_fallback_answers_are_cached_under_the_fallback_model(cache):
+    planner = AsyncPlanner(client=FakeLLMClient(latency_s=0, fail_first=1, error="429 quota exceeded"))
+    plan = asyncio.run(planner.cached_plan(PROMPT))
+    assert cache.get(PROMPT, PRIMARY_MODEL) is None
+    assert cache.get(PROMPT, FALLBACK_MODEL) == fake_plan_text(PROMPT)
+
+    # Served from the cache on the next call: no further LLM calls.
+    assert asyncio.run(planner.cached_plan(PROMPT)) == plan
+    assert planner.client.calls == {PRIMARY_MODEL: 1, FALLBACK_MODEL: 1}
+
+
+def test_primary_answer_is_preferred_over_fallback(cache):
+    cache.put(PROMPT, FALLBACK_MODEL, '{"hospitalPlans": [], "source": "flash"}')
+    cache.put(PROMPT, PRIMARY_MODEL, '{"hospitalPlans": [], "source": "pro"}')
+    planner = AsyncPlanner(client=FakeLLMClient(latency_s=0))
+    assert asyncio.run(planner.cached_plan(PROMPT))["source"] == "pro"
+    assert planner.client.calls == {}
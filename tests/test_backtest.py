@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import SUM_COLUMNS, score_origin, summarize
+
+ORIGIN = pd.Timestamp("2025-01-10")
+
+
+def _day(i):
+    return ORIGIN + pd.Timedelta(days=i)
+
+
+# (pincode, day, patient_load, disease, intensity); pincode 3 is not observed on the origin day.
+TRUTH = [
+    (1, 0, 100.0, "flu", "low"), (1, 1, 110.0, "flu", "high"), (1, 2, 90.0, "resp", "low"),
+    (2, 0, 50.0, "resp", "low"), (2, 1, 60.0, "resp", "low"),
+    (3, 1, 10.0, "flu", "low"),
+]
+# (pincode, day, predicted load, predicted disease, predicted intensity or None)
+FORECAST = [
+    (1, 1, 100.0, "flu", "high"), (1, 2, 100.0, "flu", None),
+    (2, 1, 70.0, "flu", "low"), (2, 2, 80.0, "flu", "low"),
+    (3, 1, 999.0, "flu", "low"),
+]
+
+
+def _frame(rows, columns):
+    df = pd.DataFrame([(pin, _day(d), *rest) for pin, d, *rest in rows], columns=["pincode", "date", *columns])
+    df.insert(0, "city", "chennai")
+    return df
+
+
+@pytest.fixture(scope="module")
+def sums():
+    truth = _frame(TRUTH, ["patient_load", "disease", "intensity"])
+    forecast = _frame(FORECAST, ["predicted_patient_load", "predicted_disease_spike", "predicted_intensity"])
+    return score_origin(forecast, truth, ORIGIN, days=2)
+
+
+@pytest.mark.parametrize("step, expected", [
+    # pincodes 1 and 2: errors -10 / +10, persistence errors 10 / 10, one disease hit, both persistence hits
+    (0, dict(n=2, load_abs=20, load_sq=200, naive_abs=20, disease_ok=1, naive_disease_ok=2,
+             intensity_ok=2, intensity_n=2)),
+    # pincode 1 only (2 has no actual); no intensity prediction
+    (1, dict(n=1, load_abs=10, load_sq=100, naive_abs=10, disease_ok=0, naive_disease_ok=0,
+             intensity_ok=0, intensity_n=0)),
+])
+def test_score_origin_sums(sums, step, expected):
+    assert sums.shape == (2, len(SUM_COLUMNS))
+    assert dict(zip(SUM_COLUMNS, sums[step])) == expected
+
+
+@pytest.mark.parametrize("step, expected", [
+    (0, {"n": 2, "load": {"mae": 10.0, "rmse": 10.0, "naive_mae": 10.0},
+         "disease": {"accuracy": 0.5, "naive_accuracy": 1.0}, "intensity": {"accuracy": 1.0}}),
+    (1, {"n": 1, "load": {"mae": 10.0, "rmse": 10.0, "naive_mae": 10.0},
+         "disease": {"accuracy": 0.0, "naive_accuracy": 0.0}, "intensity": {"accuracy": None}}),
+])
+def test_summarize(sums, step, expected):
+    assert summarize(sums[step]) == expected
+
+
+def test_summarize_without_samples():
+    out = summarize(np.zeros(len(SUM_COLUMNS)))
+    assert out["n"] == 0 and np.isnan(out["load"]["mae"]) and out["intensity"]["accuracy"] is None
@@ -0,0 +1,103 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import chart_renderer
+from chart_renderer import ChartService
+
+PREDS = [{"date": "2025-02-01", "predicted_patient_load": 120.0},
+         {"date": "2025-02-02", "predicted_patient_load": 135.5}]
+
+
+def _spec(pincode, n=2):
+    return chart_renderer.chart_spec(pincode, PREDS[:n])
+
+
+@pytest.fixture
+def fake_render(monkeypatch):
+    """Renders in a thread pool; the 'PNG' is one byte per point times 10."""
+    calls = []
+    gate = threading.Event()
+    gate.set()
+
+    def render(pincode, dates, loads):
+        calls.append(pincode)
+        gate.wait(5)
+        return b"x" * (10 * len(dates))
+
+    monkeypatch.setattr(chart_renderer, "render_forecast_png", render)
+    monkeypatch.setattr(ChartService, "_executor", lambda self: self.__dict__.setdefault("_threads", ThreadPoolExecutor(4)))
+    return calls, gate
+
+
+def test_png_cache_is_bounded_by_bytes(fake_render):
+    service = ChartService(max_bytes=50)
+    for pincode in (1, 2, 3):
+        service.render(_spec(pincode))  # 20 bytes each
+    metrics = service.metrics()
+    assert metrics["entries"] == 2 and metrics["bytes"] == 40
+    service.render(_spec(3))
+    service.render(_spec(1))  # evicted, rendered again
+    assert fake_render[0] == [1, 2, 3, 1]
+    assert service.metrics()["hits"] == 1
+
+
+def test_concurrent_requests_share_one_render(fake_render):
+    calls, gate = fake_render
+    gate.clear()
+    service = ChartService()
+    key = service.register(_spec(7))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.get_png(key))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert results == [b"x" * 20] * 4 and calls == [7]
+    assert service.metrics()["misses"] == 1
+
+
+def test_evicted_spec_returns_404(fake_render, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    service = ChartService(max_specs=1)
+    monkeypatch.setattr(app, "chart_service", service)
+    old = service.register(_spec(1))
+    new = service.register(_spec(2))
+    client = TestClient(app.app)
+    assert client.get(f"/charts/{old}.png").status_code == 404
+    response = client.get(f"/charts/{new}.png")
+    assert response.status_code == 200 and response.content == b"x" * 20
+
+
+def test_render_timeout_returns_504(fake_render, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app
+
+    calls, gate = fake_render
+    gate.clear()
+    service = ChartService()
+    monkeypatch.setattr(app, "chart_service", service)
+    monkeypatch.setattr(service, "get_png", lambda key: ChartService.get_png(service, key, timeout=0.05))
+    key = service.register(_spec(3))
+    try:
+        assert TestClient(app.app).get(f"/charts/{key}.png").status_code == 504
+    finally:
+        gate.set()
+
+
+def test_pool_is_replaced_after_a_worker_dies():
+    pytest.importorskip("matplotlib")
+    service = ChartService(workers=1)
+    try:
+        assert service.render(_spec(1)).startswith(b"\x89PNG")
+        broken = service._executor()
+        broken.submit(os._exit, 1)
+        assert service.render(_spec(2)).startswith(b"\x89PNG")
+        assert service._pool is not broken and service.metrics()["pool_restarts"] == 1
+    finally:
+        service.shutdown()
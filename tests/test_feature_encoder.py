@@ -0,0 +1,102 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+lgb = pytest.importorskip("lightgbm")
+
+import lag_store
+from benchmarks.feature_encoder import reference_feature_frame
+from booster_models import BoosterClassifier, BoosterRegressor
+from feature_encoder import LAG_COLUMNS, compile_encoder
+from inference_engine import InferenceEngine
+from lag_store import LAG_WINDOW, LagStore, write_lag_store
+from ML_andRetriever_agent import Agent1Request, _build_feature_matrix, _feature_encoder
+from training_data import FEATURES
+
+KNOWN = [600001, 600002]
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    """Tiny bundle in the training output format: a few trees per head over the real feature list."""
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 300, (400, len(FEATURES)))
+    X[:, FEATURES.index("pincode")] = rng.choice(KNOWN + [600003], len(X))
+    lag1 = X[:, FEATURES.index("patient_load_lag1")]
+    load = 0.5 * lag1 + X[:, FEATURES.index("pm2_5")] + rng.normal(0, 5, len(X))
+    params = {"verbose": -1, "num_leaves": 7, "min_data_in_leaf": 5}
+    disease = (lag1 > 150).astype(int)
+    return {
+        "load_model": BoosterRegressor(lgb.train({**params, "objective": "regression"},
+                                                 lgb.Dataset(X, load, feature_name=FEATURES), 10)),
+        "disease_model": BoosterClassifier(lgb.train({**params, "objective": "binary"},
+                                                     lgb.Dataset(X, disease, feature_name=FEATURES), 10),
+                                           ["flu_risk", "respiratory_risk"]),
+        "features": FEATURES,
+    }
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """Lag store with two pincodes (one unknown day each) in place of the process-wide one."""
+    history = np.random.default_rng(1).uniform(0, 300, (len(KNOWN), LAG_WINDOW, len(LAG_COLUMNS)))
+    history[0, -3, :] = np.nan
+    path = str(tmp_path / "lag_store.bin")
+    write_lag_store(path, KNOWN, history, date(2025, 1, 31))
+    monkeypatch.setitem(lag_store._stores, lag_store.LAG_STORE_PATH, LagStore(path))
+
+
+def _requests():
+    rng = np.random.default_rng(2)
+    return [
+        Agent1Request(pincode=p, aqi_index=float(rng.uniform(0, 400)),
+                      temperature_mean_c=float(rng.uniform(15, 40)),
+                      relative_humidity_mean=float(rng.uniform(20, 95)),
+                      rain_mm=float(rng.uniform(0, 20)), uv_index_mean=float(rng.uniform(0, 11)))
+        for p in KNOWN + [600003, 110001]
+    ]
+
+
+def test_matrix_matches_reference_frame_column_for_column():
+    encoder = _feature_encoder(FEATURES)
+    for req in _requests():
+        df = reference_feature_frame(req, FEATURES)
+        X = _build_feature_matrix([req], encoder)
+        assert list(df.columns) == FEATURES and X.shape == (1, len(FEATURES))
+        for i, name in enumerate(FEATURES):
+            np.testing.assert_array_equal(X[:, i], df[name].to_numpy(dtype=float), err_msg=f"{req.pincode} {name}")
+
+
+def test_known_pincodes_get_store_lags():
+    encoder = _feature_encoder(FEATURES)
+    X = _build_feature_matrix(_requests(), encoder)
+    lag1 = X[:, FEATURES.index("patient_load_lag1")]
+    lag3 = X[:, FEATURES.index("patient_load_lag3")]
+    assert (lag1[:2] > 0).all() and (lag1[2:] == 0).all()
+    assert lag3[0] == 0.0 and lag3[1] > 0  # unknown day -> 0.0 default
+
+
+def test_batch_rows_match_single_rows():
+    encoder = _feature_encoder(FEATURES)
+    reqs = _requests()
+    single = np.vstack([_build_feature_matrix([r], encoder) for r in reqs])
+    np.testing.assert_array_equal(_build_feature_matrix(reqs, encoder), single)
+
+
+def test_predictions_match_reference_frame(bundle):
+    encoder = _feature_encoder(FEATURES)
+    engine = InferenceEngine(bundle)
+    for req in _requests():
+        df = reference_feature_frame(req, FEATURES)
+        out = engine.predict(_build_feature_matrix([req], encoder))
+        np.testing.assert_allclose(out.load, bundle["load_model"].predict(df), rtol=0, atol=1e-9)
+        np.testing.assert_array_equal(out.disease, bundle["disease_model"].predict(df).astype(str))
+
+
+def test_encoder_ignores_unused_features():
+    encoder = compile_encoder(["pm2_5", "month"], {"month": 7, "city": 3})
+    X = encoder.matrix(2)
+    assert encoder.fill(X, "pm2_5", [1.0, 2.0]) and not encoder.fill(X, "pincode", 1)
+    np.testing.assert_array_equal(X, [[1.0, 7.0], [2.0, 7.0]])
+    assert compile_encoder(["pm2_5", "month"], {"city": 3, "month": 7}) is encoder
@@ -0,0 +1,57 @@
+import threading
+import time
+
+import pytest
+
+from forecast_cache import ForecastCache, quantize
+
+
+def test_quantize_snaps_to_buckets():
+    q = quantize({"pincode": 600001, "aqi_index": 123.0, "rain_mm": 0.3}, {"aqi_index": 5.0, "rain_mm": 0.5})
+    assert q == {"pincode": 600001, "aqi_index": 125.0, "rain_mm": 0.5}
+
+
+def test_nearby_inputs_share_a_key():
+    cache = ForecastCache(buckets={"aqi_index": 5.0})
+    assert cache.key("api", "v1", {"pincode": 1, "aqi_index": 101}) == cache.key("api", "v1", {"pincode": 1, "aqi_index": 99})
+    assert cache.key("api", "v1", {"pincode": 1, "aqi_index": 101}) != cache.key("api", "v2", {"pincode": 1, "aqi_index": 101})
+
+
+def test_hits_expiry_and_eviction():
+    cache = ForecastCache(ttl_s=0.05, max_entries=2)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.get_or_compute("a", lambda: 2) == 1
+    time.sleep(0.06)
+    assert cache.get_or_compute("a", lambda: 3) == 3
+    cache.get_or_compute("b", lambda: 0)
+    cache.get_or_compute("c", lambda: 0)
+    metrics = cache.metrics()
+    assert metrics["hits"] == 1 and metrics["expired"] == 1 and metrics["evictions"] == 1
+
+
+def test_concurrent_misses_compute_once():
+    cache = ForecastCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["value"] * 4 and len(calls) == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    cache = ForecastCache()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert cache.get_or_compute("k", lambda: 1) == 1
@@ -0,0 +1,99 @@
+import threading
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecast_cache import ForecastCache, quantize
+from forecast_table import INPUT_COLUMNS, ForecastTable, build_forecast_table
+from inference_engine import HeadOutputs
+
+BUCKETS = {"aqi_index": 5.0, "temperature_mean_c": 0.5, "relative_humidity_mean": 2.0, "rain_mm": 0.5,
+           "uv_index_mean": 0.5}
+BASELINE = {"pincode": 600001, "aqi_index": 120.0, "temperature_mean_c": 30.0, "relative_humidity_mean": 70.0,
+            "rain_mm": 0.0, "uv_index_mean": 6.0}
+DAYS = 3
+
+
+def _stored(payloads):
+    """Stacked (days, rows) outputs whose load is always 1000 + day, so table hits are recognizable."""
+    n = len(payloads)
+    return HeadOutputs(
+        load=np.repeat(1000.0 + np.arange(DAYS)[:, None], n, axis=1),
+        disease=np.full((DAYS, n), "table"),
+        disease_confidence=np.ones((DAYS, n)),
+    )
+
+
+def _build(path, version="m1:l1", day=None, buckets=BUCKETS):
+    build_forecast_table(path, pd.DataFrame([BASELINE]), {"api": _stored}, version, buckets, day)
+    table = ForecastTable(path, check_interval_s=0)
+    table.reload()
+    return table
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "forecast_table.sqlite3")
+
+
+def _get(table, version="m1:l1", buckets=BUCKETS, payload=None, days=DAYS):
+    return table.get("api", version, quantize(payload or BASELINE, buckets), buckets, days)
+
+
+def test_baseline_request_is_served_from_the_table(path):
+    table = _get(_build(path), days=2)
+    np.testing.assert_array_equal(table.load, [1000.0, 1001.0])
+
+
+@pytest.mark.parametrize("case", ["stale_day", "other_version", "other_buckets"])
+def test_stale_tables_miss(path, case):
+    table = _build(path, day=date.today() - timedelta(days=1) if case == "stale_day" else None,
+                   buckets={**BUCKETS, "aqi_index": 10.0} if case == "other_buckets" else BUCKETS)
+    assert _get(table, version="m2:l1" if case == "other_version" else "m1:l1") is None
+    assert table.metrics()["stale"] == 1 and table.metrics()["hits"] == 0
+
+
+def test_other_inputs_and_longer_horizons_miss(path):
+    table = _build(path)
+    assert _get(table, payload={**BASELINE, "aqi_index": 200.0}) is None
+    assert _get(table, days=DAYS + 1) is None
+    assert _get(table, payload={**BASELINE, "pincode": 110001}) is None
+    metrics = table.metrics()
+    assert (metrics["mismatches"], metrics["misses"]) == (2, 1)
+
+
+def test_counters_are_exact_under_concurrency(path):
+    table = _build(path)
+    threads = [threading.Thread(target=lambda: [_get(table) for _ in range(200)]) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert table.metrics()["hits"] == 1600
+
+
+@pytest.mark.parametrize("case", ["fresh", "stale_day", "other_version", "other_buckets"])
+def test_api_falls_through_to_live_inference(path, case, monkeypatch):
+    app = pytest.importorskip("app")
+    version = "m2:l1" if case == "other_version" else "m1:l1"
+    table = _build(path, day=date.today() - timedelta(days=1) if case == "stale_day" else None,
+                   buckets={**BUCKETS, "aqi_index": 10.0} if case == "other_buckets" else BUCKETS)
+    live = []
+
+    def run(item, timeout=None):
+        live.append(item)
+        return HeadOutputs(load=np.full(item[1], 5.0), disease=np.full(item[1], "live"),
+                           disease_confidence=np.ones(item[1]))
+
+    monkeypatch.setattr(app, "forecast_table", table)
+    monkeypatch.setattr(app, "forecast_cache", ForecastCache(buckets=BUCKETS))
+    monkeypatch.setattr(app, "forecast_batcher", SimpleNamespace(run=run))
+    monkeypatch.setattr(app, "get_registry", lambda: SimpleNamespace(version=version.split(":")[0]))
+    monkeypatch.setattr(app, "get_lag_store", lambda: SimpleNamespace(version="l1"))
+
+    preds = app.cached_forecast(app.ForecastRequest(**BASELINE), DAYS)
+    expected = "table" if case == "fresh" else "live"
+    assert len(live) == int(case != "fresh") and [p["predicted_disease_spike"] for p in preds] == [expected] * DAYS
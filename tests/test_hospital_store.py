@@ -0,0 +1,54 @@
+import os
+
+from hospital_store import HospitalStore
+
+HEADER = "hospital_id,hospital_name,pincode,rating\n"
+
+
+def _write(path, text, mode="w"):
+    with open(path, mode) as fh:
+        fh.write(text)
+
+
+def _refreshed(store):
+    store._next_check = 0.0
+    return store
+
+
+def test_lookup_by_pincode(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    _write(path, HEADER + "1,A,600001,4.5\n2,B,600002,3.5\n3,C,600001,4.0\n")
+    store = HospitalStore(str(path), check_interval_s=0)
+    assert [r["hospital_id"] for r in store.by_pincode(600001)] == [1, 3]
+    assert store.by_pincode("600002")[0]["pincode"] == "600002"
+    assert store.by_pincode(999999) == []
+
+
+def test_append_keeps_dtypes_of_full_load(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    _write(path, HEADER + "1,A,600001,4.5\n2,B,600002,3.5\n")
+    store = HospitalStore(str(path), check_interval_s=0)
+    assert len(store) == 2
+
+    # Whole-number ratings would be inferred as int if the chunk were parsed alone.
+    _write(path, "3,C,600001,4\n4,D,600003,3\n", mode="a")
+    store = _refreshed(store)
+    assert len(store) == 4
+    assert store.append_count == 1 and store.load_count == 1
+
+    reloaded = HospitalStore(str(path))
+    assert store.by_pincode(600001) == reloaded.by_pincode(600001)
+    assert isinstance(store.by_pincode(600003)[0]["rating"], float)
+    for name, values in reloaded.columns().items():
+        assert store.columns()[name].dtype == values.dtype, name
+
+
+def test_append_that_does_not_fit_dtypes_reloads(tmp_path):
+    path = tmp_path / "hospitals.csv"
+    _write(path, HEADER + "1,A,600001,4.5\n")
+    store = HospitalStore(str(path), check_interval_s=0)
+    assert len(store) == 1
+    _write(path, "2.5,B,600002,3.5\n", mode="a")
+    store = _refreshed(store)
+    assert len(store) == 2
+    assert store.load_count == 2 and store.last_error is None
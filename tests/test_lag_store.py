@@ -0,0 +1,54 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+from lag_store import LAG_WINDOW, LagStore, write_lag_store
+
+PINCODES = [600002, 600001]
+LAST_DAY = date(2025, 1, 31)
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Day d of pincode i holds 100 * i + d in every column.
+    history = np.stack([np.repeat((100 * i + np.arange(LAG_WINDOW))[:, None], len(LAG_COLUMNS), axis=1)
+                        for i in range(len(PINCODES))])
+    path = str(tmp_path / "lag_store.bin")
+    write_lag_store(path, PINCODES, history, LAST_DAY)
+    return LagStore(path, check_interval_s=0)
+
+
+def test_lags_come_from_the_right_days(store):
+    lags = store.lags(600002)
+    assert lags.shape == (len(LAG_DAYS), len(LAG_COLUMNS))
+    np.testing.assert_array_equal(lags[:, 0], [LAG_WINDOW - k for k in LAG_DAYS])
+    assert store.lags(600001)[0, 0] == 100 + LAG_WINDOW - 1
+    assert store.lags(999999) is None
+    assert store.last_day == LAST_DAY and len(store) == 2
+
+
+def test_append_rolls_the_window_forward(store):
+    version = store.version
+    assert store.append(date(2025, 2, 2), [600001, 999999], np.full((2, len(LAG_COLUMNS)), 7.0)) == 1
+    assert store.last_day == date(2025, 2, 2) and store.version != version
+    window, found = store.window_many([600001, 600002])
+    assert found.all() and window.shape == (2, LAG_WINDOW, len(LAG_COLUMNS))
+    assert window[0, -1, 0] == 7.0 and np.isnan(window[1, -1, 0])
+    assert np.isnan(window[:, -2]).all()  # skipped day
+    with pytest.raises(ValueError):
+        store.append(date(2025, 2, 1), [600001], np.zeros((1, len(LAG_COLUMNS))))
+
+
+def test_lookups_are_counted_once(store):
+    store.window_many([600001, 999999])
+    store.lags_many([600002])
+    metrics = store.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (2, 1)
+
+
+def test_missing_file_is_empty(tmp_path):
+    store = LagStore(str(tmp_path / "missing.bin"))
+    values, found = store.lags_many([600001])
+    assert not found.any() and np.isnan(values).all() and store.version is None
@@ -0,0 +1,49 @@
+import json
+import time
+
+import pytest
+
+from llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttl_s=60, max_bytes=1000)
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.sqlite3"), ttl_s=0.05)
+    cache.put("prompt", "model", "answer")
+    assert cache.get("prompt", "model") == "answer"
+    time.sleep(0.06)
+    assert cache.get("prompt", "model") is None
+    metrics = cache.metrics()
+    assert metrics["expired"] == 1 and metrics["entries"] == 0 and metrics["bytes"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(cache):
+    for name in ("a", "b", "c"):
+        cache.put(name, "model", "x" * 400)
+    assert cache.get("a", "model") is None  # oldest, evicted by "c"
+    assert cache.get("b", "model") is not None
+    cache.put("d", "model", "x" * 400)  # "b" was just read, so "c" goes
+    assert cache.get("c", "model") is None
+    assert cache.get("b", "model") is not None and cache.get("d", "model") is not None
+    metrics = cache.metrics()
+    assert metrics["evictions"] == 2 and metrics["bytes"] == 800
+
+
+def test_rejected_responses_are_never_stored(cache):
+    with pytest.raises(json.JSONDecodeError):
+        cache.put_parsed("prompt", "model", "not json", json.loads)
+    assert cache.get("prompt", "model") is None
+    assert cache.put_parsed("prompt", "model", '{"ok": 1}', json.loads) == {"ok": 1}
+    assert cache.get_first("prompt", ["other", "model"], json.loads) == ("model", '{"ok": 1}', {"ok": 1})
+    metrics = cache.metrics()
+    assert (metrics["rejected"], metrics["stores"]) == (1, 1)
+
+
+def test_entries_that_no_longer_parse_are_dropped(cache):
+    cache.put("prompt", "model", "stale format")
+    assert cache.get_first("prompt", ["model"], json.loads) is None
+    assert cache.get("prompt", "model") is None
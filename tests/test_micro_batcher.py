@@ -0,0 +1,48 @@
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_calls_share_a_batch():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [2 * x for x in items]
+
+    batcher = MicroBatcher(double, wait_ms=50, max_size=4)
+    # Queue all four before the worker looks, so a lone first request is not dispatched on its own.
+    with batcher._cond:
+        futures = [batcher.submit(i) for i in range(4)]
+    assert [f.result(timeout=5) for f in futures] == [0, 2, 4, 6]
+    assert sizes == [4]
+    assert batcher.metrics()["items"] == 4
+
+
+def test_short_result_list_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:1], wait_ms=50, max_size=3)
+    with batcher._cond:
+        futures = [batcher.submit(i) for i in range(3)]
+    for fut in futures:
+        with pytest.raises(ValueError, match="1 results for 3 items"):
+            fut.result(timeout=5)
+    assert batcher.metrics()["failed_batches"] == 1
+
+
+def test_short_result_list_fails_when_disabled():
+    batcher = MicroBatcher(lambda items: [], enabled=False)
+    with pytest.raises(ValueError):
+        batcher.run(1)
+
+
+def test_run_times_out():
+    release = threading.Event()
+    batcher = MicroBatcher(lambda items: release.wait(5) and items, wait_ms=0)
+    try:
+        with pytest.raises(FutureTimeout):
+            batcher.run(1, timeout=0.05)
+    finally:
+        release.set()
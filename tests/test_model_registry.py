@@ -0,0 +1,80 @@
+import os
+import time
+
+import joblib
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry
+
+
+def _bundle(version):
+    return {"load_model": f"load-{version}", "disease_model": f"disease-{version}", "features": ["f0", "f1"]}
+
+
+def _dump(path, version):
+    joblib.dump(_bundle(version), path)
+    # Bump mtime explicitly so fast rewrites are never hidden by timestamp granularity.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    _dump(path, 1)
+    return path
+
+
+@pytest.fixture
+def registry(path):
+    registry = ModelRegistry(path, check_interval_s=0)
+    assert registry.get()["load_model"] == "load-1"
+    yield registry
+    registry.close()
+
+
+def test_changed_file_is_swapped_in(registry, path):
+    version = registry.version
+    _dump(path, 2)
+    assert registry.reload()
+    assert registry.get()["load_model"] == "load-2" and registry.version != version
+    assert registry.metrics()["reload_count"] == 1
+
+
+def test_same_bytes_touch_is_a_no_op(registry, path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "wb") as fh:
+        fh.write(data)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000_000))
+    assert not registry.reload()
+    assert registry.metrics()["reload_count"] == 0 and registry.metrics()["load_count"] == 1
+
+
+def test_corrupt_file_keeps_serving_the_old_bundle(registry, path):
+    with open(path, "wb") as fh:
+        fh.write(b"not a joblib file")
+    assert not registry.reload()
+    metrics = registry.metrics()
+    assert registry.get()["load_model"] == "load-1"
+    assert metrics["failed_reload_count"] == 1 and metrics["last_error"]
+
+
+def test_watcher_reloads_in_the_background(path, monkeypatch):
+    registry = ModelRegistry(path, check_interval_s=0.02)
+    try:
+        assert registry.get()["load_model"] == "load-1"
+        _dump(path, 2)
+        deadline = time.monotonic() + 5
+        while registry.get()["load_model"] != "load-2" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.get()["load_model"] == "load-2"
+
+        # With the watcher stopped, get() itself never stats the file.
+        registry.close()
+        time.sleep(0.05)
+        monkeypatch.setattr(model_registry, "_file_stat", lambda p: pytest.fail("get() checked the file"))
+        assert registry.get()["load_model"] == "load-2"
+    finally:
+        registry.close()
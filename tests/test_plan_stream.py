@@ -0,0 +1,31 @@
+from plan_stream import PlanStreamParser, parse_entry
+
+RESPONSE = '''```json
+{"summary": "ok", "hospitalPlans": [
+  {"hospital": "A", "beds": {"extra": 5}, "note": "has } and \\" inside"},
+  {"hospital": "B", "beds": 2,},
+  {"hospital": broken}
+], "other": [{"hospital": "C"}]}
+```'''
+
+
+def _feed(chunk_size):
+    parser = PlanStreamParser()
+    entries = []
+    for i in range(0, len(RESPONSE), chunk_size):
+        entries.extend(parser.feed(RESPONSE[i:i + chunk_size]))
+    return parser, entries
+
+
+def test_entries_are_yielded_for_any_chunking():
+    for chunk_size in (1, 3, 7, len(RESPONSE)):
+        parser, entries = _feed(chunk_size)
+        assert [e["hospital"] for e in entries] == ["A", "B"]
+        assert entries[0]["note"] == 'has } and " inside'
+        assert (parser.entries, parser.invalid_entries) == (2, 1)
+        assert parser.text == RESPONSE
+
+
+def test_parse_entry_repairs_trailing_commas():
+    assert parse_entry('{"a": [1, 2,],}') == {"a": [1, 2]}
+    assert parse_entry("[1]") is None
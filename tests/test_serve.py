@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+import serve
+from serve import RestartPolicy
+
+
+def test_backoff_doubles_and_gives_up_after_max_restarts():
+    policy = RestartPolicy(backoff_s=0.5, max_backoff_s=1.5, max_restarts=3, window_s=10)
+    assert [policy.crashed(t) for t in (0, 1, 2)] == [0.5, 1.0, 1.5]
+    assert policy.crashed(3) is None
+
+
+def test_crashes_outside_the_window_are_forgotten():
+    policy = RestartPolicy(backoff_s=1, max_backoff_s=60, max_restarts=1, window_s=10)
+    assert policy.crashed(0) == 1
+    assert policy.crashed(20) == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_crash_looping_workers_stop_the_parent(monkeypatch):
+    forks = []
+
+    def crashing_worker(sock, log_level, load_in_worker):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(1)
+        forks.append(pid)
+        return pid
+
+    monkeypatch.setattr(serve, "fork_worker", crashing_worker)
+    # Keep pytest's own SIGINT / SIGTERM handlers.
+    monkeypatch.setattr(serve.signal, "signal", lambda signum, handler: None)
+    policy = RestartPolicy(backoff_s=0.01, max_backoff_s=0.05, max_restarts=2, window_s=60)
+    code = serve.serve("127.0.0.1", 0, workers=1, preload_models=False, report_interval_s=0, restart_policy=policy)
+    assert code == 1 and len(forks) == 3
@@ -0,0 +1,23 @@
+import pytest
+
+from service_warmup import Warmup
+
+
+def test_background_steps_run_and_report_boot_time():
+    calls = []
+    warmup = Warmup("background")
+    warmup.add("one", lambda: calls.append(1))
+    warmup.add("two", lambda: calls.append(2))
+    warmup.start()
+    assert warmup.wait(5) and warmup.ready
+    status = warmup.status()
+    assert calls == [1, 2] and [s["name"] for s in status["steps"]] == ["one", "two"]
+    assert status["boot_seconds"] is None or status["boot_seconds"] >= 0
+
+
+def test_blocking_step_failure_raises():
+    warmup = Warmup("blocking")
+    warmup.add("broken", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        warmup.start()
+    assert warmup.state == "failed"
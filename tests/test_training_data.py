@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+pytest.importorskip("lightgbm")
+
+from training_data import _dataset, convert_csv_to_parquet
+
+
+def _history(rows):
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=rows).strftime("%Y-%m-%d"),
+        "city": "Chennai",
+        "pincode": 600001,
+        "pm2_5": np.linspace(10, 50, rows),
+        "flu_cases": np.arange(rows, dtype=float),
+        "month": 1,
+    })
+
+
+def test_chunks_share_one_schema(tmp_path):
+    df = _history(6)
+    df.loc[4, "flu_cases"] = np.nan  # only the second chunk has a missing count
+    csv = tmp_path / "history.csv"
+    df.to_csv(csv, index=False)
+
+    out = convert_csv_to_parquet(str(csv), str(tmp_path / "parquet"), chunk_rows=3, force=True)
+    files = sorted(str(p) for p in (tmp_path / "parquet").rglob("*.parquet"))
+    assert len(files) == 2
+    schemas = [pq.read_schema(f) for f in files]
+    assert all(s.equals(schemas[0]) for s in schemas)
+    assert str(schemas[0].field("flu_cases").type) == "int32"
+    assert str(schemas[0].field("pm2_5").type) == "float"
+    table = _dataset(out).to_table().to_pandas()
+    assert len(table) == 6 and table["flu_cases"].isna().sum() == 1
+
+
+def test_fractional_counts_are_rejected(tmp_path):
+    df = _history(4)
+    df.loc[2, "flu_cases"] = 2.5
+    csv = tmp_path / "history.csv"
+    df.to_csv(csv, index=False)
+    with pytest.raises(ValueError, match="flu_cases"):
+        convert_csv_to_parquet(str(csv), str(tmp_path / "parquet"), chunk_rows=2, force=True)
@@ -0,0 +1,71 @@
+import joblib
+import numpy as np
+import pytest
+
+lgb = pytest.importorskip("lightgbm")
+
+from booster_models import BoosterClassifier, BoosterRegressor
+from model_registry import ModelRegistry
+from tree_evaluator import (CompiledClassifier, CompiledRegressor, UnsupportedModelError,
+                            export_booster, load_compiled, save_compiled)
+
+FEATURES = ["f0", "f1", "f2"]
+PARAMS = {"verbose": -1, "num_leaves": 7, "min_data_in_leaf": 5}
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 10, (300, len(FEATURES)))
+    X[::7, 1] = np.nan
+    return X, X[:, 0] * 2 + np.nan_to_num(X[:, 1]) + rng.normal(0, 0.1, len(X))
+
+
+def _bundle(linear_tree=False):
+    X, y = _data()
+    return {
+        "load_model": BoosterRegressor(lgb.train({**PARAMS, "objective": "regression", "linear_tree": linear_tree},
+                                                 lgb.Dataset(X, y), 10)),
+        "disease_model": BoosterClassifier(lgb.train({**PARAMS, "objective": "binary"},
+                                                     lgb.Dataset(X, (y > 10).astype(int)), 10), ["a", "b"]),
+        "features": FEATURES,
+    }
+
+
+def test_compiled_bundle_matches_boosters(tmp_path):
+    bundle = _bundle()
+    path = str(tmp_path / "model.npz")
+    save_compiled(bundle, path)
+    compiled = load_compiled(path)
+    assert isinstance(compiled["load_model"], CompiledRegressor)
+    assert isinstance(compiled["disease_model"], CompiledClassifier)
+    X, _ = _data()
+    np.testing.assert_allclose(compiled["load_model"].predict(X), bundle["load_model"].predict(X), atol=1e-9)
+    np.testing.assert_allclose(compiled["disease_model"].predict_proba(X),
+                               bundle["disease_model"].predict_proba(X), atol=1e-9)
+    assert (compiled["disease_model"].predict(X) == bundle["disease_model"].predict(X)).all()
+
+
+def test_linear_trees_raise_unsupported():
+    booster = _bundle(linear_tree=True)["load_model"].booster_
+    with pytest.raises(UnsupportedModelError):
+        export_booster(booster)
+    assert issubclass(UnsupportedModelError, ValueError)
+
+
+def test_registry_compiles_on_load(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    joblib.dump(_bundle(), path)
+    registry = ModelRegistry(path, compile_on_load=True)
+    assert isinstance(registry.get()["load_model"], CompiledRegressor)
+    assert registry.metrics()["compiled"] is True
+
+
+def test_registry_falls_back_to_boosters_for_unsupported_models(tmp_path):
+    path = str(tmp_path / "model.joblib")
+    joblib.dump(_bundle(linear_tree=True), path)
+    registry = ModelRegistry(path, compile_on_load=True)
+    bundle = registry.get()
+    assert isinstance(bundle["load_model"], BoosterRegressor)
+    metrics = registry.metrics()
+    assert metrics["compiled"] is False and "Linear trees" in metrics["compile_error"]
+    assert metrics["failed_reload_count"] == 0
@@ -0,0 +1,324 @@
+# agents_project_life/training_data.py
+"""
+Out-of-core training data for train_patient_forecast_model.py.
+
+1. The history CSV is converted once into Parquet partitioned by city, with
+   explicit compact dtypes (int8 flags, int32 ids/counts, float32 readings).
+2. Training reads only the columns the models use, one city at a time; each
+   partition holds complete pincode series, so lags and targets are built per
+   chunk and the float32 feature block is spilled to a .npy file.
+3. The lgb.Dataset is constructed from those memory-mapped chunks and saved
+   as a LightGBM binary next to the labels, so re-runs on unchanged Parquet
+   skip parsing and feature building entirely.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+from training_features import add_lag_features, group_diff, lag_feature_names
+
+# ---------- Config ----------
+TRAIN_CSV_PATH = os.getenv("TRAIN_CSV_PATH", "patient_load_daily_1y_multicity.csv")
+TRAIN_PARQUET_DIR = os.getenv("TRAIN_PARQUET_DIR", "patient_load_parquet")
+TRAIN_DATASET_CACHE_DIR = os.getenv("TRAIN_DATASET_CACHE_DIR", "train_dataset_cache")
+CSV_CHUNK_ROWS = int(os.getenv("TRAIN_CSV_CHUNK_ROWS", "500000"))
+
+PARTITION_COLUMN = "city"
+BASE_FEATURES = [
+    'city', 'pincode', 'population_density', 'no_of_hospitals', 'avg_capacity',
+    'pm2_5', 'pm10', 'temperature_mean_c', 'relative_humidity_mean', 'uv_index_mean', 'rain_mm',
+    'is_weekend', 'is_festival', 'school_open', 'month',
+    'respiratory_risk', 'flu_risk', 'vector_risk', 'gastro_risk'
+]
+FEATURES = BASE_FEATURES + lag_feature_names()
+RISK_COLUMNS = ['respiratory_risk', 'flu_risk', 'vector_risk', 'gastro_risk']
+CAT_COLUMNS = ['city', 'pincode', 'is_weekend', 'is_festival', 'school_open', 'month']
+INTENSITY_BINS = [-np.inf, 10, 50, 150, np.inf]
+INTENSITY_LABELS = ['Low', 'Moderate', 'High', 'Severe']
+# Columns training reads back from Parquet (everything else in the CSV is ignored).
+TRAIN_COLUMNS = ['date'] + BASE_FEATURES + [c for c in LAG_COLUMNS if c not in BASE_FEATURES]
+
+# Storage dtypes for the Parquet copy; columns not listed keep pandas' inference.
+# Applied to every CSV chunk so all partitions share one schema; integers are
+# nullable so a chunk with missing values keeps the same type.
+HISTORY_DTYPES: Dict[str, str] = {
+    "pincode": "Int32",
+    "population_density": "float32",
+    "no_of_hospitals": "Int16",
+    "avg_capacity": "float32",
+    "pm2_5": "float32",
+    "pm10": "float32",
+    "temperature_mean_c": "float32",
+    "relative_humidity_mean": "float32",
+    "uv_index_mean": "float32",
+    "rain_mm": "float32",
+    "is_weekend": "Int8",
+    "is_festival": "Int8",
+    "school_open": "Int8",
+    "month": "Int8",
+    "respiratory_risk": "float32",
+    "flu_risk": "float32",
+    "vector_risk": "float32",
+    "gastro_risk": "float32",
+    "patient_load": "float32",
+    "respiratory_cases": "Int32",
+    "flu_cases": "Int32",
+    "vector_cases": "Int32",
+    "gastro_cases": "Int32",
+    "other_cases": "Int32",
+}
+
+# Dataset-level params; must match between construction, the binary cache and training.
+DATASET_PARAMS: Dict[str, Any] = {"max_bin": 255, "seed": 42, "verbose": -1}
+# Bumped whenever the files written to the cache dir change.
+CACHE_LAYOUT_VERSION = 2
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet ingestion needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+# ---------- CSV -> Parquet ----------
+def cast_history_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts the HISTORY_DTYPES columns present in `df` in place; integer columns must hold whole numbers."""
+    for col, dtype in HISTORY_DTYPES.items():
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col])
+        if pd.api.types.is_integer_dtype(pd.api.types.pandas_dtype(dtype)):
+            fractional = values.notna() & (values % 1 != 0)
+            if fractional.any():
+                raise ValueError(f"Column {col!r} has non-integer values (e.g. {values[fractional].iloc[0]}); "
+                                 f"it is stored as {dtype}")
+        df[col] = values.astype(dtype)
+    return df
+
+
+def _compact_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk.columns = [c.strip().lower() for c in chunk.columns]
+    chunk['date'] = pd.to_datetime(chunk['date'])
+    cast_history_dtypes(chunk)
+    chunk[PARTITION_COLUMN] = chunk[PARTITION_COLUMN].astype(str)
+    return chunk
+
+
+def convert_csv_to_parquet(csv_path: str = TRAIN_CSV_PATH, out_dir: str = TRAIN_PARQUET_DIR,
+                           chunk_rows: int = CSV_CHUNK_ROWS, force: bool = False) -> str:
+    """
+    Writes `csv_path` as Parquet partitioned by city (city=<name>/...),
+    streaming `chunk_rows` at a time. Skipped when `out_dir` is newer than
+    the CSV unless `force`.
+    """
+    pa = _pyarrow()
+    marker = os.path.join(out_dir, "_SUCCESS")
+    if not force and os.path.exists(marker) and os.path.getmtime(marker) >= os.path.getmtime(csv_path):
+        return out_dir
+
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunk_rows)):
+        table = pa.Table.from_pandas(_compact_chunk(chunk), preserve_index=False)
+        pa.parquet.write_to_dataset(
+            table, out_dir, partition_cols=[PARTITION_COLUMN],
+            basename_template=f"part-{i:05d}-{{i}}.parquet",
+        )
+    open(marker, "w").close()
+    return out_dir
+
+
+def _dataset(parquet_dir: str):
+    pa = _pyarrow()
+    # Partition values stay strings, the same city names the CSV held.
+    partitioning = pa.dataset.partitioning(pa.schema([(PARTITION_COLUMN, pa.string())]), flavor="hive")
+    return pa.dataset.dataset(parquet_dir, format="parquet", partitioning=partitioning)
+
+
+def list_partitions(parquet_dir: str = TRAIN_PARQUET_DIR) -> List[str]:
+    """City names in sorted order, i.e. the row order of a (city, pincode, date) sort."""
+    # Read from the (virtual) partition column: directory names are URL-escaped by pyarrow.
+    values = _dataset(parquet_dir).to_table(columns=[PARTITION_COLUMN]).column(PARTITION_COLUMN).unique()
+    return sorted(str(v) for v in values.to_pylist())
+
+
+def date_range(parquet_dir: str = TRAIN_PARQUET_DIR) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """(first, last) date over all partitions, from the date column alone."""
+    pa = _pyarrow()
+    bounds = pa.compute.min_max(_dataset(parquet_dir).to_table(columns=["date"]).column("date")).as_py()
+    return pd.Timestamp(bounds["min"]), pd.Timestamp(bounds["max"])
+
+
+def category_codes(parquet_dir: str, columns: Sequence[str]) -> Dict[str, Dict[Any, int]]:
+    """Global LabelEncoder mapping for every non-numeric categorical column."""
+    ds = _dataset(parquet_dir)
+    codes: Dict[str, Dict[Any, int]] = {}
+    for col in columns:
+        if col == PARTITION_COLUMN:
+            codes[col] = {v: i for i, v in enumerate(list_partitions(parquet_dir))}
+            continue
+        field = ds.schema.field(col)
+        if str(field.type) in ("string", "large_string") or str(field.type).startswith("dictionary"):
+            values = ds.to_table(columns=[col]).column(col).unique().to_pylist()
+            codes[col] = {v: i for i, v in enumerate(sorted(str(v) for v in values))}
+    return codes
+
+
+def read_partition(parquet_dir: str, city: str, columns: Sequence[str] = TRAIN_COLUMNS,
+                   codes: Optional[Dict[str, Dict[Any, int]]] = None) -> pd.DataFrame:
+    """One city's rows, only `columns`, encoded and sorted by (pincode, date)."""
+    pa = _pyarrow()
+    ds = _dataset(parquet_dir)
+    table = ds.to_table(columns=list(columns), filter=pa.dataset.field(PARTITION_COLUMN) == city)
+    df = table.to_pandas()
+    for col, mapping in (codes or {}).items():
+        if col in df.columns:
+            df[col] = df[col].astype(str).map(mapping).astype(np.int32)
+    return df.sort_values(['city', 'pincode', 'date']).reset_index(drop=True)
+
+
+# ---------- Features + targets per chunk ----------
+def build_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """Lags, dropna, and the three targets for one partition (complete series only)."""
+    df = add_lag_features(df).dropna().reset_index(drop=True)
+    df['max_risk'] = df[RISK_COLUMNS].idxmax(axis=1)
+    df['spike_intensity'] = pd.cut(group_diff(df, 'patient_load'), bins=INTENSITY_BINS, labels=INTENSITY_LABELS)
+    return df
+
+
+def iter_feature_chunks(parquet_dir: str = TRAIN_PARQUET_DIR) -> Iterator[Tuple[str, pd.DataFrame]]:
+    codes = category_codes(parquet_dir, CAT_COLUMNS)
+    for city in list_partitions(parquet_dir):
+        yield city, build_chunk(read_partition(parquet_dir, city, codes=codes))
+
+
+# ---------- Binary Dataset cache ----------
+def parquet_fingerprint(parquet_dir: str, features: Sequence[str] = FEATURES) -> str:
+    """Changes whenever a Parquet file, the feature list or the dataset params change."""
+    h = hashlib.sha256(json.dumps([CACHE_LAYOUT_VERSION, list(features), DATASET_PARAMS, list(LAG_DAYS)]).encode())
+    for root, _, files in sorted(os.walk(parquet_dir)):
+        for name in sorted(files):
+            st = os.stat(os.path.join(root, name))
+            h.update(f"{os.path.relpath(os.path.join(root, name), parquet_dir)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()
+
+
+class TrainingData:
+    """
+    Cached training set: the constructed lgb.Dataset plus labels.
+    `dataset()` returns a fresh lgb.Dataset loaded from the binary file, so
+    each model head can set its own label without re-binning.
+    """
+
+    def __init__(self, cache_dir: str, meta: Dict[str, Any]):
+        self.cache_dir = cache_dir
+        self.meta = meta
+        self.features: List[str] = meta["features"]
+        self.n_rows: int = meta["n_rows"]
+
+    @property
+    def binary_path(self) -> str:
+        return os.path.join(self.cache_dir, "train.bin")
+
+    def labels(self, name: str) -> np.ndarray:
+        """y_load as float32; classification heads as int32 codes into classes(name)."""
+        return np.load(os.path.join(self.cache_dir, f"y_{name}.npy"))
+
+    def classes(self, name: str) -> List[str]:
+        """Sorted labels actually present, as LGBMClassifier would set classes_."""
+        return self.meta["classes"][name]
+
+    def days_to_end(self) -> np.ndarray:
+        """Per row: days before the last date of its pincode series (0 = most recent day)."""
+        return np.load(os.path.join(self.cache_dir, "days_to_end.npy"))
+
+    def time_split(self, valid_days: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(train rows, validation rows): the last `valid_days` of every pincode series are held out."""
+        recent = self.days_to_end() < valid_days
+        return np.flatnonzero(~recent).astype(np.int32), np.flatnonzero(recent).astype(np.int32)
+
+    def dataset(self, label: Optional[np.ndarray] = None) -> lgb.Dataset:
+        return lgb.Dataset(self.binary_path, label=label, params=DATASET_PARAMS, free_raw_data=True)
+
+
+def _encode_labels(values: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    classes = sorted(set(values.tolist()))
+    index = {c: i for i, c in enumerate(classes)}
+    return np.fromiter((index[v] for v in values), dtype=np.int32, count=len(values)), classes
+
+
+def build_training_data(parquet_dir: str = TRAIN_PARQUET_DIR, cache_dir: str = TRAIN_DATASET_CACHE_DIR,
+                        features: Sequence[str] = FEATURES, force: bool = False) -> TrainingData:
+    """
+    Loads the cached binary Dataset when the Parquet fingerprint matches;
+    otherwise streams partitions, spills each float32 feature block to disk
+    and constructs the Dataset from the memory-mapped chunks.
+    """
+    fingerprint = parquet_fingerprint(parquet_dir, features)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if not force and os.path.exists(meta_path):
+        with open(meta_path) as fh:
+            meta = json.load(fh)
+        if meta.get("fingerprint") == fingerprint and os.path.exists(os.path.join(cache_dir, "train.bin")):
+            print(f"♻️ Reusing binary Dataset cache ({meta['n_rows']:,} rows)")
+            return TrainingData(cache_dir, meta)
+
+    if os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
+    chunk_dir = os.path.join(cache_dir, "chunks")
+    os.makedirs(chunk_dir)
+
+    chunk_paths, y_load, y_disease, y_intensity, days_to_end = [], [], [], [], []
+    for i, (city, df) in enumerate(iter_feature_chunks(parquet_dir)):
+        if df.empty:
+            continue
+        path = os.path.join(chunk_dir, f"X_{i:05d}.npy")
+        np.save(path, df[list(features)].to_numpy(dtype=np.float32))
+        chunk_paths.append(path)
+        y_load.append(df['patient_load'].to_numpy(dtype=np.float32))
+        y_disease.append(df['max_risk'].to_numpy(dtype=object))
+        y_intensity.append(df['spike_intensity'].astype(str).to_numpy(dtype=object))
+        last = df.groupby(['city', 'pincode'])['date'].transform('max')
+        days_to_end.append((last - df['date']).dt.days.to_numpy(dtype=np.int32))
+        print(f"   🧩 {city}: {len(df):,} rows")
+    if not chunk_paths:
+        raise ValueError(f"No training rows in {parquet_dir}")
+
+    load = np.concatenate(y_load)
+    disease, disease_classes = _encode_labels(np.concatenate(y_disease))
+    intensity, intensity_classes = _encode_labels(np.concatenate(y_intensity))
+    np.save(os.path.join(cache_dir, "y_load.npy"), load)
+    np.save(os.path.join(cache_dir, "y_disease.npy"), disease)
+    np.save(os.path.join(cache_dir, "y_intensity.npy"), intensity)
+    np.save(os.path.join(cache_dir, "days_to_end.npy"), np.concatenate(days_to_end))
+
+    # Memory-mapped chunks: LightGBM bins them page by page instead of from one in-RAM matrix.
+    mats = [np.load(p, mmap_mode="r") for p in chunk_paths]
+    ds = lgb.Dataset(mats, label=load, feature_name=list(features), params=DATASET_PARAMS, free_raw_data=True)
+    ds.construct()
+    ds.save_binary(os.path.join(cache_dir, "train.bin"))
+    del ds, mats
+    shutil.rmtree(chunk_dir)
+
+    meta = {
+        "fingerprint": fingerprint,
+        "features": list(features),
+        "n_rows": int(len(load)),
+        "classes": {"disease": disease_classes, "intensity": intensity_classes},
+    }
+    with open(meta_path, "w") as fh:
+        json.dump(meta, fh, indent=2)
+    return TrainingData(cache_dir, meta)
@@ -0,0 +1,181 @@
+# agents_project_life/training_driver.py
+"""
+Parallel training of the three forecast heads.
+
+Each head (patient load, disease spike, spike intensity) is fitted in its own
+worker process from the cached binary Dataset, with a per-job thread budget
+so the jobs do not oversubscribe the CPU. The most recent TRAIN_VALID_DAYS
+of every pincode series are held out for validation and early stopping, so
+boosters stop adding trees once the validation metric stops improving.
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Tuple
+import json
+import math
+import multiprocessing
+import time
+import os
+import numpy as np
+import lightgbm as lgb
+
+from booster_models import BoosterRegressor, BoosterClassifier
+from training_data import DATASET_PARAMS, TrainingData
+
+# ---------- Config ----------
+TRAIN_VALID_DAYS = int(os.getenv("TRAIN_VALID_DAYS", "28"))
+TRAIN_EARLY_STOPPING_ROUNDS = int(os.getenv("TRAIN_EARLY_STOPPING_ROUNDS", "100"))
+# Heads trained at once; 1 trains them one after another in this process, 0 = one per core (max 3).
+TRAIN_PARALLEL_JOBS = int(os.getenv("TRAIN_PARALLEL_JOBS", "0"))
+# LightGBM threads per job; 0 splits the machine's cores evenly across jobs.
+TRAIN_THREADS_PER_JOB = int(os.getenv("TRAIN_THREADS_PER_JOB", "0"))
+
+
+@dataclass
+class HeadSpec:
+    name: str               # bundle key, e.g. "load_model"
+    label: str              # TrainingData label name
+    params: Dict[str, Any]
+    num_boost_round: int
+    classifier: bool = False
+
+
+# Same hyper-parameters as the original LGBMRegressor/LGBMClassifier fits; num_boost_round is now a ceiling.
+HEADS: List[HeadSpec] = [
+    HeadSpec("load_model", "load", {"objective": "regression", "learning_rate": 0.02,
+                                    "bagging_fraction": 0.8, "feature_fraction": 0.8}, 1500),
+    HeadSpec("disease_model", "disease", {"learning_rate": 0.03}, 800, classifier=True),
+    HeadSpec("intensity_model", "intensity", {"learning_rate": 0.03}, 800, classifier=True),
+]
+
+
+@dataclass
+class HeadResult:
+    name: str
+    wall_s: float
+    best_iteration: int
+    num_boost_round: int
+    n_train: int
+    n_valid: int
+    threads: int
+    valid_metrics: Dict[str, float] = field(default_factory=dict)
+
+
+def head_params(spec: HeadSpec, n_classes: int, threads: int) -> Dict[str, Any]:
+    params = {**DATASET_PARAMS, **spec.params, "num_threads": threads}
+    if not spec.classifier:
+        params["metric"] = ["l2", "l1"]
+    elif n_classes > 2:
+        params.update(objective="multiclass", num_class=n_classes, metric=["multi_logloss", "multi_error"])
+    else:
+        params.update(objective="binary", metric=["binary_logloss", "binary_error"])
+    return params
+
+
+def _summarize(spec: HeadSpec, scores: Dict[str, float]) -> Dict[str, float]:
+    out = {k: round(float(v), 6) for k, v in scores.items()}
+    if "l2" in out:
+        out["rmse"] = round(math.sqrt(out["l2"]), 6)
+    for err in ("multi_error", "binary_error"):
+        if err in out:
+            out["accuracy"] = round(1.0 - out[err], 6)
+    return out
+
+
+# ---------- One head (runs in a worker) ----------
+def train_head(spec: HeadSpec, data: TrainingData, train_rows: np.ndarray, valid_rows: np.ndarray,
+               threads: int, early_stopping_rounds: int = TRAIN_EARLY_STOPPING_ROUNDS) -> Tuple[str, HeadResult]:
+    """Fits one head; returns (model string truncated at the best iteration, HeadResult)."""
+    t0 = time.perf_counter()
+    n_classes = len(data.classes(spec.label)) if spec.classifier else 0
+    full = data.dataset(data.labels(spec.label))
+    params = head_params(spec, n_classes, threads)
+
+    callbacks = []
+    valid_sets = []
+    if len(valid_rows) and len(train_rows):
+        train_set = full.subset(train_rows)
+        valid_sets = [full.subset(valid_rows)]
+        callbacks.append(lgb.early_stopping(early_stopping_rounds, first_metric_only=True, verbose=False))
+    else:
+        # Series too short to hold anything out: train on everything for the full round count.
+        train_set = full
+
+    booster = lgb.train(params, train_set, num_boost_round=spec.num_boost_round,
+                        valid_sets=valid_sets, valid_names=["valid"] * len(valid_sets), callbacks=callbacks)
+    best = booster.best_iteration or booster.current_iteration()
+    scores = dict(booster.best_score.get("valid", {}))
+    result = HeadResult(
+        name=spec.name,
+        wall_s=round(time.perf_counter() - t0, 3),
+        best_iteration=int(best),
+        num_boost_round=spec.num_boost_round,
+        n_train=int(len(train_rows) if valid_sets else data.n_rows),
+        n_valid=int(len(valid_rows) if valid_sets else 0),
+        threads=threads,
+        valid_metrics=_summarize(spec, scores),
+    )
+    return booster.model_to_string(num_iteration=best), result
+
+
+# ---------- All heads ----------
+def thread_budget(jobs: int, threads_per_job: int = TRAIN_THREADS_PER_JOB) -> int:
+    if threads_per_job > 0:
+        return threads_per_job
+    return max(1, (os.cpu_count() or 1) // max(1, jobs))
+
+
+def train_heads(data: TrainingData, heads: List[HeadSpec] = HEADS, jobs: int = TRAIN_PARALLEL_JOBS,
+                valid_days: int = TRAIN_VALID_DAYS, threads_per_job: int = TRAIN_THREADS_PER_JOB,
+                early_stopping_rounds: int = TRAIN_EARLY_STOPPING_ROUNDS) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Trains every head (in parallel when jobs > 1). Returns the bundle models
+    keyed like the joblib bundle, and a report with per-head wall time, best
+    iteration and validation metrics.
+    """
+    jobs = max(1, min(jobs or (os.cpu_count() or 1), len(heads)))
+    threads = thread_budget(jobs, threads_per_job)
+    train_rows, valid_rows = data.time_split(valid_days)
+    print(f"🧪 Validation: last {valid_days} days per pincode ({len(valid_rows):,} rows), "
+          f"{jobs} job(s) x {threads} thread(s)")
+
+    t0 = time.perf_counter()
+    args = [(spec, data, train_rows, valid_rows, threads, early_stopping_rounds) for spec in heads]
+    if jobs == 1:
+        outputs = [train_head(*a) for a in args]
+    else:
+        # spawn: LightGBM's OpenMP runtime is not fork-safe once the parent has used it.
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            outputs = list(pool.map(train_head, *zip(*args)))
+
+    models: Dict[str, Any] = {}
+    results: List[HeadResult] = []
+    for spec, (model_str, result) in zip(heads, outputs):
+        booster = lgb.Booster(model_str=model_str)
+        if spec.classifier:
+            models[spec.name] = BoosterClassifier(booster, data.classes(spec.label))
+        else:
+            models[spec.name] = BoosterRegressor(booster)
+        results.append(result)
+        print(f"   ✅ {spec.name}: {result.wall_s:.1f}s, best iteration {result.best_iteration}/{spec.num_boost_round}, "
+              f"valid {result.valid_metrics}")
+
+    report = {
+        "wall_s": round(time.perf_counter() - t0, 3),
+        "jobs": jobs,
+        "threads_per_job": threads,
+        "valid_days": valid_days,
+        "early_stopping_rounds": early_stopping_rounds,
+        "n_rows": data.n_rows,
+        "heads": {r.name: asdict(r) for r in results},
+    }
+    return models, report
+
+
+def write_metrics(bundle_path: str, report: Dict[str, Any]) -> str:
+    """Writes the training report as <bundle>.metrics.json next to the saved bundle."""
+    path = os.path.splitext(bundle_path)[0] + ".metrics.json"
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    return path
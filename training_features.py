@@ -0,0 +1,110 @@
+# agents_project_life/training_features.py
+"""
+Feature engineering for train_patient_forecast_model.py.
+
+The history is sorted by (city, pincode, date) once; each series is then a
+contiguous block of rows, so every lag is a single shifted slice of one
+float32 value matrix, masked where the row is fewer than `lag` days into its
+series. This replaces 30 separate groupby().shift() calls (each regrouping
+the frame and adding a float64 column) with one grouping and one
+preallocated block.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence, Tuple
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from feature_encoder import LAG_COLUMNS, LAG_DAYS
+
+GROUP_COLUMNS = ["city", "pincode"]
+
+
+# ---------- Grouping ----------
+def series_positions(df: pd.DataFrame, group_cols: Sequence[str] = GROUP_COLUMNS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (group id, position within group) per row for a frame already sorted by
+    `group_cols`. Rows of one series must be contiguous.
+    """
+    n = len(df)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    new_group = np.zeros(n, dtype=bool)
+    new_group[0] = True
+    for col in group_cols:
+        values = df[col].to_numpy()
+        new_group[1:] |= values[1:] != values[:-1]
+    group_id = np.cumsum(new_group) - 1
+    starts = np.flatnonzero(new_group)
+    return group_id, np.arange(n) - starts[group_id]
+
+
+def lag_feature_names(lag_days: Sequence[int] = LAG_DAYS, columns: Sequence[str] = LAG_COLUMNS) -> List[str]:
+    """Same order add_lag_features always produced: lag-major, then column."""
+    return [f"{col}_lag{lag}" for lag in lag_days for col in columns]
+
+
+# ---------- Lags ----------
+def build_lag_block(df: pd.DataFrame, lag_days: Sequence[int] = LAG_DAYS, columns: Sequence[str] = LAG_COLUMNS,
+                    group_cols: Sequence[str] = GROUP_COLUMNS, dtype=np.float32) -> Tuple[np.ndarray, List[str]]:
+    """
+    (n_rows, len(lag_days) * len(columns)) array of lagged values, NaN where
+    the lag reaches before the start of the series; equal to
+    df.groupby(group_cols)[col].shift(lag) for a sorted frame.
+    """
+    _, pos = series_positions(df, group_cols)
+    values = df[list(columns)].to_numpy(dtype=dtype)
+    n, width = values.shape
+    block = np.full((n, len(lag_days) * width), np.nan, dtype=dtype)
+    for j, lag in enumerate(lag_days):
+        if lag >= n:
+            continue
+        out = block[:, j * width:(j + 1) * width]
+        out[lag:] = values[:-lag]
+        out[pos < lag] = np.nan
+    return block, lag_feature_names(lag_days, columns)
+
+
+def add_lag_features(df: pd.DataFrame, lag_days: Sequence[int] = LAG_DAYS,
+                     group_cols: Sequence[str] = GROUP_COLUMNS) -> pd.DataFrame:
+    """df (sorted by group_cols + date) with every `<col>_lag<k>` column appended as float32."""
+    block, names = build_lag_block(df, lag_days, group_cols=group_cols)
+    lags = pd.DataFrame(block, columns=names, index=df.index, copy=False)
+    return pd.concat([df.drop(columns=[c for c in names if c in df.columns]), lags], axis=1)
+
+
+def group_diff(df: pd.DataFrame, column: str, group_cols: Sequence[str] = GROUP_COLUMNS) -> np.ndarray:
+    """df.groupby(group_cols)[column].diff().fillna(0) for a sorted frame, in one pass."""
+    _, pos = series_positions(df, group_cols)
+    values = df[column].to_numpy(dtype=np.float64)
+    diff = np.zeros(len(values))
+    diff[1:] = values[1:] - values[:-1]
+    diff[pos == 0] = 0.0
+    return diff
+
+
+# ---------- Reporting ----------
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (0.0 where unsupported)."""
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / 1e6
+
+
+@contextmanager
+def report_stage(name: str) -> Iterator[None]:
+    """Prints wall time and peak RSS growth of a pipeline stage."""
+    rss0 = peak_rss_mb()
+    t0 = time.perf_counter()
+    yield
+    print(f"⏱️ {name}: {time.perf_counter() - t0:.2f}s, peak RSS {peak_rss_mb():.0f} MB (+{peak_rss_mb() - rss0:.0f} MB)")
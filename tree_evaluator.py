@@ -0,0 +1,302 @@
+# agents_project_life/tree_evaluator.py
+"""
+LightGBM boosters compiled to flat NumPy arrays.
+
+export_booster() walks booster.dump_model() once and stores every node of
+every tree in parallel arrays (split feature, threshold, missing handling,
+children, leaf value). CompiledModel.raw_score() then advances all rows
+through all trees together, one vectorized step per tree level, so a batch
+costs depth x (rows x trees) array operations and no per-call LightGBM
+overhead.
+
+Compiled bundles are saved with np.savez (no pickle), so loading is a plain
+array read. With dtype=float32 thresholds are rounded down to the nearest
+float32, which keeps splits exact for float32-representable inputs.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+import json
+import numpy as np
+
+# LightGBM treats |x| <= kZeroThreshold as zero for missing_type=Zero.
+_ZERO_THRESHOLD = 1e-35
+_MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+# Rows walked together; keeps the (rows, trees) node array cache-sized on big batches.
+_CHUNK_ROWS = 1024
+_ARRAYS = ("feature", "threshold", "default_left", "missing_type", "left", "right", "leaf_value", "roots")
+
+
+class UnsupportedModelError(ValueError):
+    """The booster uses a feature the compiled evaluator cannot represent."""
+
+
+# ---------- Export ----------
+def _transform(objective: str) -> str:
+    name = objective.split()[0] if objective else "regression"
+    if name in ("multiclass", "softmax"):
+        return "softmax"
+    if name in ("binary", "cross_entropy", "xentropy", "multiclassova", "multiclass_ova", "ova", "ovr"):
+        return "sigmoid"
+    if name in ("poisson", "gamma", "tweedie"):
+        return "exp"
+    return "identity"
+
+
+def _sigmoid_scale(objective: str) -> float:
+    for part in objective.split()[1:]:
+        if part.startswith("sigmoid:"):
+            return float(part.split(":", 1)[1])
+    return 1.0
+
+
+def export_booster(booster: Any, dtype: Any = np.float64) -> Dict[str, Any]:
+    """Flat arrays + metadata for every tree of `booster` (an lgb.Booster)."""
+    dump = booster.dump_model()
+    dtype = np.dtype(dtype)
+
+    feature: List[int] = []
+    threshold: List[float] = []
+    default_left: List[bool] = []
+    missing_type: List[int] = []
+    left: List[int] = []
+    right: List[int] = []
+    leaf_value: List[float] = []
+    roots: List[int] = []
+
+    def add(node: Dict[str, Any]) -> int:
+        i = len(feature)
+        feature.append(-1)
+        threshold.append(0.0)
+        default_left.append(False)
+        missing_type.append(0)
+        left.append(i)
+        right.append(i)
+        leaf_value.append(float(node.get("leaf_value", 0.0)))
+        return i
+
+    for tree in dump["tree_info"]:
+        root = tree["tree_structure"]
+        roots.append(add(root))
+        stack = [(root, roots[-1])]
+        while stack:
+            node, i = stack.pop()
+            if "leaf_coeff" in node:
+                raise UnsupportedModelError("Linear trees are not supported")
+            if "split_feature" not in node:
+                continue
+            if node.get("decision_type", "<=") != "<=":
+                raise UnsupportedModelError("Categorical splits are not supported")
+            feature[i] = int(node["split_feature"])
+            threshold[i] = float(node["threshold"])
+            default_left[i] = bool(node.get("default_left", True))
+            missing_type[i] = _MISSING_TYPES[node.get("missing_type", "None")]
+            left[i] = add(node["left_child"])
+            right[i] = add(node["right_child"])
+            stack.append((node["left_child"], left[i]))
+            stack.append((node["right_child"], right[i]))
+
+    thr = np.asarray(threshold, dtype=np.float64)
+    if dtype == np.float32:
+        # Largest float32 <= threshold: x32 <= thr32 holds exactly when x32 <= thr.
+        thr32 = thr.astype(np.float32)
+        over = thr32.astype(np.float64) > thr
+        thr32[over] = np.nextafter(thr32[over], np.float32(-np.inf))
+        thr = thr32
+
+    objective = dump.get("objective", "regression")
+    return {
+        "feature": np.asarray(feature, dtype=np.int32),
+        "threshold": thr.astype(dtype),
+        "default_left": np.asarray(default_left, dtype=bool),
+        "missing_type": np.asarray(missing_type, dtype=np.int8),
+        "left": np.asarray(left, dtype=np.int32),
+        "right": np.asarray(right, dtype=np.int32),
+        "leaf_value": np.asarray(leaf_value, dtype=dtype),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "meta": {
+            "num_class": int(dump.get("num_class", 1)),
+            "num_tree_per_iteration": int(dump.get("num_tree_per_iteration", dump.get("num_class", 1))),
+            "objective": objective,
+            "transform": _transform(objective),
+            "sigmoid": _sigmoid_scale(objective),
+            "average_output": bool(dump.get("average_output", False)),
+            "feature_names": dump.get("feature_names", []),
+            "dtype": dtype.name,
+        },
+    }
+
+
+# ---------- Evaluation ----------
+class CompiledModel:
+    """NumPy evaluator for one exported booster."""
+
+    def __init__(self, arrays: Dict[str, Any]):
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = arrays["meta"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        self.num_tree_per_iteration = self.meta["num_tree_per_iteration"]
+        self.feature_name_ = self.meta["feature_names"]
+        self.n_features_in_ = len(self.feature_name_)
+        self._max_depth = self._depth()
+        # Leaves loop back to themselves (left == right == node), so the walk needs no leaf mask.
+        self._split_feature = np.maximum(self.feature, 0).astype(np.intp)
+        self._left = self.left.astype(np.intp)
+        self._right = self.right.astype(np.intp)
+        # Models trained without missing values only have missing_type=None splits: NaN reads as 0.0 everywhere.
+        self._plain = not (self.missing_type[self.feature >= 0] != 0).any()
+
+    def _depth(self) -> int:
+        depth = np.zeros(len(self.feature), dtype=np.int32)
+        internal = np.flatnonzero(self.feature >= 0)
+        # Children are always added after their parent, so one ordered pass suffices.
+        for i in internal:
+            depth[self.left[i]] = depth[self.right[i]] = depth[i] + 1
+        return int(depth.max()) if len(depth) else 0
+
+    def leaves(self, X: np.ndarray) -> np.ndarray:
+        """(rows, trees) node index of the leaf each row lands in."""
+        X = np.ascontiguousarray(X, dtype=self.dtype)
+        if len(X) > _CHUNK_ROWS:
+            return np.concatenate([self._walk(X[i:i + _CHUNK_ROWS]) for i in range(0, len(X), _CHUNK_ROWS)])
+        return self._walk(X)
+
+    def _walk(self, X: np.ndarray) -> np.ndarray:
+        n, n_features = X.shape
+        nan = np.isnan(X)
+        if self._plain and nan.any():
+            X = np.where(nan, 0, X)
+        flat = X.ravel()
+        # Offset of each row's first feature in the flattened matrix.
+        row_base = (np.arange(n, dtype=np.intp) * n_features)[:, None]
+        node = np.broadcast_to(self.roots.astype(np.intp), (n, len(self.roots))).copy()
+        for _ in range(self._max_depth):
+            x = flat.take(row_base + self._split_feature.take(node))
+            if self._plain:
+                go_left = x <= self.threshold.take(node)
+            else:
+                mt = self.missing_type.take(node)
+                x_nan = np.isnan(x)
+                # Outside missing_type=NaN, LightGBM reads NaN as 0.0.
+                x = np.where(x_nan & (mt != 2), 0, x)
+                use_default = ((mt == 2) & x_nan) | ((mt == 1) & (np.abs(x) <= _ZERO_THRESHOLD))
+                go_left = np.where(use_default, self.default_left.take(node), x <= self.threshold.take(node))
+            node = np.where(go_left, self._left.take(node), self._right.take(node))
+        return node
+
+    def raw_score(self, X: np.ndarray) -> np.ndarray:
+        """Summed leaf values: (rows,) for one tree per iteration, else (rows, classes)."""
+        values = self.leaf_value[self.leaves(X)].astype(np.float64)
+        k = self.num_tree_per_iteration
+        score = values.reshape(len(values), -1, k).sum(axis=1)
+        if self.meta["average_output"]:
+            score /= max(1, values.shape[1] // k)
+        return score[:, 0] if k == 1 else score
+
+    def predict_raw(self, X: np.ndarray) -> np.ndarray:
+        """Same output as booster.predict(X): transformed scores / class probabilities."""
+        score = self.raw_score(X)
+        transform = self.meta["transform"]
+        if transform == "softmax":
+            e = np.exp(score - score.max(axis=1, keepdims=True))
+            return e / e.sum(axis=1, keepdims=True)
+        if transform == "sigmoid":
+            return 1.0 / (1.0 + np.exp(-self.meta["sigmoid"] * score))
+        if transform == "exp":
+            return np.exp(score)
+        return score
+
+
+class CompiledRegressor(CompiledModel):
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_raw(X)
+
+
+class CompiledClassifier(CompiledModel):
+    def __init__(self, arrays: Dict[str, Any], classes: Sequence[Any]):
+        super().__init__(arrays)
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        proba = self.predict_raw(X)
+        if proba.ndim == 1:
+            return np.column_stack([1.0 - proba, proba])
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # Same argmax / p > 0.5 rule as booster_models.BoosterClassifier.predict.
+        proba = self.predict_raw(X)
+        idx = (proba > 0.5).astype(np.intp) if proba.ndim == 1 else proba.argmax(axis=1)
+        return self.classes_[idx]
+
+
+# ---------- Bundles ----------
+MODEL_KEYS = ("load_model", "disease_model", "intensity_model")
+
+
+def _booster(model: Any) -> Any:
+    return getattr(model, "booster_", model)
+
+
+def compile_bundle(bundle: Dict[str, Any], dtype: Any = np.float64) -> Dict[str, Any]:
+    """Same keys as the joblib bundle, with every head replaced by its compiled evaluator."""
+    out: Dict[str, Any] = {"features": list(bundle["features"])}
+    for key in MODEL_KEYS:
+        model = bundle.get(key)
+        if model is None:
+            continue
+        arrays = export_booster(_booster(model), dtype)
+        classes = getattr(model, "classes_", None)
+        out[key] = CompiledRegressor(arrays) if classes is None else CompiledClassifier(arrays, list(classes))
+    return out
+
+
+def save_compiled(bundle: Dict[str, Any], path: str, dtype: Any = np.float64) -> None:
+    """Exports a joblib bundle (or an already compiled one) to a pickle-free .npz."""
+    compiled = bundle if all(isinstance(bundle.get(k), (CompiledModel, type(None))) for k in MODEL_KEYS) \
+        else compile_bundle(bundle, dtype)
+    arrays: Dict[str, np.ndarray] = {}
+    meta: Dict[str, Any] = {"features": compiled["features"], "heads": {}}
+    for key in MODEL_KEYS:
+        model = compiled.get(key)
+        if model is None:
+            continue
+        for name in _ARRAYS:
+            arrays[f"{key}.{name}"] = getattr(model, name)
+        meta["heads"][key] = {
+            "meta": model.meta,
+            "classes": [str(c) for c in model.classes_] if isinstance(model, CompiledClassifier) else None,
+        }
+    arrays["meta"] = np.array(json.dumps(meta))
+    with open(path, "wb") as fh:
+        np.savez(fh, **arrays)
+
+
+def load_compiled(path: str) -> Dict[str, Any]:
+    """Bundle dict with compiled heads, read without unpickling anything."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        bundle: Dict[str, Any] = {"features": meta["features"]}
+        for key, head in meta["heads"].items():
+            arrays = {name: data[f"{key}.{name}"] for name in _ARRAYS}
+            arrays["meta"] = head["meta"]
+            classes = head["classes"]
+            bundle[key] = CompiledRegressor(arrays) if classes is None else CompiledClassifier(arrays, classes)
+    return bundle
+
+
+# ---------- CLI ----------
+if __name__ == "__main__":
+    # python tree_evaluator.py [bundle.joblib] [out.npz] [--float32]
+    import sys
+    import joblib
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    src = args[0] if args else "final_patient_disease_forecast_model.joblib"
+    dst = args[1] if len(args) > 1 else src.rsplit(".", 1)[0] + ".npz"
+    dtype = np.float32 if "--float32" in sys.argv else np.float64
+    save_compiled(joblib.load(src), dst, dtype)
+    compiled = load_compiled(dst)
+    trees = {k: len(m.roots) for k, m in compiled.items() if k != "features"}
+    print(f"Compiled {src} -> {dst} ({np.dtype(dtype).name}), trees per head: {trees}")